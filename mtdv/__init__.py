@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Éléments communs aux traducteurs traducteur_1.py à traducteur_4.py.
+"""
+
+from .lexeur import (Lexemes, decoder_lignes, joindre_lignes, lignes_fichier, lire_lignes, tokeniser,
+                     tokeniser_flux, tokeniser_lignes)
+from .syntaxe import analyse_P0
+from .ir import Noeud, Programme, construire_programme, programme_depuis_lignes
+from .moteur import Moteur, Resultat, execute
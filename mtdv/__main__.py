@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Ligne de commande du paquet mtdv.
+
+    python3 -m mtdv executer programme.TS [--ruban 0011100111] [--tete 2] [--bits] [--sans-pause] [-O]
+                                          [--fenetre fixe|tete|etendue] [--largeur 61]
+                                          [--sans-cache] [--pas-max N] [--delai S] [--cycles | --profil rapport.txt
+                                          | --trace execution.mtt [--zlib]]
+    python3 -m mtdv compiler programme.TS [-o programme.mtb] [-O]
+    python3 -m mtdv traduire programmesTS/ [-t 1] [-d sortie/] [-j 4] [--bits] [-O] [--force] [--marqueurs]
+    python3 -m mtdv multi programme.TS [rubans.txt | -] [-j 4] [--pas-max N] [--delai S] [--bits] [-O]
+                                                      [--vectoriel | --cycles]
+    python3 -m mtdv profil programme.TS programme.profil.json [-o rapport.txt]
+    python3 -m mtdv carte sortie.py.map [autre.py.map ...] [-e trace.txt]
+    python3 -m mtdv trace execution.mtt [--pas N]
+
+'executer' accepte aussi directement un artefact .mtb produit par 'compiler'
+(sauf avec --profil, dont le rapport reprend les lignes du .TS). 'profil'
+tire les mêmes rapports du fichier écrit par le code de traducteur_1.py --profil.
+'carte' réécrit une trace ou une sortie de profileur (entrée standard par
+défaut) avec les positions .TS des cartes de correspondance (mtdv.carte).
+'trace' affiche le ruban reconstitué au pas N d'une trace binaire (mtdv.trace).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from . import affichage
+from .artefact import EXTENSION, ArtefactInvalide, charger, compiler, programme_cache
+from .carte import lire_carte, motif_cartes, retraduire
+from .ir import programme_depuis_lignes
+from .lexeur import lignes_fichier, lire_lignes
+from .lot import afficher_resume, traduire_lot
+from .multi import executer_multi, lire_specs
+from .moteur import TETE_INITIALE, afficher_ruban, execute, ruban_depuis_texte
+from .optim import optimiser
+from .profil import Profil, ecrire_rapports, lire_profil
+from .trace import EcrivainTrace, TraceInvalide, etat_au_pas
+
+
+def cmd_executer(args):
+    _regler_affichage(args)
+    if args.profil and (args.cycles or args.fichier.endswith(EXTENSION)):
+        print("ERREUR : --profil nécessite le .TS et exclut --cycles.", file=sys.stderr)
+        return 1
+    if args.trace and (args.cycles or args.profil):
+        print("ERREUR : --trace exclut --cycles et --profil.", file=sys.stderr)
+        return 1
+    programme = _charger(args)
+    if programme is None:
+        return 1
+    profil = Profil(len(programme)) if args.profil else None
+    trace = EcrivainTrace(args.trace, args.zlib) if args.trace else None
+    res = execute(programme, ruban_depuis_texte(args.ruban, args.bits), args.tete, not args.sans_pause,
+                  args.pas_max, args.delai, args.cycles, profil, trace)
+    if trace is not None:
+        print(f"[INFO] trace : {args.trace}, {trace.enregistrements} enregistrement(s), "
+              f"{os.path.getsize(args.trace)} octets")
+    if profil is not None:
+        _rapports(programme, profil, args.fichier, args.profil)
+    if res.motif:
+        print(f'Exécution interrompue ({res.motif}) après {res.pas} pas, état du ruban :')
+        afficher_ruban(res.tape, res.head)
+        return 3
+    print('État final :')
+    afficher_ruban(res.tape, res.head)
+    print(f'Programme terminé en {res.pas} pas, {res.tape.compter()} bâton(s).')
+    return 0
+
+
+def cmd_profil(args):
+    try:
+        profil, optimise = lire_profil(args.donnees)
+    except (OSError, ValueError) as e:
+        print(f"ERREUR : {e}", file=sys.stderr)
+        return 1
+    programme = programme_cache(args.fichier, optimise)
+    if programme is None:
+        return 1
+    sortie = args.sortie or os.path.splitext(args.donnees)[0] + '.txt'
+    try:
+        _rapports(programme, profil, args.fichier, sortie)
+    except ValueError as e:
+        print(f"ERREUR : {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _rapports(programme, profil, fichier, sortie):
+    chemins = ecrire_rapports(programme, lignes_fichier(fichier), profil, sortie, os.path.basename(fichier))
+    print(f"[INFO] profil : {chemins[0]}, {chemins[1]}")
+
+
+def cmd_carte(args):
+    try:
+        cartes = [lire_carte(c) for c in args.cartes]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"ERREUR : {e}", file=sys.stderr)
+        return 1
+    motif = motif_cartes(cartes)
+    flux = sys.stdin if args.entree == '-' else open(args.entree, encoding='utf-8', errors='replace')
+    with flux:
+        for ligne in flux:
+            sys.stdout.write(retraduire(ligne, cartes, motif))
+    return 0
+
+
+def _regler_affichage(args):
+    # fenêtre d'affichage du ruban (mtdv.affichage), sortie tamponnée par blocs
+    if args.fenetre:
+        affichage.FENETRE = args.fenetre
+    if args.largeur:
+        affichage.LARGEUR = args.largeur
+    affichage.tamponner_sortie()
+
+
+def cmd_trace(args):
+    _regler_affichage(args)
+    try:
+        tape, head, pas = etat_au_pas(args.fichier, args.pas)
+    except (OSError, TraceInvalide) as e:
+        print(f"ERREUR : {e}", file=sys.stderr)
+        return 1
+    if args.pas is None:
+        print(f'État à la fin de la trace (pas {pas}) :')
+    else:
+        print(f'État après le pas {args.pas} (dernier enregistrement : pas {pas}) :')
+    afficher_ruban(tape, head)
+    print(f'Tête en {head}, {tape.compter()} bâton(s).')
+    return 0
+
+
+def cmd_compiler(args):
+    try:
+        chemin = compiler(args.fichier, args.sortie, args.optimiser)
+    except OSError as e:
+        print(f"ERREUR : {e}", file=sys.stderr)
+        return 1
+    if chemin is None:
+        return 1
+    print(f"[INFO] {chemin}")
+    return 0
+
+
+def cmd_traduire(args):
+    t0 = time.perf_counter()
+    resultats = traduire_lot(args.entrees, args.sortie, args.traducteur,
+                             {'bits': args.bits, 'optimiser': args.optimiser, 'marqueurs': args.marqueurs},
+                             args.processus, args.force)
+    afficher_resume(resultats, time.perf_counter() - t0)
+    return 1 if any(r['statut'] == 'erreur' for r in resultats) else 0
+
+
+def _charger(args):
+    # Programme à exécuter, ou None (erreur déjà affichée)
+    try:
+        if args.fichier.endswith(EXTENSION):
+            return charger(args.fichier)
+        if args.sans_cache:
+            programme = programme_depuis_lignes(lire_lignes(args.fichier), diese_obligatoire=False)
+            if programme is not None and args.optimiser:
+                programme = optimiser(programme)
+            return programme
+        return programme_cache(args.fichier, args.optimiser)
+    except (OSError, ArtefactInvalide) as e:
+        print(f"ERREUR : {args.fichier} : {e}", file=sys.stderr)
+        return None
+
+
+def cmd_multi(args):
+    programme = _charger(args)
+    if programme is None:
+        return 1
+    flux = sys.stdin if args.rubans == '-' else open(args.rubans, encoding='utf-8')
+    with flux:
+        if args.vectoriel:
+            if args.cycles:
+                print("ERREUR : --cycles n'est pas disponible avec --vectoriel.", file=sys.stderr)
+                return 1
+            from .vectoriel import executer_specs, np
+            if np is None:
+                print("ERREUR : --vectoriel nécessite numpy (pip install numpy).", file=sys.stderr)
+                return 1
+            resultats = executer_specs(programme, lire_specs(flux), args.pas_max, args.bits, args.lot or 4096,
+                                       delai=args.delai)
+        else:
+            resultats = executer_multi(programme, lire_specs(flux), args.processus, args.pas_max,
+                                       args.bits, args.lot or 64, delai=args.delai, cycles=args.cycles)
+        for res in resultats:
+            print(json.dumps(res, ensure_ascii=False), flush=args.rubans == '-')
+    return 0
+
+
+def _options_affichage(p):
+    p.add_argument("--fenetre", choices=affichage.FENETRES, default=None,
+                   help="cases affichées : 0..largeur-1 (fixe), centrées sur la tête (tete), "
+                        "cases à 1 et tête (etendue) ; défaut : MTDV_FENETRE ou fixe")
+    p.add_argument("--largeur", type=int, default=None, help="nombre de cases affichées (défaut : MTDV_LARGEUR ou 61)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python3 -m mtdv")
+    sub = parser.add_subparsers(dest="commande", required=True)
+
+    p = sub.add_parser("executer", help="exécute un programme .TS en mémoire")
+    p.add_argument("fichier")
+    p.add_argument("--ruban", default="", help="contenu initial à partir de la case 0, par exemple 0011100111")
+    p.add_argument("--tete", type=int, default=TETE_INITIALE)
+    p.add_argument("--bits", action="store_true", help="ruban compact, un bit par case (RubanBits)")
+    p.add_argument("--sans-pause", action="store_true", help="ne pas attendre Entrée sur 'P'")
+    p.add_argument("-O", "--optimiser", action="store_true",
+                   help="appliquer les passes de mtdv.optim avant l'exécution")
+    p.add_argument("--sans-cache", action="store_true",
+                   help="toujours relire et analyser le .TS (ne pas utiliser __mtdvcache__)")
+    p.add_argument("--pas-max", type=int, default=None, help="interrompre l'exécution après ce nombre de pas")
+    p.add_argument("--delai", type=float, default=None, help="interrompre l'exécution après ce nombre de secondes")
+    p.add_argument("--cycles", action="store_true",
+                   help="détecter les cycles aux retours de boucle (arrêt immédiat, motif 'sans_fin') ; "
+                        "un programme sans fin dont la zone parcourue grandit (01.1.TS) n'est pas détecté")
+    p.add_argument("--profil", metavar="RAPPORT",
+                   help="compter les exécutions par instruction et le temps par boucle ; rapport annoté "
+                        "du .TS dans RAPPORT, piles repliées (flamegraph) dans RAPPORT sans extension + .folded")
+    p.add_argument("--trace", metavar="FICHIER",
+                   help="enregistrer chaque déplacement et chaque écriture dans une trace binaire (mtdv.trace)")
+    p.add_argument("--zlib", action="store_true", help="compresser la trace par zlib")
+    _options_affichage(p)
+    p.set_defaults(func=cmd_executer)
+
+    p = sub.add_parser("compiler", help="compile un programme .TS en artefact binaire .mtb")
+    p.add_argument("fichier")
+    p.add_argument("-o", "--sortie", help="par défaut : __mtdvcache__/ à côté du .TS")
+    p.add_argument("-O", "--optimiser", action="store_true",
+                   help="appliquer les passes de mtdv.optim avant la sérialisation")
+    p.set_defaults(func=cmd_compiler)
+
+    p = sub.add_parser("traduire", help="traduit tous les .TS d'un dossier ou d'un motif glob, en parallèle")
+    p.add_argument("entrees", nargs="+", help="dossiers, fichiers .TS ou motifs glob")
+    p.add_argument("-t", "--traducteur", type=int, choices=(1, 2, 3, 4), default=1)
+    p.add_argument("-d", "--sortie", default="traductions", help="dossier des fichiers .py générés")
+    p.add_argument("-j", "--processus", type=int, default=None, help="nombre de processus (défaut : nombre de CPU)")
+    p.add_argument("--bits", action="store_true", help="RubanBits dans le code généré (traducteurs 1 et 2)")
+    p.add_argument("-O", "--optimiser", action="store_true", help="passes de mtdv.optim (traducteurs 1 et 2)")
+    p.add_argument("--force", action="store_true", help="retraduire même les fichiers inchangés")
+    p.add_argument("--marqueurs", action="store_true",
+                   help="commentaire '# ts:ligne:colonne' sur chaque ligne traduite (la carte .map est toujours écrite)")
+    p.set_defaults(func=cmd_traduire)
+
+    p = sub.add_parser("multi", help="exécute un programme sur de nombreux rubans (une ligne JSON par ruban)")
+    p.add_argument("fichier", help="programme .TS ou artefact .mtb")
+    p.add_argument("rubans", nargs="?", default="-", help="fichier de spécifications de rubans, '-' = entrée standard")
+    p.add_argument("-j", "--processus", type=int, default=None, help="nombre de processus (défaut : nombre de CPU)")
+    p.add_argument("--pas-max", type=int, default=None, help="interrompre chaque exécution après ce nombre de pas")
+    p.add_argument("--delai", type=float, default=None,
+                   help="durée maximale en secondes de chaque exécution (de chaque lot avec --vectoriel)")
+    p.add_argument("--lot", type=int, default=None,
+                   help="rubans envoyés à la fois à un processus (64), ou exécutés ensemble avec --vectoriel (4096)")
+    p.add_argument("--vectoriel", action="store_true",
+                   help="exécuter les rubans ensemble avec NumPy (mtdv.vectoriel), dans ce processus")
+    p.add_argument("--cycles", action="store_true",
+                   help="détecter les cycles aux retours de boucle (statut 'sans_fin') ; un programme sans fin "
+                        "dont la zone parcourue grandit (01.1.TS) finit en 'limite', pas en 'sans_fin'")
+    p.add_argument("--bits", action="store_true", help="ruban compact, un bit par case (RubanBits)")
+    p.add_argument("-O", "--optimiser", action="store_true",
+                   help="appliquer les passes de mtdv.optim avant l'exécution")
+    p.add_argument("--sans-cache", action="store_true",
+                   help="toujours relire et analyser le .TS (ne pas utiliser __mtdvcache__)")
+    p.set_defaults(func=cmd_multi)
+
+    p = sub.add_parser("profil", help="rapports du profil écrit par le code de traducteur_1.py --profil")
+    p.add_argument("fichier", help="programme .TS traduit")
+    p.add_argument("donnees", help="profil JSON écrit à la fin de l'exécution (MTDV_PROFIL)")
+    p.add_argument("-o", "--sortie", help="rapport annoté (défaut : donnees avec l'extension .txt) ; "
+                                            "piles repliées à côté, extension .folded")
+    p.set_defaults(func=cmd_profil)
+
+    p = sub.add_parser("carte", help="positions du code généré => positions .TS dans une trace ou un profil")
+    p.add_argument("cartes", nargs="+", help="cartes de correspondance sortie.py.map écrites par les traducteurs")
+    p.add_argument("-e", "--entree", default="-", help="texte à réécrire (traceback, pstats, py-spy...), '-' = entrée standard")
+    p.set_defaults(func=cmd_carte)
+
+    p = sub.add_parser("trace", help="ruban reconstitué à un pas donné d'une trace binaire")
+    p.add_argument("fichier", help="trace écrite par 'executer --trace'")
+    p.add_argument("--pas", type=int, default=None, help="numéro du pas (défaut : fin de la trace)")
+    _options_affichage(p)
+    p.set_defaults(func=cmd_trace)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Affichage du ruban ('I', 'P', états initial et final).
+
+Seule une fenêtre de LARGEUR cases est affichée, choisie par FENETRE :
+  - 'fixe'    : cases 0 .. LARGEUR-1 (l'affichage historique) ;
+  - 'tete'    : LARGEUR cases centrées sur la tête ;
+  - 'etendue' : des cases à 1 les plus à gauche et à droite (et la tête),
+                ou 'tete' si cette étendue dépasse LARGEUR cases.
+Les variables d'environnement MTDV_FENETRE et MTDV_LARGEUR en décident, pour
+l'interprète comme pour le code généré (python3 -m mtdv executer accepte
+aussi --fenetre et --largeur).
+
+Les cases (bytes de 0/1, RubanPagine.fenetre) deviennent du texte par un
+seul bytes.translate, et les deux lignes (cases, puis 'X' sous la tête)
+partent en une seule écriture. tamponner_sortie() rend sys.stdout tamponné
+par blocs même sur un terminal : les affichages d'une boucle serrée ne
+coûtent plus un appel système par ligne, input() ('P') et la fin du
+programme vident le tampon.
+
+Les fonctions sont recopiées dans le code généré par les traducteurs 1 et 2
+(source_affichage) ; les traducteurs 3 et 4 ont leur équivalent sans
+affectation dans mtdv/persistant.py (tape_display).
+"""
+
+import inspect
+import os
+import sys
+
+FENETRES = ('fixe', 'tete', 'etendue')
+
+CHIFFRES = bytes.maketrans(b'\x00\x01', b'01')
+FENETRE = os.environ.get('MTDV_FENETRE', 'fixe')
+LARGEUR = int(os.environ.get('MTDV_LARGEUR', '61'))
+
+
+def bornes_fenetre(mode, largeur, head, etendue=None):
+    # (début, fin) des cases affichées ; etendue = (première, dernière case à 1) ou None
+    if mode == 'etendue' and etendue is not None:
+        debut = min(etendue[0], head)
+        fin = max(etendue[1], head) + 1
+        if fin - debut <= largeur:
+            return debut, fin
+    if mode == 'fixe':
+        return 0, largeur
+    debut = head - largeur // 2
+    return debut, debut + largeur
+
+
+def rendre_ruban(cases, debut, head):
+    # Cases (bytes de 0/1) à partir de la case debut => deux lignes, 'X' sous la tête
+    return cases.translate(CHIFFRES).decode('ascii') + '\n' + ' ' * (head - debut) + 'X\n'
+
+
+def afficher_ruban(tape, head):
+    # RubanPagine ou RubanBits : une seule écriture pour les deux lignes
+    debut, fin = bornes_fenetre(FENETRE, LARGEUR, head, tape.etendue() if FENETRE == 'etendue' else None)
+    print(rendre_ruban(tape.fenetre(debut, fin), debut, head), end='')
+
+
+def afficher_sentinelles(t, origine, head):
+    # Ruban à sentinelles (traducteur_1.py --local) : la case p est t[origine + p]
+    etendue = None
+    if FENETRE == 'etendue' and t.find(1) >= 0:
+        etendue = (t.find(1) - origine, t.rfind(1) - origine)
+    debut, fin = bornes_fenetre(FENETRE, LARGEUR, head - origine, etendue)
+    a, b = origine + debut, origine + fin
+    cases = bytes(max(0, min(b, 0) - a)) + bytes(t[max(a, 0):max(b, 0)]) + bytes(max(0, b - max(a, len(t))))
+    print(rendre_ruban(cases, debut, head - origine), end='')
+
+
+def tamponner_sortie():
+    # sys.stdout tamponné par blocs, même sur un terminal (vidé par input() et à la sortie)
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(line_buffering=False)
+
+
+def source_affichage(sentinelles=False):
+    """
+    Source de l'affichage à insérer dans un programme généré autonome (après
+    'import sys') : afficher_ruban, ou afficher_sentinelles si sentinelles.
+    """
+    fonctions = [bornes_fenetre, rendre_ruban, afficher_sentinelles if sentinelles else afficher_ruban,
+                 tamponner_sortie]
+    return "\n".join([
+        "# Affichage du ruban (mtdv/affichage.py) : MTDV_FENETRE, MTDV_LARGEUR",
+        "import os",
+        "CHIFFRES = bytes.maketrans(b'\\x00\\x01', b'01')",
+        "FENETRE = os.environ.get('MTDV_FENETRE', 'fixe')",
+        "LARGEUR = int(os.environ.get('MTDV_LARGEUR', '61'))",
+        "",
+    ] + [inspect.getsource(f) for f in fonctions])
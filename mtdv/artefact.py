@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Programmes compilés : la représentation compacte (mtdv.ir), éventuellement
+optimisée, sérialisée dans un fichier binaire, à la manière des .pyc.
+
+Format (petit-boutiste) :
+  en-tête  MAGIC (4 o), FORMAT (H), VERSION_IR (H), options (H), réservé (H),
+           sha256 du fichier .TS (32 o), nombre d'éléments n (I)
+  corps    ops (n octets signés), args, lignes, colonnes (n entiers 32 bits chacun)
+
+Le cache (programme_cache) range les artefacts dans un dossier
+__mtdvcache__ à côté du fichier .TS ; un artefact n'est réutilisé que si
+l'empreinte du source, le format, VERSION_IR et les options correspondent.
+Il est lu par mmap et recopié une seule fois, directement de la projection
+dans les tableaux du Programme (le mmap n'évite que le tampon de lecture
+intermédiaire) : relancer un programme inchangé ne refait ni l'analyse
+lexicale, ni l'analyse P0, ni les optimisations.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .ir import VERSION_IR, Programme, construire_programme
+from .lexeur import decoder_lignes, tokeniser_lignes
+from .optim import optimiser
+
+MAGIC = b'MTDV'
+FORMAT = 1
+EXTENSION = '.mtb'
+DOSSIER_CACHE = '__mtdvcache__'
+
+OPT_OPTIMISE = 1
+OPT_DIESE_OBLIGATOIRE = 2
+
+_ENTETE = struct.Struct('<4sHHHH32sI')
+
+
+class ArtefactInvalide(ValueError):
+    """
+    Fichier qui n'est pas un artefact mtdv, ou produit par une autre version.
+    """
+
+
+def empreinte(octets):
+    return hashlib.sha256(octets).digest()
+
+
+def _options(optimise, diese_obligatoire):
+    return (OPT_OPTIMISE if optimise else 0) | (OPT_DIESE_OBLIGATOIRE if diese_obligatoire else 0)
+
+
+def compiler_octets(octets, optimise=True, diese_obligatoire=False):
+    """
+    Contenu d'un fichier .TS => Programme (optimisé si demandé), ou None en
+    cas d'erreur d'analyse.
+    """
+    programme = construire_programme(tokeniser_lignes(decoder_lignes(octets)), diese_obligatoire)
+    if programme is not None and optimise:
+        programme = optimiser(programme)
+    return programme
+
+
+def serialiser(programme, source_hash, options):
+    """
+    Octets de l'artefact d'un Programme.
+    """
+    n = len(programme)
+    morceaux = [_ENTETE.pack(MAGIC, FORMAT, VERSION_IR, options, 0, source_hash, n),
+                programme.ops.tobytes()]
+    for tableau in (programme.args, programme.lignes, programme.colonnes):
+        if sys.byteorder != 'little':
+            tableau = array('i', tableau)
+            tableau.byteswap()
+        morceaux.append(tableau.tobytes())
+    return b''.join(morceaux)
+
+
+def ecrire(chemin, programme, source_hash, options):
+    """
+    Écrit l'artefact de façon atomique (fichier temporaire puis os.replace),
+    pour que des processus concurrents ne lisent jamais un fichier partiel.
+    """
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(serialiser(programme, source_hash, options))
+    os.replace(tmp, chemin)
+
+
+def lire_entete(donnees):
+    """
+    (options, sha256 du source, n) d'un artefact ; ArtefactInvalide si le
+    format ou VERSION_IR ne correspondent pas.
+    """
+    if len(donnees) < _ENTETE.size:
+        raise ArtefactInvalide("artefact tronqué")
+    magic, fmt, version, options, _, source_hash, n = _ENTETE.unpack_from(donnees)
+    if magic != MAGIC:
+        raise ArtefactInvalide("pas un artefact mtdv")
+    if fmt != FORMAT or version != VERSION_IR:
+        raise ArtefactInvalide(f"format {fmt}/{version}, attendu {FORMAT}/{VERSION_IR}")
+    if len(donnees) != _ENTETE.size + 13 * n:
+        raise ArtefactInvalide("artefact tronqué")
+    return options, source_hash, n
+
+
+def _programme(donnees, n):
+    # Tranches de memoryview : chaque tableau est rempli depuis donnees sans
+    # copie intermédiaire en bytes
+    prog = Programme()
+    debut = _ENTETE.size
+    with memoryview(donnees) as vue:
+        prog.ops.frombytes(vue[debut:debut + n])
+        debut += n
+        for tableau in (prog.args, prog.lignes, prog.colonnes):
+            tableau.frombytes(vue[debut:debut + 4 * n])
+            if sys.byteorder != 'little':
+                tableau.byteswap()
+            debut += 4 * n
+    return prog
+
+
+def depuis_octets(donnees):
+    """
+    Programme contenu dans les octets d'un artefact (sans vérification de
+    l'empreinte du source).
+    """
+    _, _, n = lire_entete(donnees)
+    return _programme(donnees, n)
+
+
+def charger(chemin, source_hash=None, options=None):
+    """
+    Programme lu (par mmap) depuis un artefact. Si source_hash / options
+    sont donnés, ils doivent correspondre à l'en-tête (sinon ArtefactInvalide).
+    Les tableaux du Programme sont une copie : la projection est fermée au
+    retour, seule la lecture dans un tampon intermédiaire est évitée.
+    """
+    with open(chemin, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ArtefactInvalide("artefact vide")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as donnees:
+            opts, empreinte_source, n = lire_entete(donnees)
+            if source_hash is not None and empreinte_source != source_hash:
+                raise ArtefactInvalide("le fichier source a changé")
+            if options is not None and opts != options:
+                raise ArtefactInvalide("options de compilation différentes")
+            return _programme(donnees, n)
+
+
+def chemin_cache(chemin_ts, optimise=True):
+    """
+    Emplacement de l'artefact d'un fichier .TS :
+    <dossier>/__mtdvcache__/<nom>.ir<VERSION_IR>[.O].mtb
+    """
+    dossier, nom = os.path.split(os.path.abspath(chemin_ts))
+    suffixe = '.O' if optimise else ''
+    return os.path.join(dossier, DOSSIER_CACHE, f"{nom}.ir{VERSION_IR}{suffixe}{EXTENSION}")
+
+
+def compiler(chemin_ts, sortie=None, optimise=True, diese_obligatoire=False):
+    """
+    Compile un fichier .TS en artefact (par défaut dans le cache).
+    Retourne le chemin écrit, ou None en cas d'erreur d'analyse.
+    """
+    with open(chemin_ts, 'rb') as f:
+        octets = f.read()
+    programme = compiler_octets(octets, optimise, diese_obligatoire)
+    if programme is None:
+        return None
+    if sortie is None:
+        sortie = chemin_cache(chemin_ts, optimise)
+        os.makedirs(os.path.dirname(sortie), exist_ok=True)
+    ecrire(sortie, programme, empreinte(octets), _options(optimise, diese_obligatoire))
+    return sortie
+
+
+def programme_cache(chemin_ts, optimise=True, diese_obligatoire=False):
+    """
+    Programme d'un fichier .TS, relu depuis le cache si le source n'a pas
+    changé, sinon compilé puis mis en cache. Retourne None en cas d'erreur
+    d'analyse. Un cache non inscriptible n'empêche pas l'exécution.
+    """
+    with open(chemin_ts, 'rb') as f:
+        octets = f.read()
+    source_hash = empreinte(octets)
+    options = _options(optimise, diese_obligatoire)
+    chemin = chemin_cache(chemin_ts, optimise)
+    try:
+        return charger(chemin, source_hash, options)
+    except (OSError, ArtefactInvalide):
+        pass
+    programme = compiler_octets(octets, optimise, diese_obligatoire)
+    if programme is not None:
+        try:
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            ecrire(chemin, programme, source_hash, options)
+        except OSError:
+            pass
+    return programme
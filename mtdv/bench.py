@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Mesures de performance des traducteurs MTdV.
+
+Utilisation :
+    python3 -m mtdv.bench parseur [--tokens 1000000]
+    python3 -m mtdv.bench memoire [--tokens 100000]
+    python3 -m mtdv.bench optim [--dossier programmesTS]
+    python3 -m mtdv.bench trampoline [--fichier programmesTS/multiplicateur.1.TS]
+    python3 -m mtdv.bench local [--dossier programmesTS] [--n 8]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+from .ir import construire_programme, programme_depuis_lignes
+from .lexeur import lire_lignes, tokeniser
+from .moteur import execute
+from .optim import compter_instructions, lucarne, reconnaitre_recherches
+from .ruban import RubanPagine
+from .syntaxe import analyse_P0
+
+# 10 tokens : boucle D si(1) fin } } 0 G 1 D
+_MOTIF = "boucle D si (1) fin } }\n0 G 1 D\n"
+_TOKENS_PAR_MOTIF = 10
+
+
+def programme_synthetique(n_tokens):
+    """
+    Texte .TS d'environ n_tokens tokens, terminé par '#'.
+    """
+    n = max(1, n_tokens // _TOKENS_PAR_MOTIF)
+    return "% programme synthétique\n" + _MOTIF * n + "#\n"
+
+
+def _chrono(f, *args):
+    t0 = time.perf_counter()
+    res = f(*args)
+    return res, time.perf_counter() - t0
+
+
+def bench_parseur(n_max):
+    """
+    Lexeur + analyse P0 sur des tailles croissantes, jusqu'à n_max tokens.
+    Le temps par token doit rester à peu près constant (linéaire) et la
+    limite de récursion n'est jamais modifiée.
+    """
+    limite = sys.getrecursionlimit()
+    print(f"limite de récursion : {limite}")
+    print(f"{'tokens':>10} {'lexeur (s)':>11} {'P0 (s)':>9} {'ns/token':>9}")
+    n = 1000
+    while n <= n_max:
+        txt = programme_synthetique(n)
+        lexemes, t_lex = _chrono(tokeniser, txt)
+        parse_result = []
+        ok, t_p0 = _chrono(analyse_P0, lexemes.tokens, parse_result)
+        if not ok or len(parse_result) != len(lexemes):
+            print(f"ÉCHEC pour {n} tokens")
+            return 1
+        total = len(parse_result)
+        print(f"{total:>10} {t_lex:>11.3f} {t_p0:>9.3f} {1e9 * (t_lex + t_p0) / total:>9.0f}")
+        n *= 10
+    assert sys.getrecursionlimit() == limite
+    return 0
+
+
+def _arbre_dicts(tokens):
+    """
+    Ancienne représentation (un dictionnaire par token), pour comparaison.
+    """
+    root = {"type": "root", "content": []}
+    pile = [root]
+    for tok in tokens:
+        if tok == '}':
+            pile.pop()
+        elif tok == 'boucle':
+            bloc = {"type": "boucle", "content": []}
+            pile[-1]["content"].append(bloc)
+            pile.append(bloc)
+        elif tok in ('si(0)', 'si(1)'):
+            bloc = {"type": "si", "condition": int(tok[3]), "content": []}
+            pile[-1]["content"].append(bloc)
+            pile.append(bloc)
+        elif tok == 'fin':
+            pile[-1]["content"].append({"type": "fin"})
+        elif tok == '#':
+            pile[-1]["content"].append({"type": "endfile"})
+        else:
+            pile[-1]["content"].append({"type": "instruction", "value": tok})
+    return root["content"]
+
+
+def _memoire(f, *args):
+    tracemalloc.start()
+    res = f(*args)
+    taille = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return res, taille
+
+
+def bench_memoire(n):
+    """
+    Mémoire occupée par l'arbre de dictionnaires et par mtdv.ir.Programme.
+    """
+    lexemes = tokeniser(programme_synthetique(n))
+    _, t_dicts = _memoire(_arbre_dicts, lexemes.tokens)
+    prog, t_ir = _memoire(construire_programme, lexemes)
+    print(f"tokens : {len(lexemes)}")
+    print(f"arbre de dictionnaires : {t_dicts / len(lexemes):8.1f} octets/token")
+    print(f"Programme (mtdv.ir)    : {t_ir / len(prog):8.1f} octets/token")
+    print(f"rapport                : {t_dicts / t_ir:8.1f}x")
+    return 0
+
+
+def _fichiers_ts(dossier):
+    # Programmes du dossier, extension .TS ou .ts (ajout3batons.1.ts, truc.ts)
+    fichiers = glob.glob(os.path.join(dossier, '*.TS')) + glob.glob(os.path.join(dossier, '*.ts'))
+    return sorted(set(fichiers))
+
+
+def bench_optim(dossier):
+    """
+    Nombre d'instructions ('}' non compris) de chaque programme .TS du
+    dossier, avant optimisation, après reconnaissance des boucles de
+    recherche, puis après la passe à lucarne.
+    """
+    print(f"{'programme':<28} {'avant':>6} {'recherche':>10} {'lucarne':>8} {'gain':>6}")
+    for chemin in _fichiers_ts(dossier):
+        with contextlib.redirect_stdout(io.StringIO()):
+            prog = programme_depuis_lignes(lire_lignes(chemin), diese_obligatoire=False)
+        if prog is None:
+            print(f"{os.path.basename(chemin):<28} analyse impossible")
+            continue
+        recherche = reconnaitre_recherches(prog)
+        final = lucarne(recherche)
+        avant = compter_instructions(prog)
+        apres = compter_instructions(final)
+        print(f"{os.path.basename(chemin):<28} {avant:>6} {compter_instructions(recherche):>10} "
+              f"{apres:>8} {100 * (avant - apres) / max(avant, 1):>5.0f}%")
+    return 0
+
+
+def _executer_traduction(code, saisies):
+    # Code généré par traducteur_2.py, saisies fournies à input(), sans affichage
+    valeurs = iter(saisies)
+    ns = {'__name__': 'mtdv.bench', 'input': lambda *_: next(valeurs, '')}
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(code, ns)
+        ns['execute_program']()
+    return ns['tape']
+
+
+def bench_trampoline(chemin, n_max=64):
+    """
+    Code généré par traducteur_2.py (trampoline) exécuté sur n x n, n
+    croissant, comparé à l'interprète mtdv.moteur. Avec l'ancien schéma
+    (une fonction récursive par boucle), tout programme dépassant environ
+    1000 tours de boucle s'arrêtait sur RecursionError.
+    """
+    racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if racine not in sys.path:
+        sys.path.insert(0, racine)
+    from traducteur_2 import MTdVTranslator
+
+    lignes = lire_lignes(chemin)
+    prog = programme_depuis_lignes(lignes, diese_obligatoire=False)
+    traducteur = MTdVTranslator()
+    code = compile(traducteur.generate_python_code(traducteur.parse_ts_lines(lignes)), chemin, 'exec')
+    print(f"limite de récursion : {sys.getrecursionlimit()}")
+    print(f"{'n x n':>9} {'pas':>10} {'traduit (s)':>12} {'ns/pas':>7} {'interprète (s)':>15}")
+    n = 4
+    while n <= n_max:
+        # deux plages de n+1 bâtons (codage unaire de n), séparées par une case vide
+        saisies = [30, n + 1, 32 + n, n + 1]
+        tape, t_trad = _chrono(_executer_traduction, code, saisies)
+        ruban = RubanPagine()
+        ruban.remplir(30, 31 + n)
+        ruban.remplir(32 + n, 33 + 2 * n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            res, t_moteur = _chrono(execute, prog, ruban, 30, False)
+        if tape.compter() != res.tape.compter():
+            print(f"ÉCHEC pour n = {n}")
+            return 1
+        print(f"{f'{n}x{n}':>9} {res.pas:>10} {t_trad:>12.3f} {1e9 * t_trad / res.pas:>7.0f} {t_moteur:>15.3f}")
+        n *= 2
+    return 0
+
+
+def _preparer_traduction(code, saisies):
+    # Module généré chargé (sans l'exécuter), saisies fournies à input(), sans affichage
+    valeurs = iter(saisies)
+    ns = {'__name__': 'mtdv.bench', 'input': lambda *_: next(valeurs, ''), 'print': lambda *a, **k: None}
+    exec(code, ns)
+    return ns
+
+
+def bench_local(dossier, n=8, repetitions=3, pas_max=10**7):
+    """
+    Code généré par traducteur_1.py en mode par défaut (globales, machine à
+    états sur les blocs de base) et en mode --local (une fonction à variables
+    locales, ruban à sentinelles), ainsi que par traducteur_2.py (globales,
+    trampoline), sur chaque programme du dossier avec les deux plages de n+1
+    bâtons de bench_trampoline. Meilleur temps de execute_program sur
+    repetitions exécutions ; '*' marque un ruban ou une tête finale
+    différents de ceux de l'interprète mtdv.moteur. Un programme qui ne
+    s'arrête pas en pas_max pas n'est pas exécuté.
+    """
+    racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if racine not in sys.path:
+        sys.path.insert(0, racine)
+    import traducteur_1
+    import traducteur_2
+
+    saisies = [30, n + 1, 32 + n, n + 1]
+    variantes = (("tr1 défaut", traducteur_1, {}), ("tr2", traducteur_2, {}),
+                 ("tr1 --local", traducteur_1, {'local': True}))
+    print(f"{n + 1} + {n + 1} bâtons, meilleur de {repetitions} exécutions (secondes)")
+    print(f"{'programme':<22} {'pas':>9}" + "".join(f" {nom:>12}" for nom, _, _ in variantes)
+          + f" {'tr2/local':>10}")
+    for chemin in _fichiers_ts(dossier):
+        nom = os.path.basename(chemin)
+        lignes = lire_lignes(chemin)
+        with contextlib.redirect_stdout(io.StringIO()):
+            prog = programme_depuis_lignes(lignes, diese_obligatoire=True)
+        if prog is None:
+            print(f"{nom:<22} analyse impossible (traducteur_1 exige le # final)")
+            continue
+        ruban = RubanPagine()
+        ruban.remplir(saisies[0], saisies[0] + saisies[1])
+        ruban.remplir(saisies[2], saisies[2] + saisies[3])
+        with contextlib.redirect_stdout(io.StringIO()):
+            res = execute(prog, ruban, 30, False, pas_max)
+        attendu = (res.head, res.tape.etendue(), res.tape.compter())
+        colonnes = []
+        temps = {}
+        for titre, module, options in variantes:
+            if res.motif is not None:
+                colonnes.append(f" {'-':>12}")
+                continue
+            traducteur = module.MTdVTranslator(**options)
+            with contextlib.redirect_stdout(io.StringIO()):
+                code = compile(traducteur.generate_python_code(traducteur.parse_ts_lines(lignes)), chemin, 'exec')
+            meilleur = None
+            for _ in range(repetitions):
+                ns = _preparer_traduction(code, saisies)
+                final, t = _chrono(ns['execute_program'])
+                meilleur = t if meilleur is None else min(meilleur, t)
+            if options.get('local'):
+                t_final, origine, head = final
+                obtenu, head = RubanPagine(t_final, -origine), head - origine
+            else:
+                obtenu, head = ns['tape'], ns['head']
+            temps[titre] = meilleur
+            marque = ' ' if (head, obtenu.etendue(), obtenu.compter()) == attendu else '*'
+            colonnes.append(f" {meilleur:>11.6f}{marque}")
+        pas = f"{res.pas}" if res.motif is None else "sans fin"
+        gain = f"{temps['tr2'] / temps['tr1 --local']:>9.1f}x" if temps else f"{'-':>10}"
+        print(f"{nom:<22} {pas:>9}" + "".join(colonnes) + f" {gain}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python3 -m mtdv.bench", description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="mesure", required=True)
+    p = sub.add_parser("parseur", help="lexeur + analyse P0 jusqu'à 10^6 tokens")
+    p.add_argument("--tokens", type=int, default=10**6)
+    p = sub.add_parser("memoire", help="mémoire de l'arbre de dictionnaires vs mtdv.ir")
+    p.add_argument("--tokens", type=int, default=10**5)
+    p = sub.add_parser("optim", help="instructions avant/après mtdv.optim pour chaque .TS")
+    p.add_argument("--dossier", default="programmesTS")
+    p = sub.add_parser("trampoline", help="code généré par traducteur_2.py sur n x n, n croissant")
+    p.add_argument("--fichier", default="programmesTS/multiplicateur.1.TS")
+    p.add_argument("--n-max", type=int, default=64)
+    p = sub.add_parser("local", help="traducteur_1.py --local vs mode par défaut et traducteur_2.py, pour chaque .TS")
+    p.add_argument("--dossier", default="programmesTS")
+    p.add_argument("--n", type=int, default=8)
+    args = parser.parse_args(argv)
+    if args.mesure == "parseur":
+        return bench_parseur(args.tokens)
+    if args.mesure == "memoire":
+        return bench_memoire(args.tokens)
+    if args.mesure == "optim":
+        return bench_optim(args.dossier)
+    if args.mesure == "trampoline":
+        return bench_trampoline(args.fichier, args.n_max)
+    if args.mesure == "local":
+        return bench_local(args.dossier, args.n)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
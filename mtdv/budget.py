@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Budget d'exécution (nombre de pas, délai) dans le code généré par les
+traducteurs 1 et 2.
+
+Le code généré compte les pas comme mtdv.moteur et aux mêmes points de
+contrôle ('boucle', '}', 'fin', '#') : les pas des instructions qui
+précèdent un point de contrôle lui sont ajoutés d'un coup (CompteurPas),
+puis un seul entier est comparé à SEUIL ; l'horloge et la limite ne sont
+consultées que lorsque SEUIL est atteint, au plus une fois tous les
+PAS_VERIF pas. Au dépassement, le programme s'arrête sur la même case et
+au même pas que mtdv.moteur, affiche le même résultat JSON que
+mtdv.multi.resume et sort avec le code 3. Une recherche sans issue (-O)
+s'arrête comme sa boucle d'origine au dépassement de PAS_MAX, ou aussitôt
+sans PAS_MAX (statut 'sans_fin', code 3 également).
+
+Les valeurs choisies à la traduction peuvent être remplacées à l'exécution
+par les variables d'environnement MTDV_PAS_MAX et MTDV_DELAI.
+
+En mode --local de traducteur_1.py (source_budget(..., local=True),
+CompteurPas(local=True)), le compteur et le seuil sont des variables
+locales (pas, seuil) de execute_program, et verifier_budget reçoit le ruban
+à sentinelles.
+"""
+
+from .ir import OP_DEPLACE
+from .moteur import PAS_VERIF
+
+CODE_SORTIE = 3
+
+_ENTETE = '''\
+# Budget d'exécution (mtdv/budget.py) : MTDV_PAS_MAX, MTDV_DELAI
+import json
+import os
+import time
+PAS_MAX = int(os.environ.get('MTDV_PAS_MAX', '{pas_max}')) or None
+DELAI = float(os.environ.get('MTDV_DELAI', '{delai}')) or None
+ECHEANCE = time.monotonic() + DELAI if DELAI else None
+'''
+
+_SOURCE = '''\
+PAS = 0
+
+def prochain_seuil():
+    seuil = PAS_MAX if PAS_MAX is not None else float('inf')
+    if ECHEANCE is not None:
+        seuil = min(seuil, PAS + {pas_verif})
+    return seuil
+
+SEUIL = prochain_seuil()
+
+def verifier_budget():
+    global SEUIL
+    if PAS_MAX is not None and PAS >= PAS_MAX:
+        arret_budget('pas')
+    if ECHEANCE is not None and time.monotonic() >= ECHEANCE:
+        arret_budget('delai')
+    SEUIL = prochain_seuil()
+
+def arret_budget(motif):
+    # résultat JSON de mtdv.multi.resume ('sans_fin' : recherche sans issue)
+    res = {{'tete': head, 'pas': PAS, 'statut': 'sans_fin' if motif == 'sans_fin' else 'limite'}}
+    if motif != 'sans_fin':
+        res['motif'] = motif
+    e = tape.etendue()
+    res['batons'] = tape.compter()
+    res['etendue'] = list(e) if e else None
+    if e and e[1] - e[0] < 256:
+        res['ruban'] = ''.join(str(x) for x in tape.fenetre(e[0], e[1] + 1))
+    print(json.dumps(res))
+    sys.exit({code})
+
+def recherche_budget(pos, arg, sens, n):
+    # Recherche d'argument arg (mtdv.ir) partie de head, n pas après le point
+    # de contrôle précédent ('boucle' d'origine compris), pos : case trouvée
+    # ou None. Pas et arrêt de la boucle d'origine (mtdv.moteur._recherche).
+    global head, PAS
+    PAS = PAS + n
+    if PAS_MAX is not None and PAS >= PAS_MAX:
+        verifier_budget()
+    if pos is None and PAS_MAX is None:
+        arret_budget('sans_fin')
+    k = None if pos is None else abs(pos - head)
+    if k is None or PAS_MAX is not None and PAS + 3 * k + 2 - 2 * (arg >> 1) >= PAS_MAX:
+        # premier 'boucle', '}}' ou 'fin' de la boucle d'origine à PAS_MAX ou après
+        j = -(-(PAS_MAX - PAS) // 3)
+        s = 3 * j + 1
+        if k is not None and j > k:
+            j, s = k, 3 * k + 3
+        head = head + sens * j
+        PAS = PAS + s - 1
+        verifier_budget()
+    PAS = PAS + 3 * k + 2 - 2 * (arg >> 1)
+    return pos
+'''
+
+_SOURCE_LOCAL = '''\
+
+def prochain_seuil(pas):
+    seuil = PAS_MAX if PAS_MAX is not None else float('inf')
+    if ECHEANCE is not None:
+        seuil = min(seuil, pas + {pas_verif})
+    return seuil
+
+def verifier_budget(pas, t, origine, head):
+    # Prochain seuil, ou fin du programme (ruban à sentinelles : case p en t[origine + p])
+    if PAS_MAX is not None and pas >= PAS_MAX:
+        arret_budget('pas', pas, t, origine, head)
+    if ECHEANCE is not None and time.monotonic() >= ECHEANCE:
+        arret_budget('delai', pas, t, origine, head)
+    return prochain_seuil(pas)
+
+def arret_budget(motif, pas, t, origine, head):
+    # résultat JSON de mtdv.multi.resume ('sans_fin' : recherche sans issue)
+    res = {{'tete': head - origine, 'pas': pas, 'statut': 'sans_fin' if motif == 'sans_fin' else 'limite'}}
+    if motif != 'sans_fin':
+        res['motif'] = motif
+    e = (t.find(1) - origine, t.rfind(1) - origine) if t.find(1) >= 0 else None
+    res['batons'] = t.count(1)
+    res['etendue'] = list(e) if e else None
+    if e and e[1] - e[0] < 256:
+        res['ruban'] = ''.join(str(x) for x in t[e[0] + origine:e[1] + origine + 1])
+    print(json.dumps(res))
+    sys.exit({code})
+
+def recherche_budget(pos, arg, sens, pas, t, origine, head):
+    # Variante de mode --local : pos < 0 pour une recherche sans issue,
+    # pas compte déjà le 'boucle' d'origine ; retourne (tête, pas).
+    if PAS_MAX is not None and pas >= PAS_MAX:
+        verifier_budget(pas, t, origine, head)
+    if pos < 0 and PAS_MAX is None:
+        arret_budget('sans_fin', pas, t, origine, head)
+    k = None if pos < 0 else abs(pos - head)
+    if k is None or PAS_MAX is not None and pas + 3 * k + 2 - 2 * (arg >> 1) >= PAS_MAX:
+        j = -(-(PAS_MAX - pas) // 3)
+        s = 3 * j + 1
+        if k is not None and j > k:
+            j, s = k, 3 * k + 3
+        verifier_budget(pas + s - 1, t, origine, head + sens * j)
+    return pos, pas + 3 * k + 2 - 2 * (arg >> 1)
+'''
+
+
+def source_budget(pas_max=None, delai=None, local=False):
+    """
+    Définitions à placer en tête du code généré (après le ruban et 'import sys') ;
+    local : variante du mode --local (voir l'en-tête du module).
+    """
+    return (_ENTETE + (_SOURCE_LOCAL if local else _SOURCE)).format(
+        pas_max=pas_max or 0, delai=delai or 0, pas_verif=PAS_VERIF, code=CODE_SORTIE)
+
+
+class CompteurPas:
+    """
+    Pas des instructions traduites depuis le dernier point de contrôle
+    ('boucle', '}', 'fin', '#'), en attente d'être ajoutés au compteur du
+    code généré (PAS, ou pas avec local). Au point de contrôle suivant, le
+    compteur vaut exactement le nombre de pas de mtdv.moteur au même point.
+
+    Un traducteur appelle instruction() pour chaque instruction traduite et
+    place les lignes de controle() à chaque point de contrôle. Un 'si'
+    laisse ses pas en attente dans la branche 'condition vraie' (jusqu'à
+    son '}') : la branche 'condition fausse' reçoit les lignes de si().
+    """
+
+    def __init__(self, local=False):
+        self.local = local
+        self.attente = 0
+
+    def instruction(self, op, arg=0):
+        # un OP_DEPLACE de d cases compte |d| pas, comme dans mtdv.moteur
+        self.attente += abs(arg) if op == OP_DEPLACE else 1
+
+    def _ajout(self, n):
+        return f"pas += {n}" if self.local else f"PAS = PAS + {n}"
+
+    def vider(self):
+        """
+        Lignes qui ajoutent les pas en attente au compteur, sans vérification
+        (saut vers un autre bloc ailleurs qu'à un point de contrôle).
+        """
+        n, self.attente = self.attente, 0
+        return [self._ajout(n)] if n else []
+
+    def controle(self):
+        """
+        Lignes d'un point de contrôle : ajouter ses pas, comparer au seuil.
+        """
+        self.attente += 1
+        lignes = self.vider()
+        if self.local:
+            return lignes + ["if pas >= seuil:",
+                             "    seuil = verifier_budget(pas, t, origine, head)"]
+        return lignes + ["if PAS >= SEUIL:",
+                         "    verifier_budget()"]
+
+    def si(self):
+        """
+        Compte un 'si' ; lignes de sa branche 'condition fausse', qui saute
+        son corps et son '}'.
+        """
+        self.attente += 1
+        return [self._ajout(self.attente)]
+
+    def recherche(self, position, arg, sens):
+        """
+        Lignes d'une recherche d'argument arg (mtdv.ir) : position est
+        l'expression de la case trouvée (None, ou < 0 avec local, si aucune).
+        recherche_budget compte les pas de sa boucle d'origine et l'arrête
+        comme mtdv.moteur au dépassement.
+        """
+        self.attente += 1
+        n, self.attente = self.attente, 0
+        if self.local:
+            return [f"head, pas = recherche_budget({position}, {arg}, {sens}, pas + {n}, t, origine, head)"]
+        return [f"head = recherche_budget({position}, {arg}, {sens}, {n})"]
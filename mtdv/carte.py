@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Cartes de correspondance (source maps) du code généré vers le fichier .TS.
+
+Pendant la génération, un traducteur fait passer chaque ligne par une
+CarteSource et lui indique l'élément du Programme en cours de traduction
+(placer) : la carte retient pour chaque ligne générée la position (ligne,
+colonne) de cet élément dans le .TS, et peut ajouter à la ligne un
+commentaire '# ts:ligne:colonne' (marqueurs).
+
+Fichier annexe output.py.map (JSON) :
+  {"version": 1, "source": "programme.TS", "genere": "output.py",
+   "lignes": [ligne générée, ligne .TS, colonne .TS, ...]}
+un triplet à chaque changement de position ; une ligne générée prend la
+position du dernier triplet qui la précède, une position 0 (en-tête,
+fonctions recopiées depuis mtdv/) n'a pas de correspondance.
+
+Pour les traducteurs 3 et 4, seules les lignes du n-uplet du programme ont
+une position (celle de leur première instruction) : ce code s'exécute dans
+des fonctions communes à tous les programmes, dont les lignes n'ont pas de
+correspondance.
+
+retraduire() réécrit dans un texte les positions 'output.py:412' (pstats,
+py-spy, ...) et 'File "output.py", line 412' (tracebacks) en positions
+.TS ; 'python3 -m mtdv carte' en fait un filtre.
+"""
+
+import bisect
+import json
+import os
+import re
+from array import array
+
+VERSION_CARTE = 1
+EXTENSION_CARTE = '.map'
+
+
+class CarteSource:
+    """
+    Carte en cours de construction pour le Programme prog (voir l'en-tête).
+    """
+    __slots__ = ('prog', 'marqueurs', 'sortie', 'numero', 'position', 'generees', 'lignes', 'colonnes')
+
+    def __init__(self, prog, marqueurs=False):
+        self.prog = prog
+        self.marqueurs = marqueurs
+        self.sortie = None
+        self.numero = 0
+        self.position = None
+        self.generees = array('i')
+        self.lignes = array('i')
+        self.colonnes = array('i')
+
+    def placer(self, i=None):
+        """
+        Les lignes suivantes viennent de l'élément i du Programme (None :
+        sans correspondance).
+        """
+        self.position = None if i is None else (self.prog.lignes[i], self.prog.colonnes[i])
+
+    def ligne(self, texte):
+        """
+        Enregistre la ligne générée texte (sans '\\n') ; retourne le texte
+        à écrire, avec son marqueur éventuel.
+        """
+        self.numero += 1
+        l, c = self.position or (0, 0)
+        if not self.lignes or self.lignes[-1] != l or self.colonnes[-1] != c:
+            self.generees.append(self.numero)
+            self.lignes.append(l)
+            self.colonnes.append(c)
+        if self.marqueurs and l and texte.strip():
+            return f"{texte}  # ts:{l}:{c}"
+        return texte
+
+    def suivre(self, ecrire):
+        """
+        Puits de lignes qui enregistre chaque ligne puis la passe à ecrire.
+        """
+        self.sortie = ecrire
+        return self.ecrire
+
+    def ecrire(self, texte):
+        self.sortie(self.ligne(texte))
+
+    def vers_dict(self, source, genere):
+        triplets = []
+        for g, l, c in zip(self.generees, self.lignes, self.colonnes):
+            triplets += (g, l, c)
+        return {'version': VERSION_CARTE, 'source': source, 'genere': os.path.basename(genere),
+                'lignes': triplets}
+
+    def ecrire_fichier(self, source, genere):
+        """
+        Écrit la carte à côté du fichier généré (genere + '.map') ; retourne
+        son chemin.
+        """
+        chemin = genere + EXTENSION_CARTE
+        with open(chemin, 'w', encoding='utf-8', buffering=1 << 16) as f:
+            json.dump(self.vers_dict(source, genere), f)
+        return chemin
+
+
+class Carte:
+    """
+    Carte relue depuis un fichier .map : position(ligne générée).
+    """
+    __slots__ = ('source', 'genere', 'generees', 'lignes', 'colonnes')
+
+    def __init__(self, d):
+        if not isinstance(d, dict) or d.get('version') != VERSION_CARTE:
+            raise ValueError("carte de correspondance invalide ou d'une autre version")
+        self.source = d['source']
+        self.genere = d['genere']
+        triplets = d['lignes']
+        self.generees = array('i', triplets[0::3])
+        self.lignes = array('i', triplets[1::3])
+        self.colonnes = array('i', triplets[2::3])
+
+    def position(self, ligne):
+        """
+        (ligne, colonne) dans le .TS de la ligne générée, ou None.
+        """
+        k = bisect.bisect_right(self.generees, ligne) - 1
+        if k < 0 or not self.lignes[k]:
+            return None
+        return self.lignes[k], self.colonnes[k]
+
+
+def lire_carte(chemin):
+    with open(chemin, encoding='utf-8') as f:
+        return Carte(json.load(f))
+
+
+def motif_cartes(cartes):
+    """
+    Expression régulière des positions 'chemin/genere:ligne' et
+    'chemin/genere", line ligne' des fichiers générés des cartes.
+    """
+    noms = "|".join(re.escape(c.genere) for c in cartes)
+    return re.compile(r'(?P<chemin>(?:[^\s"\'(:]*[/\\])?)(?P<nom>' + noms + r')'
+                      r'(?P<sep>:|", line )(?P<ligne>\d+)')
+
+
+def retraduire(texte, cartes, motif=None):
+    """
+    texte avec les positions du code généré remplacées par les positions .TS
+    des cartes ; les lignes sans correspondance restent telles quelles.
+    """
+    par_nom = {c.genere: c for c in cartes}
+    motif = motif or motif_cartes(cartes)
+
+    def remplacer(m):
+        carte = par_nom[m.group('nom')]
+        pos = carte.position(int(m.group('ligne')))
+        if pos is None:
+            return m.group()
+        if m.group('sep') == ':':
+            return f"{carte.source}:{pos[0]}:{pos[1]}"
+        return f'{carte.source}", line {pos[0]}, colonne {pos[1]}'
+
+    return motif.sub(remplacer, texte)
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+Représentation intermédiaire compacte des programmes MTdV.
+
+Au lieu d'un arbre de dictionnaires ({"type":"instruction","value":"D"} par
+token), un programme est stocké dans des tableaux parallèles :
+  - ops      : array('b'), un code d'opération par token
+  - args     : array('i'), pour 'boucle'/'si' l'index du '}' correspondant,
+               pour '}' l'index de l'ouvrant, pour 'fin' l'index du '}' de
+               la boucle englobante (-1 hors de toute boucle => arrêt)
+  - lignes, colonnes : position du token dans le fichier .TS
+La classe Noeud donne une vue (sans copie) sur un élément, pour les
+générateurs de code et l'outillage.
+"""
+
+from array import array
+
+from .lexeur import tokeniser_flux
+
+# Codes d'opération
+OP_I = 0
+OP_P = 1
+OP_G = 2
+OP_D = 3
+OP_0 = 4
+OP_1 = 5
+OP_FIN = 6
+OP_BOUCLE = 7
+OP_SI0 = 8
+OP_SI1 = 9
+OP_FERME = 10
+OP_DIESE = 11
+# Produits par les passes d'optimisation (mtdv.optim), jamais par le lexeur.
+# args = symbole cherché | (avance << 1) : avance=1 si la tête bouge avant le premier test
+OP_CHERCHE_D = 12
+OP_CHERCHE_G = 13
+# args = déplacement relatif de la tête (suite de G/D regroupée)
+OP_DEPLACE = 14
+
+# À incrémenter à chaque changement des opcodes, de leurs arguments ou des
+# passes de mtdv.optim : invalide les artefacts compilés (mtdv.artefact).
+VERSION_IR = 1
+
+OP_DE_TOKEN = {
+    'I': OP_I, 'P': OP_P, 'G': OP_G, 'D': OP_D, '0': OP_0, '1': OP_1,
+    'fin': OP_FIN, 'boucle': OP_BOUCLE, 'si(0)': OP_SI0, 'si(1)': OP_SI1,
+    '}': OP_FERME, '#': OP_DIESE,
+}
+TOKEN_DE_OP = {op: tok for tok, op in OP_DE_TOKEN.items()}
+TOKEN_DE_OP.update({OP_CHERCHE_D: 'chercheD', OP_CHERCHE_G: 'chercheG', OP_DEPLACE: 'deplace'})
+
+OUVRANTS = (OP_BOUCLE, OP_SI0, OP_SI1)
+INSTRUCTIONS = (OP_I, OP_P, OP_G, OP_D, OP_0, OP_1)
+
+# Correspondance avec l'ancien champ "type" des dictionnaires
+TYPE_DE_OP = {
+    OP_I: "instruction", OP_P: "instruction", OP_G: "instruction",
+    OP_D: "instruction", OP_0: "instruction", OP_1: "instruction",
+    OP_FIN: "fin", OP_BOUCLE: "boucle", OP_SI0: "si", OP_SI1: "si",
+    OP_FERME: "}", OP_DIESE: "endfile",
+    OP_CHERCHE_D: "recherche", OP_CHERCHE_G: "recherche",
+    OP_DEPLACE: "instruction",
+}
+
+
+class Programme:
+    """
+    Programme MTdV sous forme de tableaux parallèles (voir l'en-tête du module).
+    """
+    __slots__ = ('ops', 'args', 'lignes', 'colonnes')
+
+    def __init__(self):
+        self.ops = array('b')
+        self.args = array('i')
+        self.lignes = array('i')
+        self.colonnes = array('i')
+
+    def __len__(self):
+        return len(self.ops)
+
+    def noeud(self, i):
+        return Noeud(self, i)
+
+    def racine(self):
+        """
+        Itère sur les noeuds de niveau supérieur.
+        """
+        return _iter_bloc(self, 0, len(self.ops))
+
+
+class Noeud:
+    """
+    Vue légère sur l'élément d'index `index` d'un Programme.
+    """
+    __slots__ = ('programme', 'index')
+
+    def __init__(self, programme, index):
+        self.programme = programme
+        self.index = index
+
+    @property
+    def op(self):
+        return self.programme.ops[self.index]
+
+    @property
+    def type(self):
+        return TYPE_DE_OP[self.op]
+
+    @property
+    def value(self):
+        return TOKEN_DE_OP[self.op]
+
+    @property
+    def condition(self):
+        return 1 if self.op == OP_SI1 else 0
+
+    @property
+    def arg(self):
+        return self.programme.args[self.index]
+
+    @property
+    def fin_bloc(self):
+        return self.programme.args[self.index]
+
+    @property
+    def vide(self):
+        """
+        Vrai pour un bloc sans sous-instructions.
+        """
+        return self.programme.args[self.index] == self.index + 1
+
+    @property
+    def ligne(self):
+        return self.programme.lignes[self.index]
+
+    @property
+    def colonne(self):
+        return self.programme.colonnes[self.index]
+
+    def enfants(self):
+        """
+        Itère sur les sous-instructions d'un bloc 'boucle' / 'si'.
+        """
+        return _iter_bloc(self.programme, self.index + 1, self.programme.args[self.index])
+
+    def __repr__(self):
+        return f"<{TOKEN_DE_OP[self.op]} {self.ligne}:{self.colonne}>"
+
+
+def _iter_bloc(programme, debut, fin):
+    ops = programme.ops
+    args = programme.args
+    i = debut
+    while i < fin:
+        yield Noeud(programme, i)
+        if ops[i] in OUVRANTS:
+            i = args[i] + 1
+        else:
+            i += 1
+
+
+def construire_programme(lexemes, diese_obligatoire=True):
+    """
+    Construit un Programme à partir des lexèmes (Lexemes, ou tout itérable de
+    (token, ligne, colonne) comme tokeniser_flux), en un seul passage avec une
+    pile explicite des blocs ouverts. Mêmes règles que analyse_P0 :
+    diese_obligatoire=True exige un '#' au niveau 0 ; sinon un '#' à
+    n'importe quel niveau (ou la fin des tokens) termine le programme et les
+    blocs restés ouverts sont fermés implicitement.
+    Retourne None en cas d'erreur.
+    """
+    prog = Programme()
+    ops = prog.ops
+    args = prog.args
+    lignes = prog.lignes
+    colonnes = prog.colonnes
+    pile = []        # index des ouvrants non fermés
+    boucles = []     # pour chaque boucle ouverte : index des 'fin' à compléter
+    diese = None     # position du '#' final
+    for i, (tok, ligne, colonne) in enumerate(lexemes):
+        op = OP_DE_TOKEN[tok]
+        if op == OP_DIESE:
+            if pile and diese_obligatoire:
+                print(f"ERREUR : '#' à l'intérieur d'un bloc (ligne {ligne}).")
+                return None
+            diese = (ligne, colonne)
+            break
+        ops.append(op)
+        args.append(0)
+        lignes.append(ligne)
+        colonnes.append(colonne)
+        if op in OUVRANTS:
+            pile.append(i)
+            if op == OP_BOUCLE:
+                boucles.append([])
+        elif op == OP_FERME:
+            if not pile:
+                print(f"ERREUR : '}}' non apparié (ligne {ligne}, colonne {colonne}).")
+                return None
+            _fermer(prog, pile.pop(), i, boucles)
+        elif op == OP_FIN:
+            if boucles:
+                boucles[-1].append(i)
+            else:
+                args[i] = -1
+    if diese_obligatoire and diese is None:
+        print("ERREUR : '#' final manquant.")
+        return None
+    # Fermeture implicite des blocs restés ouverts (mode non strict)
+    while pile:
+        i = len(ops)
+        ops.append(OP_FERME)
+        args.append(0)
+        lignes.append(lignes[-1])
+        colonnes.append(colonnes[-1])
+        _fermer(prog, pile.pop(), i, boucles)
+    if diese is not None:
+        ops.append(OP_DIESE)
+        args.append(0)
+        lignes.append(diese[0])
+        colonnes.append(diese[1])
+    return prog
+
+
+def _fermer(prog, j, i, boucles):
+    """
+    Relie l'ouvrant j et le '}' i ; complète les 'fin' d'une boucle.
+    """
+    prog.args[j] = i
+    prog.args[i] = j
+    if prog.ops[j] == OP_BOUCLE:
+        for k in boucles.pop():
+            prog.args[k] = i
+
+
+def relier(prog):
+    """
+    Recalcule les liens de structure (ouvrants, '}', 'fin') d'un Programme
+    dont les opcodes ont été réécrits ; les arguments des autres opcodes
+    sont conservés.
+    """
+    args = prog.args
+    pile = []
+    boucles = []
+    for i, op in enumerate(prog.ops):
+        if op in OUVRANTS:
+            pile.append(i)
+            if op == OP_BOUCLE:
+                boucles.append([])
+        elif op == OP_FERME:
+            _fermer(prog, pile.pop(), i, boucles)
+        elif op == OP_FIN:
+            if boucles:
+                boucles[-1].append(i)
+            else:
+                args[i] = -1
+    return prog
+
+
+def contient_boucle(prog, i):
+    """
+    Vrai si le bloc de l'ouvrant i contient une 'boucle'.
+    """
+    return OP_BOUCLE in prog.ops[i + 1:prog.args[i]]
+
+
+def debuts_blocs(prog):
+    """
+    Débuts des blocs de base d'un Programme, par ordre croissant : début du
+    programme, corps de chaque boucle, sortie de boucle (cible d'un 'fin'),
+    suite d'un 'si' qui contient une boucle. Un bloc s'exécute sans boucle,
+    jusqu'au début d'un autre bloc ou à un saut ; une position >= len(prog)
+    est l'arrêt.
+    """
+    ops, args = prog.ops, prog.args
+    debuts = {0}
+    for i, op in enumerate(ops):
+        if op == OP_BOUCLE:
+            debuts.add(i + 1)
+        elif op == OP_FIN and args[i] >= 0:
+            debuts.add(args[i] + 1)
+        elif (op == OP_SI0 or op == OP_SI1) and contient_boucle(prog, i):
+            debuts.add(args[i] + 1)
+    return sorted(debuts)
+
+
+def programme_depuis_lignes(lines, diese_obligatoire=True):
+    """
+    Raccourci : lexeur + construction de la représentation compacte. lines
+    peut être un fichier ouvert ou lignes_fichier : l'entrée est lue une ligne
+    à la fois et seul le Programme est gardé en mémoire.
+    """
+    return construire_programme(tokeniser_flux(lines), diese_obligatoire)
+
+
+# Programme plat (code généré par les traducteurs 3 et 4) : deux entiers par
+# instruction, (code, cible). Les codes d'instruction sont ceux de l'IR ;
+# 'fin', le '}' d'une boucle et '#' deviennent un saut inconditionnel
+# PLAT_SAUT ; 'boucle' et le '}' d'un 'si' n'exécutent rien et disparaissent.
+PLAT_SAUT = OP_FIN
+PLAT_CODES = (OP_I, OP_P, OP_G, OP_D, OP_0, OP_1, OP_SI0, OP_SI1)
+
+
+def programme_plat(prog):
+    """
+    n-uplet d'entiers (code, cible, code, cible, ...) d'un Programme sans
+    opcodes d'optimisation. La cible (indice dans le n-uplet) est celle d'un
+    saut ou d'un 'si' dont la condition est fausse ; len(n-uplet) => arrêt.
+    """
+    ops, args = prog.ops, prog.args
+    n = len(ops)
+    # Position dans le n-uplet de chaque élément du programme ; un élément
+    # supprimé prend celle de l'élément conservé suivant, position[n] => arrêt
+    garde = _garde_plat(prog)
+    position = [0] * (n + 1)
+    k = 0
+    for i in range(n):
+        if garde[i]:
+            position[i] = k
+            k += 2
+    position[n] = k
+    for i in range(n - 1, -1, -1):
+        if not garde[i]:
+            position[i] = position[i + 1]
+    plat = []
+    for i, op in enumerate(ops):
+        if not garde[i]:
+            continue
+        if op == OP_SI0 or op == OP_SI1:
+            plat += (op, position[args[i] + 1])
+        elif op == OP_FIN:
+            plat += (PLAT_SAUT, position[args[i] + 1] if args[i] >= 0 else position[n])
+        elif op == OP_FERME:
+            plat += (PLAT_SAUT, position[args[i] + 1])
+        elif op == OP_DIESE:
+            plat += (PLAT_SAUT, position[n])
+        else:
+            plat += (op, 0)
+    return tuple(plat)
+
+
+def _garde_plat(prog):
+    # Éléments conservés dans le programme plat
+    ops, args = prog.ops, prog.args
+    return [op in PLAT_CODES or op == OP_FIN or op == OP_DIESE
+            or (op == OP_FERME and ops[args[i]] == OP_BOUCLE)
+            for i, op in enumerate(ops)]
+
+
+def indices_plats(prog):
+    """
+    Index dans prog de l'élément de chaque paire (code, cible) de
+    programme_plat(prog), dans l'ordre.
+    """
+    return [i for i, g in enumerate(_garde_plat(prog)) if g]
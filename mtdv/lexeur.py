@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Analyse lexicale MTdV en un seul passage.
+
+Toutes les alternatives sont réunies dans une seule expression régulière et
+le texte est parcouru par position (aucune copie du reste du texte), ce qui
+donne un temps linéaire en la taille du fichier. Chaque token est accompagné
+de sa ligne et de sa colonne (à partir de 1) dans le fichier source.
+"""
+
+import codecs
+import io
+import itertools
+import re
+from array import array
+
+# Une alternative par catégorie ; l'ordre compte ('si (0)' avant les tokens
+# simples, texte inconnu en dernier). Toute position du texte est couverte
+# par une alternative, donc finditer parcourt le texte sans trou.
+_LEXEME_RE = re.compile(r"""
+      (?P<blanc>\s+)
+    | (?P<commentaire>%[^\n]*)
+    | si\s*\(\s*(?P<si>[01])\s*\)
+    | (?P<mot>boucle|fin)
+    | (?P<simple>[#}IPGD01])
+    | (?P<inconnu>[^\n]+)
+""", re.VERBOSE)
+
+# Début de 'si (x)' en fin de texte : la suite peut être sur les lignes
+# suivantes (\s du motif 'si'), tokeniser_flux attend donc ces lignes
+_SI_COUPE_RE = re.compile(r"si\s*(?:\(\s*(?:[01]\s*)?)?")
+
+_NOMS_SI = {'0': 'si(0)', '1': 'si(1)'}
+_INTERNES = {t: t for t in ('#', '}', 'I', 'P', 'G', 'D', '0', '1', 'fin', 'boucle')}
+
+
+class Lexemes:
+    """
+    Résultat de l'analyse lexicale : la liste des tokens (mêmes noms que
+    l'ancien dictionnaire terminals_re) et leurs positions dans des tableaux
+    parallèles.
+    """
+    __slots__ = ('tokens', 'lignes', 'colonnes', 'inconnus')
+
+    def __init__(self):
+        self.tokens = []
+        self.lignes = array('i')
+        self.colonnes = array('i')
+        # (ligne, colonne, texte) des portions de ligne ignorées
+        self.inconnus = []
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def position(self, i):
+        return (self.lignes[i], self.colonnes[i])
+
+    def __iter__(self):
+        # Même flot (token, ligne, colonne) que tokeniser_flux
+        return zip(self.tokens, self.lignes, self.colonnes)
+
+
+def joindre_lignes(lines):
+    """
+    Reconstitue le texte à partir de lignes lues par readlines() (avec '\\n')
+    ou produites par splitlines() (sans '\\n'), sans décaler les numéros de ligne.
+    """
+    return "".join(l if l.endswith("\n") else l + "\n" for l in lines)
+
+
+def lire_lignes(chemin):
+    """
+    Lit un fichier .TS en essayant plusieurs encodages (les fichiers du cours
+    sont en ISO-8859-1).
+    """
+    with open(chemin, 'rb') as f:
+        return decoder_lignes(f.read())
+
+
+def lignes_fichier(chemin, taille_bloc=1 << 16):
+    """
+    Itère sur les lignes d'un fichier .TS sans le charger en entier (mêmes
+    encodages et mêmes fins de ligne que lire_lignes). Un premier passage par
+    blocs vérifie que le fichier est en UTF-8 ; sinon il est relu en latin-1.
+    """
+    decodeur = codecs.getincrementaldecoder('utf-8')()
+    enc = 'utf-8'
+    with open(chemin, 'rb') as f:
+        try:
+            for bloc in iter(lambda: f.read(taille_bloc), b''):
+                decodeur.decode(bloc)
+            decodeur.decode(b'', final=True)
+        except UnicodeDecodeError:
+            enc = 'latin-1'
+    with open(chemin, 'r', encoding=enc) as f:
+        yield from f
+
+
+def decoder_lignes(octets):
+    """
+    Lignes d'un contenu .TS déjà lu en binaire (mêmes encodages et même
+    traitement des fins de ligne que lire_lignes).
+    """
+    for enc in ('utf-8', 'latin-1', 'cp1252', 'iso-8859-1'):
+        try:
+            return io.TextIOWrapper(io.BytesIO(octets), encoding=enc).readlines()
+        except UnicodeDecodeError:
+            pass
+    return []
+
+
+def tokeniser(txt):
+    """
+    Découpe txt en tokens en O(n).
+      - les commentaires '%' vont jusqu'à la fin de la ligne
+      - un texte non reconnu est ignoré jusqu'à la fin de la ligne
+        (comme l'ancien tokeniseur), mais noté dans Lexemes.inconnus
+    """
+    res = Lexemes()
+    tokens = res.tokens
+    lignes = res.lignes
+    colonnes = res.colonnes
+    ligne = 1
+    debut_ligne = 0
+    for m in _LEXEME_RE.finditer(txt):
+        genre = m.lastgroup
+        debut = m.start()
+        if genre == 'blanc' or genre == 'si':
+            fin = m.end()
+            n = txt.count('\n', debut, fin)
+            if genre == 'si':
+                tokens.append(_NOMS_SI[m.group('si')])
+                lignes.append(ligne)
+                colonnes.append(debut - debut_ligne + 1)
+            if n:
+                ligne += n
+                debut_ligne = txt.rfind('\n', debut, fin) + 1
+        elif genre == 'commentaire':
+            continue
+        elif genre == 'inconnu':
+            res.inconnus.append((ligne, debut - debut_ligne + 1, m.group()))
+        else:
+            tokens.append(_INTERNES[m.group()])
+            lignes.append(ligne)
+            colonnes.append(debut - debut_ligne + 1)
+    return res
+
+
+def tokeniser_lignes(lines):
+    """
+    Raccourci : tokeniser(joindre_lignes(lines)).
+    """
+    return tokeniser(joindre_lignes(lines))
+
+
+def tokeniser_flux(lines, inconnus=None):
+    """
+    Version incrémentale de tokeniser : itère sur les (token, ligne, colonne)
+    en consommant lines (liste, fichier ouvert ou lignes_fichier) une ligne à
+    la fois, sans reconstituer le texte entier ni garder la liste des tokens.
+    Mêmes tokens et positions que tokeniser ; les portions de ligne ignorées
+    sont ajoutées à inconnus si cette liste est donnée.
+    """
+    ligne = 1
+    debut_ligne = 0     # index dans txt du début de la ligne courante (<= 0)
+    reste = ''          # début de 'si (x)' en attente de la ligne suivante
+    for l in itertools.chain(lines, (None,)):
+        if l is None:
+            # Fin de l'entrée : un 'si' resté incomplet est du texte ignoré
+            if not reste:
+                break
+            txt = reste
+        else:
+            txt = reste + (l if l.endswith("\n") else l + "\n")
+        lexemes = list(_LEXEME_RE.finditer(txt))
+        coupe = None
+        if l is not None:
+            for k in range(len(lexemes) - 1, -1, -1):
+                m = lexemes[k]
+                if m.lastgroup == 'inconnu' and _SI_COUPE_RE.fullmatch(txt, m.start()):
+                    coupe = m.start()
+                    del lexemes[k:]
+                    break
+        for m in lexemes:
+            genre = m.lastgroup
+            debut = m.start()
+            if genre == 'blanc' or genre == 'si':
+                fin = m.end()
+                n = txt.count('\n', debut, fin)
+                if genre == 'si':
+                    yield _NOMS_SI[m.group('si')], ligne, debut - debut_ligne + 1
+                if n:
+                    ligne += n
+                    debut_ligne = txt.rfind('\n', debut, fin) + 1
+            elif genre == 'commentaire':
+                continue
+            elif genre == 'inconnu':
+                if inconnus is not None:
+                    inconnus.append((ligne, debut - debut_ligne + 1, m.group()))
+            else:
+                yield _INTERNES[m.group()], ligne, debut - debut_ligne + 1
+        if coupe is None:
+            reste = ''
+            debut_ligne -= len(txt)
+        else:
+            reste = txt[coupe:]
+            debut_ligne -= coupe
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Traduction par lots : tous les .TS d'un dossier (ou d'un motif glob) avec
+l'un des traducteurs traducteur_1.py à traducteur_4.py, répartis sur un
+ProcessPoolExecutor.
+
+Un manifeste (MANIFESTE, dans le dossier de sortie) garde pour chaque
+fichier l'empreinte de son contenu, du traducteur (son script et les
+modules de mtdv dont dépend le code généré, MODULES_GENERATION) et des
+options : un fichier inchangé depuis le lot précédent n'est pas retraduit. Chaque
+fichier généré est accompagné de sa carte de correspondance (mtdv.carte).
+"""
+
+import contextlib
+import glob
+import hashlib
+import importlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .carte import CarteSource
+from .ir import VERSION_IR
+from .lexeur import decoder_lignes
+
+MANIFESTE = '.mtdv-lot.json'
+
+# Dossier des scripts traducteur_N.py (parent du paquet mtdv)
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules de mtdv dont dépend le code généré : analyse et IR, passes -O,
+# sources recopiées dans le code généré (ruban, affichage, budget, profil,
+# ruban persistant), PAS_VERIF du moteur, cartes de correspondance
+MODULES_GENERATION = ('lexeur', 'ir', 'optim', 'ruban', 'affichage', 'budget', 'moteur', 'profil',
+                      'persistant', 'carte')
+
+
+def lister_sources(entrees):
+    """
+    Fichiers .TS désignés par une liste de dossiers, fichiers ou motifs glob,
+    sans doublons, triés.
+    """
+    fichiers = set()
+    for entree in entrees:
+        if os.path.isdir(entree):
+            motifs = [os.path.join(entree, '*.TS'), os.path.join(entree, '*.ts')]
+        else:
+            motifs = [entree]
+        for motif in motifs:
+            fichiers.update(f for f in glob.glob(motif) if os.path.isfile(f))
+    return sorted(fichiers)
+
+
+def nom_sortie(chemin_ts):
+    """
+    addition.1.TS => addition.1.py
+    """
+    nom = os.path.basename(chemin_ts)
+    base, ext = os.path.splitext(nom)
+    return (base if ext.lower() == '.ts' else nom) + '.py'
+
+
+def _empreinte_traducteur(numero):
+    # Script du traducteur, modules de MODULES_GENERATION et VERSION_IR
+    h = hashlib.sha256(f"VERSION_IR={VERSION_IR}".encode())
+    chemins = [os.path.join(RACINE, f"traducteur_{numero}.py")]
+    chemins += [os.path.join(RACINE, 'mtdv', f"{nom}.py") for nom in MODULES_GENERATION]
+    for chemin in chemins:
+        with open(chemin, 'rb') as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def empreinte(octets, numero, options, empreinte_traducteur):
+    h = hashlib.sha256(octets)
+    h.update(f"|traducteur_{numero}|{empreinte_traducteur}|{json.dumps(options, sort_keys=True)}".encode())
+    return h.hexdigest()
+
+
+def traduire_lignes(numero, lines, options):
+    """
+    Code Python produit par traducteur_<numero> pour les lignes d'un .TS.
+    Lève ValueError si l'analyse échoue.
+    """
+    return _traduire(numero, lines, options)[0]
+
+
+def _traduire(numero, lines, options):
+    # (code, carte de correspondance mtdv.carte.CarteSource)
+    if RACINE not in sys.path:
+        sys.path.insert(0, RACINE)
+    module = importlib.import_module(f"traducteur_{numero}")
+    if numero in (1, 2):
+        translator = module.MTdVTranslator(options.get('bits', False), options.get('optimiser', False))
+    else:
+        translator = module.MTdVTranslator()
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        instructions = translator.parse_ts_lines(lines)
+    if len(instructions) == 0 and messages.getvalue().strip():
+        raise ValueError(messages.getvalue().strip().splitlines()[-1])
+    carte = CarteSource(instructions, options.get('marqueurs', False))
+    if numero in (1, 2):
+        return translator.generate_python_code(instructions, carte), carte
+    return "\n".join(map(carte.ligne, translator.generate_pure_function_code(instructions, carte))), carte
+
+
+def _traduire_fichier(numero, chemin_ts, chemin_py, options):
+    """
+    Tâche exécutée dans un processus du pool. Le code généré est écrit même
+    s'il ne compile pas (comme en mode fichier unique), mais l'erreur est
+    remontée dans le résumé.
+    """
+    t0 = time.perf_counter()
+    res = {'source': chemin_ts, 'sortie': chemin_py, 'erreur': None}
+    try:
+        with open(chemin_ts, 'rb') as f:
+            code, carte = _traduire(numero, decoder_lignes(f.read()), options)
+        with open(chemin_py, 'w', encoding='utf-8') as f:
+            f.write(code)
+        carte.ecrire_fichier(chemin_ts, chemin_py)
+        compile(code, chemin_py, 'exec')
+    except SyntaxError as e:
+        res['erreur'] = f"{type(e).__name__} ligne {e.lineno} : {e.msg}"
+    except Exception as e:
+        res['erreur'] = f"{type(e).__name__} : {e}"
+    res['duree'] = time.perf_counter() - t0
+    return res
+
+
+def _lire_manifeste(chemin):
+    try:
+        with open(chemin, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def traduire_lot(entrees, sortie, numero=1, options=None, processus=None, forcer=False):
+    """
+    Traduit tous les .TS désignés par entrees dans le dossier sortie.
+    Retourne la liste des résultats par fichier (dictionnaires : source,
+    sortie, statut 'traduit' / 'inchangé' / 'erreur', duree, erreur).
+    """
+    options = options or {}
+    os.makedirs(sortie, exist_ok=True)
+    chemin_manifeste = os.path.join(sortie, MANIFESTE)
+    manifeste = _lire_manifeste(chemin_manifeste)
+    empreinte_traducteur = _empreinte_traducteur(numero)
+
+    resultats = []
+    a_faire = []
+    for chemin_ts in lister_sources(entrees):
+        chemin_py = os.path.join(sortie, nom_sortie(chemin_ts))
+        cle = os.path.abspath(chemin_ts)
+        try:
+            with open(chemin_ts, 'rb') as f:
+                h = empreinte(f.read(), numero, options, empreinte_traducteur)
+        except OSError as e:
+            # illisible ou disparu depuis lister_sources : en erreur, comme dans _traduire_fichier
+            erreur = f"{type(e).__name__} : {e}"
+            manifeste[cle] = {'empreinte': None, 'statut': 'erreur', 'duree': 0.0, 'erreur': erreur}
+            resultats.append({'source': chemin_ts, 'sortie': chemin_py, 'statut': 'erreur',
+                              'duree': 0.0, 'erreur': erreur})
+            continue
+        precedent = manifeste.get(cle)
+        if (not forcer and precedent and precedent['empreinte'] == h
+                and precedent['statut'] == 'traduit' and os.path.exists(chemin_py)):
+            resultats.append({'source': chemin_ts, 'sortie': chemin_py, 'statut': 'inchangé',
+                              'duree': 0.0, 'erreur': None})
+        else:
+            a_faire.append((chemin_ts, chemin_py, cle, h))
+
+    with ProcessPoolExecutor(max_workers=processus) as pool:
+        taches = [(pool.submit(_traduire_fichier, numero, ts, py, options), cle, h)
+                  for ts, py, cle, h in a_faire]
+        for tache, cle, h in taches:
+            res = tache.result()
+            res['statut'] = 'erreur' if res['erreur'] else 'traduit'
+            manifeste[cle] = {'empreinte': h, 'statut': res['statut'],
+                              'duree': res['duree'], 'erreur': res['erreur']}
+            resultats.append(res)
+
+    tmp = f"{chemin_manifeste}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifeste, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, chemin_manifeste)
+    resultats.sort(key=lambda r: r['source'])
+    return resultats
+
+
+def afficher_resume(resultats, duree_totale):
+    """
+    Résumé du lot : une ligne par fichier, puis les totaux.
+    """
+    print(f"{'programme':<28} {'statut':<9} {'durée (ms)':>10}  erreur")
+    for r in resultats:
+        print(f"{os.path.basename(r['source']):<28} {r['statut']:<9} {1000 * r['duree']:>10.1f}  {r['erreur'] or ''}")
+    compte = {s: sum(1 for r in resultats if r['statut'] == s) for s in ('traduit', 'inchangé', 'erreur')}
+    print(f"{len(resultats)} fichier(s) : {compte['traduit']} traduit(s), {compte['inchangé']} inchangé(s), "
+          f"{compte['erreur']} en erreur, {duree_totale:.2f} s au total.")
@@ -0,0 +1,656 @@
+# -*- coding: utf-8 -*-
+"""
+Interprète MTdV en mémoire.
+
+Exécute directement un Programme (mtdv.ir), sans générer de fichier Python
+ni lancer un second interpréteur. Les cibles de saut sont précalculées une
+fois pour toutes ; la boucle principale ne fait qu'une comparaison d'entiers
+par instruction.
+
+Sémantique :
+  - 'boucle' ... '}' répète son contenu indéfiniment
+  - 'fin' sort de la boucle englobante la plus proche (arrêt hors boucle)
+  - 'si (x)' ... '}' n'exécute son contenu que si la case lue vaut x
+  - '#' (ou la fin du programme) arrête la machine
+
+Pas (Resultat.pas, pas_max) : une instruction du programme d'origine par
+pas. Les instructions regroupées par mtdv.optim comptent pour celles
+qu'elles remplacent : un OP_DEPLACE de d cases pour |d| pas, une recherche
+pour les pas de sa boucle d'origine (pas_recherche) ; pas_max interrompt
+une recherche au même pas et à la même case que la boucle d'origine, même
+une recherche sans issue (qui, sans pas_max ou avec cycles, s'arrête
+aussitôt : MOTIF_SANS_FIN). Seules les instructions que la passe à lucarne
+supprime (déplacements qui se compensent, écritures écrasées, 'si' résolus,
+code après 'fin') ne sont plus comptées avec -O.
+
+Détection de cycles (option cycles) : aux retours de boucle, la
+configuration (pc, tête, ruban) est comparée à un instantané repris selon
+l'algorithme de Brent (après 1, 2, 4, ... retours), donc en mémoire bornée
+par un seul ruban. La machine tourne indéfiniment si elle revient au même pc
+avec, autour des cases lues depuis l'instantané, le même contenu :
+  - tête au même endroit : mêmes cases lues et même contenu de ces cases ;
+  - tête décalée de d : contenu identique, décalé de d, de la case lue la
+    plus en arrière jusqu'à l'infini dans le sens du déplacement (la même
+    suite d'instructions se reproduit alors décalée de d, indéfiniment).
+Un programme dont la zone parcourue grandit à chaque tour dans les deux sens
+(01.1.TS) n'est pris ni par l'un ni par l'autre critère, et ne l'est pas
+davantage par une fenêtre locale bornée autour de la tête : une même
+configuration dans une fenêtre de taille fixe ne prouve rien dès que la
+machine lit au-delà (01.1.TS relit tout le ruban à chaque tour), et la
+signaler ferait passer pour 'sans_fin' des machines qui s'arrêtent. Ces
+programmes ne sont interrompus que par pas_max ou delai.
+
+Profil (option profil, voir mtdv.profil) : exécutions par élément et temps
+par boucle, dans une boucle d'interprétation à part ; les autres n'en
+comptent rien. De même pour la trace binaire (option trace, mtdv.trace).
+"""
+
+import sys
+import time
+
+from .affichage import afficher_ruban
+from .ir import (OP_0, OP_1, OP_BOUCLE, OP_CHERCHE_D, OP_CHERCHE_G, OP_D, OP_DEPLACE, OP_DIESE,
+                 OP_FERME, OP_FIN, OP_G, OP_I, OP_P, OP_SI0, OP_SI1)
+from .ruban import RubanPagine, classe_ruban
+
+TETE_INITIALE = 30
+# Avec un délai, l'horloge n'est lue qu'une fois tous les PAS_VERIF pas
+# (au passage d'une instruction de contrôle suivante).
+PAS_VERIF = 1 << 14
+
+# Motifs d'interruption (Resultat.motif)
+MOTIF_PAS = 'pas'            # budget de pas épuisé
+MOTIF_DELAI = 'delai'        # échéance dépassée
+MOTIF_SANS_FIN = 'sans_fin'  # non-terminaison établie (recherche sans issue, cycle) ; jamais pour une zone qui grandit
+
+
+class Resultat:
+    """
+    État final d'une exécution : ruban, position de la tête, nombre de pas.
+    motif vaut None si la machine s'est arrêtée, sinon la raison de
+    l'interruption (MOTIF_PAS, MOTIF_DELAI, MOTIF_SANS_FIN) ; le ruban est
+    alors l'instantané au moment de l'interruption. MOTIF_SANS_FIN n'est
+    qu'une preuve partielle : une machine sans fin dont la zone parcourue
+    grandit (01.1.TS) finit sur MOTIF_PAS ou MOTIF_DELAI, jamais sur
+    MOTIF_SANS_FIN.
+    """
+    __slots__ = ('tape', 'head', 'pas', 'motif')
+
+    def __init__(self, tape, head, pas, motif=None):
+        self.tape = tape
+        self.head = head
+        self.pas = pas
+        self.motif = motif
+
+    @property
+    def limite(self):
+        return self.motif is not None
+
+    def __repr__(self):
+        motif = f", motif={self.motif!r}" if self.motif else ""
+        return f"Resultat(head={self.head}, pas={self.pas}{motif})"
+
+
+class Moteur:
+    """
+    Programme préparé pour l'exécution : opcodes et cibles de saut dans des
+    listes (accès plus rapide que array dans la boucle d'interprétation).
+    Un même Moteur peut être exécuté sur autant de rubans que voulu.
+    """
+
+    def __init__(self, programme):
+        self.programme = programme
+        ops = programme.ops
+        args = programme.args
+        self.ops = list(ops)
+        self.arg = list(args)
+        cible = [0] * len(ops)
+        for i, op in enumerate(ops):
+            if op == OP_SI0 or op == OP_SI1:
+                # condition fausse => après le '}'
+                cible[i] = args[i] + 1
+            elif op == OP_FERME:
+                j = args[i]
+                # '}' de boucle => retour au début du corps, sinon on continue
+                cible[i] = j + 1 if ops[j] == OP_BOUCLE else i + 1
+            elif op == OP_FIN:
+                # sortie de boucle => après son '}', hors boucle => arrêt
+                cible[i] = args[i] + 1 if args[i] >= 0 else len(ops)
+            elif op == OP_DIESE:
+                cible[i] = len(ops)
+            else:
+                cible[i] = i + 1
+        self.cible = cible
+
+    def execute(self, tape=None, head=TETE_INITIALE, interactif=True, pas_max=None, delai=None,
+                cycles=False, profil=None, trace=None):
+        """
+        Exécute le programme sur tape (modifié sur place) à partir de la
+        position head. 'I' affiche le ruban, 'P' l'affiche puis attend Entrée
+        si interactif est vrai.
+        pas_max : nombre de pas au-delà duquel l'exécution s'interrompt ;
+        delai : durée maximale en secondes. Les deux ne sont vérifiés que sur
+        'boucle', '}', 'fin', '#' (toute exécution sans fin repasse par un
+        '}'), par une seule comparaison avec un seuil de pas.
+        cycles : détecter les cycles aux retours de boucle (voir l'en-tête du
+        module) ; l'exécution passe alors par une boucle plus lente qui suit
+        l'étendue des cases lues.
+        profil : mtdv.profil.Profil à remplir (exécutions par élément, temps
+        par boucle) ; l'exécution passe alors par une boucle séparée qui
+        compte, sans effet sur les autres. Exclut cycles.
+        trace : mtdv.trace.EcrivainTrace qui reçoit l'état initial puis chaque
+        déplacement et chaque écriture (boucle séparée, comme profil) ; il est
+        fermé à la fin de l'exécution. Exclut cycles et profil.
+        Un RubanPagine passe par la boucle rapide (accès direct aux pages) ;
+        tout autre ruban (RubanBits, ...) par les accès tape[head].
+        """
+        if tape is None:
+            tape = RubanPagine()
+        budget = _Budget(pas_max, delai)
+        if trace is not None:
+            if cycles or profil is not None:
+                raise ValueError("trace ne peut être combinée ni avec cycles ni avec profil")
+            try:
+                return self._execute_trace(tape, head, interactif, budget, trace)
+            finally:
+                trace.fermer()
+        if profil is not None:
+            if cycles:
+                raise ValueError("profil et cycles ne peuvent pas être combinés")
+            try:
+                return self._execute_profil(tape, head, interactif, budget, profil)
+            finally:
+                profil.fermer()
+        if cycles:
+            return self._execute_cycles(tape, head, interactif, budget)
+        if type(tape) is not RubanPagine:
+            return self._execute_generique(tape, head, interactif, budget)
+        ops = self.ops
+        cible = self.cible
+        n = len(ops)
+        # La tête est suivie comme (page courante, décalage dans la page) :
+        # on ne passe par le dictionnaire des pages qu'en changeant de page.
+        taille_page = RubanPagine.TAILLE_PAGE
+        decalage = RubanPagine.DECALAGE
+        n_page = head >> decalage
+        off = head & RubanPagine.MASQUE
+        page = tape.page(n_page)
+        pc = 0
+        pas = 0
+        seuil = budget.seuil(0)
+        while pc < n:
+            op = ops[pc]
+            pas += 1
+            if op == OP_D:
+                off += 1
+                if off == taille_page:
+                    n_page += 1
+                    page = tape.page(n_page)
+                    off = 0
+                pc += 1
+            elif op == OP_G:
+                if off == 0:
+                    n_page -= 1
+                    page = tape.page(n_page)
+                    off = taille_page
+                off -= 1
+                pc += 1
+            elif op == OP_SI0:
+                pc = pc + 1 if page[off] == 0 else cible[pc]
+            elif op == OP_SI1:
+                pc = pc + 1 if page[off] == 1 else cible[pc]
+            elif op == OP_1:
+                page[off] = 1
+                pc += 1
+            elif op == OP_0:
+                page[off] = 0
+                pc += 1
+            elif op == OP_DEPLACE:
+                d = self.arg[pc]
+                head = (n_page << decalage) + off + d
+                n_page = head >> decalage
+                off = head & RubanPagine.MASQUE
+                page = tape.page(n_page)
+                pas += (d if d > 0 else -d) - 1
+                pc += 1
+            elif op == OP_CHERCHE_D or op == OP_CHERCHE_G:
+                head, pas, motif = _recherche(tape, (n_page << decalage) + off, op, self.arg[pc], pas,
+                                              budget.pas_max)
+                if motif:
+                    return Resultat(tape, head, pas, motif)
+                n_page = head >> decalage
+                off = head & RubanPagine.MASQUE
+                page = tape.page(n_page)
+                pc += 1
+            elif op == OP_I or op == OP_P:
+                afficher_ruban(tape, (n_page << decalage) + off)
+                if op == OP_P and interactif:
+                    input('Appuyez sur Entrée pour continuer...')
+                pc += 1
+            else:
+                # 'boucle', '}', 'fin', '#'
+                if pas >= seuil:
+                    motif = budget.motif(pas)
+                    if motif:
+                        return Resultat(tape, (n_page << decalage) + off, pas, motif)
+                    seuil = budget.seuil(pas)
+                pc = cible[pc]
+        return Resultat(tape, (n_page << decalage) + off, pas)
+
+    def _execute_generique(self, tape, head, interactif, budget):
+        ops = self.ops
+        cible = self.cible
+        n = len(ops)
+        pc = 0
+        pas = 0
+        seuil = budget.seuil(0)
+        while pc < n:
+            op = ops[pc]
+            pas += 1
+            if op == OP_D:
+                head += 1
+                pc += 1
+            elif op == OP_G:
+                head -= 1
+                pc += 1
+            elif op == OP_SI0:
+                pc = pc + 1 if tape[head] == 0 else cible[pc]
+            elif op == OP_SI1:
+                pc = pc + 1 if tape[head] == 1 else cible[pc]
+            elif op == OP_1:
+                tape[head] = 1
+                pc += 1
+            elif op == OP_0:
+                tape[head] = 0
+                pc += 1
+            elif op == OP_DEPLACE:
+                d = self.arg[pc]
+                head += d
+                pas += (d if d > 0 else -d) - 1
+                pc += 1
+            elif op == OP_CHERCHE_D or op == OP_CHERCHE_G:
+                head, pas, motif = _recherche(tape, head, op, self.arg[pc], pas, budget.pas_max)
+                if motif:
+                    return Resultat(tape, head, pas, motif)
+                pc += 1
+            elif op == OP_I or op == OP_P:
+                afficher_ruban(tape, head)
+                if op == OP_P and interactif:
+                    input('Appuyez sur Entrée pour continuer...')
+                pc += 1
+            else:
+                if pas >= seuil:
+                    motif = budget.motif(pas)
+                    if motif:
+                        return Resultat(tape, head, pas, motif)
+                    seuil = budget.seuil(pas)
+                pc = cible[pc]
+        return Resultat(tape, head, pas)
+
+    def _execute_profil(self, tape, head, interactif, budget, profil):
+        # _execute_generique, plus un compteur par élément exécuté et
+        # l'horloge à l'entrée et à la sortie ('fin') de chaque boucle
+        ops = self.ops
+        cible = self.cible
+        arg = self.arg
+        compteurs = profil.compteurs
+        temps = profil.temps
+        entree = profil.entree
+        horloge = time.perf_counter
+        n = len(ops)
+        pc = 0
+        pas = 0
+        seuil = budget.seuil(0)
+        while pc < n:
+            op = ops[pc]
+            pas += 1
+            compteurs[pc] += 1
+            if op == OP_D:
+                head += 1
+                pc += 1
+            elif op == OP_G:
+                head -= 1
+                pc += 1
+            elif op == OP_SI0:
+                pc = pc + 1 if tape[head] == 0 else cible[pc]
+            elif op == OP_SI1:
+                pc = pc + 1 if tape[head] == 1 else cible[pc]
+            elif op == OP_1:
+                tape[head] = 1
+                pc += 1
+            elif op == OP_0:
+                tape[head] = 0
+                pc += 1
+            elif op == OP_DEPLACE:
+                head += arg[pc]
+                pas += abs(arg[pc]) - 1
+                pc += 1
+            elif op == OP_CHERCHE_D or op == OP_CHERCHE_G:
+                head, pas, motif = _recherche(tape, head, op, arg[pc], pas, budget.pas_max)
+                if motif:
+                    return Resultat(tape, head, pas, motif)
+                pc += 1
+            elif op == OP_I or op == OP_P:
+                afficher_ruban(tape, head)
+                if op == OP_P and interactif:
+                    input('Appuyez sur Entrée pour continuer...')
+                pc += 1
+            else:
+                if pas >= seuil:
+                    motif = budget.motif(pas)
+                    if motif:
+                        return Resultat(tape, head, pas, motif)
+                    seuil = budget.seuil(pas)
+                if op == OP_BOUCLE:
+                    entree[pc] = horloge()
+                elif op == OP_FIN and arg[pc] >= 0:
+                    j = arg[arg[pc]]
+                    temps[j] += horloge() - entree[j]
+                    entree[j] = 0.0
+                pc = cible[pc]
+        return Resultat(tape, head, pas)
+
+    def _execute_trace(self, tape, head, interactif, budget, trace):
+        # _execute_generique, plus un enregistrement par déplacement ou écriture
+        ops = self.ops
+        cible = self.cible
+        arg = self.arg
+        enregistrer = trace.enregistrer
+        trace.debut(tape, head)
+        n = len(ops)
+        pc = 0
+        pas = 0
+        seuil = budget.seuil(0)
+        while pc < n:
+            op = ops[pc]
+            pas += 1
+            if op == OP_D:
+                head += 1
+                enregistrer(pas, pc, head, -1)
+                pc += 1
+            elif op == OP_G:
+                head -= 1
+                enregistrer(pas, pc, head, -1)
+                pc += 1
+            elif op == OP_SI0:
+                pc = pc + 1 if tape[head] == 0 else cible[pc]
+            elif op == OP_SI1:
+                pc = pc + 1 if tape[head] == 1 else cible[pc]
+            elif op == OP_1:
+                tape[head] = 1
+                enregistrer(pas, pc, head, 1)
+                pc += 1
+            elif op == OP_0:
+                tape[head] = 0
+                enregistrer(pas, pc, head, 0)
+                pc += 1
+            elif op == OP_DEPLACE:
+                head += arg[pc]
+                pas += abs(arg[pc]) - 1
+                enregistrer(pas, pc, head, -1)
+                pc += 1
+            elif op == OP_CHERCHE_D or op == OP_CHERCHE_G:
+                # un enregistrement par case, au pas du déplacement dans la
+                # boucle d'origine : etat_au_pas reste exact au milieu d'une recherche
+                debut = pas
+                pos, pas, motif = _recherche(tape, head, op, arg[pc], pas, budget.pas_max)
+                sens = 1 if op == OP_CHERCHE_D else -1
+                avance = arg[pc] >> 1
+                for i in range(1, abs(pos - head) + 1):
+                    enregistrer(debut + 3 * i - 1 - avance, pc, head + sens * i, -1)
+                head = pos
+                if motif:
+                    return Resultat(tape, head, pas, motif)
+                pc += 1
+            elif op == OP_I or op == OP_P:
+                afficher_ruban(tape, head)
+                if op == OP_P and interactif:
+                    input('Appuyez sur Entrée pour continuer...')
+                pc += 1
+            else:
+                if pas >= seuil:
+                    motif = budget.motif(pas)
+                    if motif:
+                        return Resultat(tape, head, pas, motif)
+                    seuil = budget.seuil(pas)
+                pc = cible[pc]
+        return Resultat(tape, head, pas)
+
+    def _execute_cycles(self, tape, head, interactif, budget):
+        ops = self.ops
+        cible = self.cible
+        n = len(ops)
+        pc = 0
+        pas = 0
+        seuil = budget.seuil(0)
+        cycle = _Cycles()
+        # Retours de boucle avant la reprise de l'instantané ; étendue des
+        # cases lues depuis celui-ci
+        compte = 1
+        bas = haut = head
+        while pc < n:
+            op = ops[pc]
+            pas += 1
+            if op == OP_D:
+                head += 1
+                if head > haut:
+                    haut = head
+                pc += 1
+            elif op == OP_G:
+                head -= 1
+                if head < bas:
+                    bas = head
+                pc += 1
+            elif op == OP_SI0:
+                pc = pc + 1 if tape[head] == 0 else cible[pc]
+            elif op == OP_SI1:
+                pc = pc + 1 if tape[head] == 1 else cible[pc]
+            elif op == OP_1:
+                tape[head] = 1
+                pc += 1
+            elif op == OP_0:
+                tape[head] = 0
+                pc += 1
+            elif op == OP_DEPLACE or op == OP_CHERCHE_D or op == OP_CHERCHE_G:
+                if op == OP_DEPLACE:
+                    pos = head + self.arg[pc]
+                    pas += abs(self.arg[pc]) - 1
+                else:
+                    pos, pas, motif = _recherche(tape, head, op, self.arg[pc], pas, budget.pas_max, True)
+                    if motif:
+                        return Resultat(tape, pos, pas, motif)
+                # cases survolées (DEPLACE) ou lues (CHERCHE) entre head et pos
+                bas = min(bas, pos)
+                haut = max(haut, pos)
+                head = pos
+                pc += 1
+            elif op == OP_I or op == OP_P:
+                afficher_ruban(tape, head)
+                if op == OP_P and interactif:
+                    input('Appuyez sur Entrée pour continuer...')
+                pc += 1
+            else:
+                if pas >= seuil:
+                    motif = budget.motif(pas)
+                    if motif:
+                        return Resultat(tape, head, pas, motif)
+                    seuil = budget.seuil(pas)
+                if op == OP_FERME and cible[pc] <= pc:
+                    # retour de boucle
+                    if pc == cycle.pc and tape[head] == cycle.lue and cycle.repete(tape, head, bas, haut):
+                        return Resultat(tape, head, pas, MOTIF_SANS_FIN)
+                    compte -= 1
+                    if compte == 0:
+                        compte = cycle.reprendre(pc, tape, head)
+                        bas = haut = head
+                pc = cible[pc]
+        return Resultat(tape, head, pas)
+
+
+class _Cycles:
+    """
+    Instantané (pc, tête, ruban) de l'algorithme de Brent : repris après
+    puissance retours de boucle, puissance doublant à chaque reprise.
+    """
+    __slots__ = ('pc', 'head', 'lue', 'debut', 'contenu', 'puissance')
+
+    def __init__(self):
+        self.pc = -1
+        self.lue = -1
+        self.puissance = 1
+
+    def reprendre(self, pc, tape, head):
+        """
+        Prend l'instantané de la configuration actuelle ; retourne le nombre
+        de retours de boucle avant le suivant.
+        """
+        e = tape.etendue()
+        self.pc = pc
+        self.head = head
+        self.lue = tape[head]
+        self.debut = e[0] if e else head
+        self.contenu = tape.fenetre(e[0], e[1] + 1) if e else b''
+        self.puissance *= 2
+        return self.puissance
+
+    def _cases(self, debut, fin):
+        # Cases debut..fin-1 de l'instantané (0 hors de son étendue)
+        a = max(debut - self.debut, 0)
+        b = max(fin - self.debut, 0)
+        octets = self.contenu[a:b]
+        gauche = min(max(self.debut - debut, 0), fin - debut)
+        return bytes(gauche) + octets + bytes(fin - debut - gauche - len(octets))
+
+    def repete(self, tape, head, bas, haut):
+        """
+        Vrai si la configuration actuelle (au pc de l'instantané) le
+        reproduit (voir l'en-tête du module) ; bas..haut : cases lues depuis
+        l'instantané.
+        """
+        d = head - self.head
+        if d == 0:
+            return self._cases(bas, haut + 1) == tape.fenetre(bas, haut + 1)
+        # Test préalable : la dernière case à 1 dans le sens du déplacement
+        # (la première si d < 0) doit être celle de l'instantané décalée de d
+        e = tape.etendue()
+        if self.contenu:
+            premier, dernier = self.debut, self.debut + len(self.contenu) - 1
+        else:
+            premier = dernier = None
+        if d > 0:
+            attendu = dernier + d if dernier is not None and dernier >= bas else None
+            trouve = e[1] if e and e[1] >= bas + d else None
+        else:
+            attendu = premier + d if premier is not None and premier <= haut else None
+            trouve = e[0] if e and e[0] <= haut + d else None
+        if attendu != trouve:
+            return False
+        if self._cases(bas, haut + 1) != tape.fenetre(bas + d, haut + d + 1):
+            return False
+        # au-delà des cases lues : jusqu'à la dernière case à 1, d'un côté
+        # comme de l'autre
+        if d > 0:
+            fin = max(e[1] + 1 if e else 0, self.debut + len(self.contenu) + d, haut + d + 1)
+            return self._cases(haut + 1, fin - d) == tape.fenetre(haut + d + 1, fin)
+        debut = min(e[0] if e else 0, self.debut + d, bas + d)
+        return self._cases(debut - d, bas) == tape.fenetre(debut, bas + d)
+
+
+class _Budget:
+    """
+    Limites d'une exécution : pas_max et échéance (time.monotonic()).
+    """
+    __slots__ = ('pas_max', 'echeance')
+
+    def __init__(self, pas_max=None, delai=None):
+        self.pas_max = sys.maxsize if pas_max is None else pas_max
+        self.echeance = None if delai is None else time.monotonic() + delai
+
+    def seuil(self, pas):
+        """
+        Prochain nombre de pas auquel motif() doit être consulté.
+        """
+        if self.echeance is None:
+            return self.pas_max
+        return min(self.pas_max, pas + PAS_VERIF)
+
+    def motif(self, pas):
+        if pas >= self.pas_max:
+            return MOTIF_PAS
+        if self.echeance is not None and time.monotonic() >= self.echeance:
+            return MOTIF_DELAI
+        return None
+
+
+def pas_recherche(arg, k):
+    """
+    Pas de la boucle d'origine d'une recherche (OP_CHERCHE_D/G d'argument
+    arg) qui parcourt k cases : le 'boucle', trois par case (déplacement,
+    'si', '}'), puis le 'si' et le 'fin' de la case trouvée ; deux de moins
+    quand le déplacement ouvre le corps (avance).
+    """
+    return 3 * k + 3 - 2 * (arg >> 1)
+
+
+def arret_recherche(arg, k, r):
+    """
+    Premier pas de contrôle ('boucle', '}', 'fin' : là où le budget est
+    vérifié) de rang au moins r dans la boucle d'origine d'une recherche
+    (rang 1 : son 'boucle') => (cases parcourues à ce pas, rang) ; None si
+    la boucle se termine avant. k : cases parcourues par la recherche, None
+    si elle n'aboutit jamais.
+    """
+    j = max(0, -(-(r - 1) // 3))
+    if k is None or j <= k:
+        return j, 3 * j + 1
+    if not arg >> 1 and 3 * k + 3 >= r:
+        return k, 3 * k + 3
+    return None
+
+
+def _recherche(tape, head, op, arg, pas, pas_max, sans_fin=False):
+    """
+    Recherche exécutée au pas pas (celui du 'boucle' de la boucle d'origine)
+    => (tête, pas, motif). Elle compte les pas de la boucle d'origine
+    (pas_recherche) : si pas_max tombe pendant celle-ci, la tête et le pas
+    sont ceux de son arrêt sans -O (MOTIF_PAS). Une recherche sans issue
+    s'arrête aussitôt (MOTIF_SANS_FIN) sans pas_max ou si sans_fin (détection
+    de cycles), sinon à pas_max comme la boucle d'origine.
+    """
+    if pas >= pas_max:
+        return head, pas, MOTIF_PAS
+    pos = _chercher(tape, head, op, arg)
+    k = None if pos is None else pos - head if pos >= head else head - pos
+    if k is None and (sans_fin or pas_max == sys.maxsize):
+        return head, pas, MOTIF_SANS_FIN
+    fin = None if k is None else pas + pas_recherche(arg, k) - 1
+    if k is None or fin >= pas_max:
+        j, s = arret_recherche(arg, k, pas_max - pas + 1)
+        return head + j if op == OP_CHERCHE_D else head - j, pas + s - 1, MOTIF_PAS
+    return pos, fin, None
+
+
+def _chercher(tape, head, op, arg):
+    """
+    Position atteinte par une recherche, ou None si elle n'aboutit jamais
+    (la boucle d'origine tournerait indéfiniment).
+    """
+    sens = 1 if op == OP_CHERCHE_D else -1
+    return tape.chercher(head + (arg >> 1) * sens, arg & 1, sens)
+
+
+def execute(programme, tape=None, head=TETE_INITIALE, interactif=True, pas_max=None, delai=None,
+            cycles=False, profil=None, trace=None):
+    """
+    Exécute programme (mtdv.ir.Programme) et retourne un Resultat.
+    Le ruban n'est pas borné : la tête peut aller en position négative.
+    """
+    return Moteur(programme).execute(tape, head, interactif, pas_max, delai, cycles, profil, trace)
+
+
+def ruban_depuis_texte(texte, bits=False):
+    """
+    '0011100111' => ruban (RubanPagine, ou RubanBits si bits) dont la case 0
+    est le premier caractère.
+    """
+    return classe_ruban(bits)(1 if c == '1' else 0 for c in texte if c in '01')
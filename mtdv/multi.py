@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Exécution d'un même programme sur de nombreux rubans initiaux, répartie sur
+un ProcessPoolExecutor, avec un résultat JSON par ruban.
+
+Une spécification de ruban par ligne :
+  0011100111            contenu à partir de la case 0, tête en TETE_INITIALE
+  0011100111 2          idem, tête en case 2
+  {"ruban": "0011100111", "tete": 2}
+  {"plages": [[2, 3], [6, 5]], "tete": 2}
+                        plages de 1 (début, longueur), comme les deux
+                        saisies du code généré par traducteur_1.py
+Les lignes vides et celles commençant par '%' sont ignorées.
+"""
+
+import contextlib
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .artefact import depuis_octets, serialiser
+from .moteur import MOTIF_SANS_FIN, TETE_INITIALE, Moteur
+from .ruban import classe_ruban
+
+# Longueur maximale du contenu du ruban recopié dans chaque résultat
+LARGEUR_RESUME = 256
+
+_moteur = None
+_bits = False
+_pas_max = None
+_delai = None
+_cycles = False
+_largeur = LARGEUR_RESUME
+
+
+def lire_specs(flux):
+    """
+    Itère sur (numéro de ligne, texte) des spécifications d'un flux texte,
+    sans tout lire d'avance.
+    """
+    for numero, ligne in enumerate(flux, 1):
+        ligne = ligne.strip()
+        if ligne and not ligne.startswith('%'):
+            yield numero, ligne
+
+
+def ruban_depuis_spec(spec, bits=False):
+    """
+    (ruban, tête) décrits par une ligne de spécification (voir l'en-tête).
+    Lève ValueError si la ligne n'est pas valide.
+    """
+    tape = classe_ruban(bits)()
+    if spec.startswith('{'):
+        d = json.loads(spec)
+        if not isinstance(d, dict):
+            raise ValueError(f"spécification invalide : {spec!r}")
+        head = d.get('tete', TETE_INITIALE)
+        texte = d.get('ruban', '')
+        plages = d.get('plages', [])
+        # types JSON vérifiés ici : une erreur de type dans un processus du
+        # pool interromprait tout le lot au lieu de cette seule ligne
+        if not _entier(head):
+            raise ValueError(f"tête invalide : {head!r}")
+        if not isinstance(texte, str):
+            raise ValueError(f"ruban invalide : {texte!r}")
+        if not isinstance(plages, list) or not all(
+                isinstance(p, list) and len(p) == 2 and _entier(p[0]) and _entier(p[1]) for p in plages):
+            raise ValueError(f"plages invalides (liste de paires [début, longueur] attendue) : {plages!r}")
+        for debut, longueur in plages:
+            tape.remplir(debut, debut + longueur)
+    else:
+        champs = spec.split()
+        if len(champs) > 2:
+            raise ValueError(f"spécification invalide : {spec!r}")
+        texte = champs[0]
+        head = int(champs[1]) if len(champs) == 2 else TETE_INITIALE
+    if texte.strip('01'):
+        raise ValueError(f"ruban invalide : {texte!r}")
+    for pos, c in enumerate(texte):
+        if c == '1':
+            tape[pos] = 1
+    return tape, head
+
+
+def _entier(v):
+    # entier JSON (true / false exclus)
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def resume(res, largeur=LARGEUR_RESUME):
+    """
+    Dictionnaire JSON d'un Resultat : tête, pas, statut ('arret', 'limite'
+    avec le motif 'pas' ou 'delai', 'sans_fin'), nombre de bâtons, étendue
+    des cases à 1 et leur contenu s'il tient dans largeur.
+    """
+    d = {'tete': res.head, 'pas': res.pas, 'statut': statut(res.motif)}
+    if d['statut'] == 'limite':
+        d['motif'] = res.motif
+    d['batons'] = res.tape.compter()
+    e = res.tape.etendue()
+    d['etendue'] = list(e) if e else None
+    if e and e[1] - e[0] < largeur:
+        d['ruban'] = ''.join(str(x) for x in res.tape.fenetre(e[0], e[1] + 1))
+    return d
+
+
+def statut(motif):
+    if motif is None:
+        return 'arret'
+    if motif == MOTIF_SANS_FIN:
+        return 'sans_fin'
+    return 'limite'
+
+
+def executer_spec(moteur, spec, bits=False, pas_max=None, largeur=LARGEUR_RESUME, delai=None, cycles=False):
+    """
+    Exécute moteur sur le ruban décrit par spec ; retourne le résumé, ou
+    {'erreur': ...} pour une spécification invalide.
+    """
+    try:
+        tape, head = ruban_depuis_spec(spec, bits)
+    except ValueError as e:
+        return {'erreur': str(e)}
+    return resume(moteur.execute(tape, head, False, pas_max, delai, cycles), largeur)
+
+
+def _initialiser(artefact, bits, pas_max, largeur, delai, cycles):
+    global _moteur, _bits, _pas_max, _largeur, _delai, _cycles
+    _moteur = Moteur(depuis_octets(artefact))
+    _bits, _pas_max, _largeur, _delai, _cycles = bits, pas_max, largeur, delai, cycles
+
+
+def _executer_lot(lot):
+    # 'I' / 'P' affichent le ruban : inutile (et coûteux) ici
+    res = []
+    with open(os.devnull, 'w') as nul, contextlib.redirect_stdout(nul):
+        for numero, spec in lot:
+            d = {'id': numero}
+            d.update(executer_spec(_moteur, spec, _bits, _pas_max, _largeur, _delai, _cycles))
+            res.append(d)
+    return res
+
+
+def _lots(specs, taille):
+    lot = []
+    for s in specs:
+        lot.append(s)
+        if len(lot) == taille:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def executer_multi(programme, specs, processus=None, pas_max=None, bits=False,
+                   taille_lot=64, largeur=LARGEUR_RESUME, delai=None, cycles=False):
+    """
+    Exécute programme sur chaque spécification (numéro, texte) de specs et
+    produit les résultats dans l'ordre, au fur et à mesure. Le programme est
+    transmis une fois à chaque processus (artefact binaire, voir
+    mtdv.artefact) ; les spécifications partent par lots de taille_lot, avec
+    un nombre borné de lots en vol pour traiter un flux sans fin.
+    pas_max et delai s'appliquent à chaque ruban séparément ; cycles active
+    la détection de cycles de mtdv.moteur.
+    """
+    artefact = serialiser(programme, b'\0' * 32, 0)
+    processus = processus or os.cpu_count() or 1
+    en_vol = deque()
+    with ProcessPoolExecutor(max_workers=processus, initializer=_initialiser,
+                             initargs=(artefact, bits, pas_max, largeur, delai, cycles)) as pool:
+        for lot in _lots(specs, taille_lot):
+            en_vol.append(pool.submit(_executer_lot, lot))
+            if len(en_vol) >= 4 * processus:
+                yield from en_vol.popleft().result()
+        while en_vol:
+            yield from en_vol.popleft().result()
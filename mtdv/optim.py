@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Passes d'optimisation sur la représentation compacte (mtdv.ir).
+
+Chaque passe prend un Programme et en retourne un nouveau, de même
+sémantique ; les positions source sont conservées pour les instructions
+qui restent.
+"""
+
+from .ir import (OP_0, OP_1, OP_BOUCLE, OP_CHERCHE_D, OP_CHERCHE_G, OP_D, OP_DEPLACE, OP_DIESE,
+                 OP_FERME, OP_FIN, OP_G, OP_SI0, OP_SI1, OUVRANTS, Programme, relier)
+
+_SENS = {OP_D: OP_CHERCHE_D, OP_G: OP_CHERCHE_G}
+_SI = (OP_SI0, OP_SI1)
+_SIMPLES = (OP_G, OP_D, OP_DEPLACE, OP_0, OP_1)
+
+
+def _motif_recherche(ops, i):
+    """
+    Reconnaît en ops[i:i+6] une boucle « avancer jusqu'au symbole x » :
+      boucle D si (x) fin } }     => (OP_CHERCHE_D, x, avance=1)
+      boucle si (x) fin } D }     => (OP_CHERCHE_D, x, avance=0)
+    (idem avec G). Retourne None si le motif ne correspond pas.
+    """
+    if ops[i] != OP_BOUCLE or i + 6 > len(ops) or ops[i + 5] != OP_FERME:
+        return None
+    a, b, c, d = ops[i + 1], ops[i + 2], ops[i + 3], ops[i + 4]
+    if a in _SENS and b in _SI and c == OP_FIN and d == OP_FERME:
+        return (_SENS[a], 1 if b == OP_SI1 else 0, 1)
+    if a in _SI and b == OP_FIN and c == OP_FERME and d in _SENS:
+        return (_SENS[d], 1 if a == OP_SI1 else 0, 0)
+    return None
+
+
+def reconnaitre_recherches(programme):
+    """
+    Remplace chaque boucle de déplacement jusqu'à un symbole par une seule
+    instruction de recherche (tape.chercher), exécutée en C par
+    bytearray.find/rfind ou par des opérations sur les bits.
+    """
+    ops = programme.ops
+    res = Programme()
+    i = 0
+    n = len(ops)
+    while i < n:
+        motif = _motif_recherche(ops, i)
+        if motif is not None:
+            op, val, avance = motif
+            res.ops.append(op)
+            res.args.append(val | (avance << 1))
+            pas = 6
+        else:
+            res.ops.append(ops[i])
+            res.args.append(programme.args[i])
+            pas = 1
+        res.lignes.append(programme.lignes[i])
+        res.colonnes.append(programme.colonnes[i])
+        i += pas
+    return relier(res)
+
+
+class _Elt:
+    """
+    Élément de l'arbre de travail de la passe à lucarne : opcode, argument,
+    position source, et pour un bloc ses enfants et la position de son '}'.
+    """
+    __slots__ = ('op', 'arg', 'ligne', 'colonne', 'enfants', 'ferme')
+
+    def __init__(self, op, arg, ligne, colonne, enfants=None, ferme=(0, 0)):
+        self.op = op
+        self.arg = arg
+        self.ligne = ligne
+        self.colonne = colonne
+        self.enfants = enfants
+        self.ferme = ferme
+
+
+def _arbre(programme, debut, fin):
+    res = []
+    i = debut
+    while i < fin:
+        op = programme.ops[i]
+        elt = _Elt(op, programme.args[i], programme.lignes[i], programme.colonnes[i])
+        if op in OUVRANTS:
+            j = programme.args[i]
+            elt.enfants = _arbre(programme, i + 1, j)
+            elt.ferme = (programme.lignes[j], programme.colonnes[j])
+            i = j + 1
+        else:
+            i += 1
+        res.append(elt)
+    return res
+
+
+def _aplatir(corps, res):
+    for elt in corps:
+        res.ops.append(elt.op)
+        res.args.append(elt.arg)
+        res.lignes.append(elt.ligne)
+        res.colonnes.append(elt.colonne)
+        if elt.enfants is not None:
+            _aplatir(elt.enfants, res)
+            res.ops.append(OP_FERME)
+            res.args.append(0)
+            res.lignes.append(elt.ferme[0])
+            res.colonnes.append(elt.ferme[1])
+
+
+def _deplacement(d, src):
+    """
+    Instruction(s) déplaçant la tête de d cases (G, D, ou un seul OP_DEPLACE).
+    """
+    if d == 0:
+        return []
+    if d == 1 or d == -1:
+        return [_Elt(OP_D if d == 1 else OP_G, 0, src.ligne, src.colonne)]
+    return [_Elt(OP_DEPLACE, d, src.ligne, src.colonne)]
+
+
+def _plier(suite, connu):
+    """
+    Réduit une suite de G/D/0/1 (sans lecture du ruban) : déplacements
+    regroupés, écritures écrasées plus loin dans la suite supprimées, ainsi
+    que les écritures d'une valeur déjà connue dans la case.
+    connu (décalage relatif à la tête => symbole) est mis à jour sur place.
+    Retourne les instructions réduites.
+    """
+    pos = 0
+    ecritures = []
+    src = suite[0]
+    for elt in suite:
+        if elt.op == OP_G:
+            pos -= 1
+        elif elt.op == OP_D:
+            pos += 1
+        elif elt.op == OP_DEPLACE:
+            pos += elt.arg
+        else:
+            ecritures.append((pos, 1 if elt.op == OP_1 else 0, elt, src))
+            src = None
+            continue
+        if src is None:
+            src = elt
+    derniere = {p: k for k, (p, _, _, _) in enumerate(ecritures)}
+    res = []
+    cur = 0
+    for k, (p, val, elt, depl) in enumerate(ecritures):
+        if derniere[p] != k or connu.get(p) == val:
+            continue
+        res.extend(_deplacement(p - cur, depl or elt))
+        res.append(elt)
+        cur = p
+    res.extend(_deplacement(pos - cur, src or suite[-1]))
+    nouveau = {p - pos: v for p, v in connu.items()}
+    for p, val, _, _ in ecritures:
+        nouveau[p - pos] = val
+    connu.clear()
+    connu.update(nouveau)
+    return res
+
+
+def _simplifier(corps, connu):
+    """
+    Passe à lucarne sur la liste d'éléments corps. connu donne les symboles
+    déjà connus autour de la tête à l'entrée. Retourne (corps réduit,
+    symboles connus à la sortie, vrai si le corps se termine par fin/#).
+    """
+    res = []
+    connu = dict(connu)
+    i = 0
+    n = len(corps)
+    while i < n:
+        elt = corps[i]
+        op = elt.op
+        if op in _SIMPLES:
+            j = i
+            while j < n and corps[j].op in _SIMPLES:
+                j += 1
+            res.extend(_plier(corps[i:j], connu))
+            i = j
+            continue
+        if op in _SI:
+            cond = 1 if op == OP_SI1 else 0
+            val = connu.get(0)
+            if val is None:
+                enfants, _, _ = _simplifier(elt.enfants, {0: cond})
+                if enfants:
+                    elt.enfants = enfants
+                    res.append(elt)
+                    connu = {}
+            elif val == cond:
+                # condition vraie à coup sûr : le contenu est inséré tel quel
+                enfants, connu, termine = _simplifier(elt.enfants, connu)
+                res.extend(enfants)
+                if termine:
+                    return res, {}, True
+            # condition fausse à coup sûr : le bloc disparaît
+        elif op == OP_BOUCLE:
+            elt.enfants, _, _ = _simplifier(elt.enfants, {})
+            res.append(elt)
+            connu = {}
+        elif op == OP_FIN or op == OP_DIESE:
+            # tout ce qui suit dans le bloc est inaccessible
+            res.append(elt)
+            return res, {}, True
+        elif op == OP_CHERCHE_D or op == OP_CHERCHE_G:
+            res.append(elt)
+            connu = {0: elt.arg & 1}
+        else:
+            # I, P : lecture seule
+            res.append(elt)
+        i += 1
+    return res, connu, False
+
+
+def lucarne(programme):
+    """
+    Passe à lucarne : regroupe les déplacements consécutifs, supprime les
+    écritures écrasées avant toute lecture, résout les 'si' dont la
+    condition est connue après une écriture, et retire le code placé après
+    'fin' ou '#' dans un même bloc.
+    Répétée tant qu'elle raccourcit le programme : un 'si' résolu peut
+    rendre adjacentes deux suites de G/D/0/1.
+    """
+    while True:
+        corps, _, _ = _simplifier(_arbre(programme, 0, len(programme)), {})
+        res = Programme()
+        _aplatir(corps, res)
+        if len(res) == len(programme):
+            return relier(res)
+        programme = relier(res)
+
+
+def compter_instructions(programme):
+    """
+    Nombre d'instructions d'un Programme, sans compter les '}'.
+    """
+    return sum(1 for op in programme.ops if op != OP_FERME)
+
+
+def optimiser(programme):
+    """
+    Applique toutes les passes, dans l'ordre.
+    """
+    return lucarne(reconnaitre_recherches(programme))
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Ruban persistant pour le code généré par traducteur_3.py et traducteur_4.py.
+
+Les sous-langages de ces traducteurs n'ont ni affectation, ni boucle, ni
+variable locale : un ruban ne peut pas être modifié sur place, chaque
+écriture produit un nouveau ruban. Au lieu de recopier toute une liste à
+chaque écriture, le ruban est un arbre binaire immuable dont les écritures
+ne recopient que le chemin de la racine à la case (O(log n)) et partagent
+tout le reste avec l'ancien ruban.
+
+Un ruban est un triplet (taille, gauche, droite) : droite contient les cases
+0..taille-1, gauche les cases -1..-taille (la case p < 0 à l'indice -p-1).
+Chaque moitié est un arbre complet de taille feuilles ; un noeud vaut 0
+(sous-arbre entièrement à 0), 1 (feuille à 1) ou (fils gauche, fils droit).
+Tous les sous-arbres vides sont le même 0 : un ruban vide se crée en
+O(log n) et une écriture hors du ruban le double (O(1), les deux moitiés
+existantes deviennent des fils).
+
+Les fonctions respectent les contraintes des deux sous-langages (un seul
+paramètre, un n-uplet, pour le traducteur 4 ; seulement if/else et return) :
+leur source est recopiée telle quelle dans le code généré
+(source_persistant). Seules les constantes FENETRE et LARGEUR de la fenêtre
+d'affichage (mtdv.affichage), lues une fois dans l'environnement, sont
+définies hors des fonctions, en tête de cette source.
+"""
+
+import inspect
+
+from .affichage import FENETRE, LARGEUR
+
+
+def empty_tape(n):
+    # Ruban vide d'au moins n cases de chaque côté de la case 0
+    if n <= 1:
+        return (1, 0, 0)
+    else:
+        return tape_widen(empty_tape((n + 1) // 2))
+
+
+def tape_widen(tape):
+    # Taille doublée ; l'ancien contenu devient la première moitié de chaque côté
+    return (2 * tape[0], node_pair((tape[1], 0)), node_pair((tape[2], 0)))
+
+
+def node_pair(q):
+    # q = (fils gauche, fils droit) ; deux sous-arbres vides => 0
+    if q[0] == 0:
+        if q[1] == 0:
+            return 0
+        else:
+            return q
+    else:
+        return q
+
+
+def node_child(q):
+    # q = (noeud, 0 ou 1)
+    if q[0] == 0:
+        return 0
+    else:
+        return q[0][q[1]]
+
+
+def node_get(q):
+    # q = (noeud, taille, position)
+    if q[0] == 0:
+        return 0
+    else:
+        if q[1] == 1:
+            return q[0]
+        else:
+            if q[2] < q[1] // 2:
+                return node_get((q[0][0], q[1] // 2, q[2]))
+            else:
+                return node_get((q[0][1], q[1] // 2, q[2] - q[1] // 2))
+
+
+def node_set(q):
+    # q = (noeud, taille, position, valeur) => nouveau noeud, chemin recopié
+    if q[1] == 1:
+        return q[3]
+    else:
+        if q[0] == 0:
+            if q[3] == 0:
+                return 0
+            else:
+                return node_set(((0, 0), q[1], q[2], q[3]))
+        else:
+            if q[2] < q[1] // 2:
+                return node_pair((node_set((node_child((q[0], 0)), q[1] // 2, q[2], q[3])),
+                                  node_child((q[0], 1))))
+            else:
+                return node_pair((node_child((q[0], 0)),
+                                  node_set((node_child((q[0], 1)), q[1] // 2, q[2] - q[1] // 2, q[3]))))
+
+
+def tape_read(q):
+    # q = (ruban, position) => 0 ou 1
+    if q[1] >= 0:
+        if q[1] >= q[0][0]:
+            return 0
+        else:
+            return node_get((q[0][2], q[0][0], q[1]))
+    else:
+        if -q[1] - 1 >= q[0][0]:
+            return 0
+        else:
+            return node_get((q[0][1], q[0][0], -q[1] - 1))
+
+
+def tape_write(q):
+    # q = (ruban, position, valeur) => nouveau ruban
+    if q[1] >= q[0][0] or -q[1] - 1 >= q[0][0]:
+        if q[2] == 0:
+            return q[0]
+        else:
+            return tape_write((tape_widen(q[0]), q[1], q[2]))
+    else:
+        if q[1] >= 0:
+            return (q[0][0], q[0][1], node_set((q[0][2], q[0][0], q[1], q[2])))
+        else:
+            return (q[0][0], node_set((q[0][1], q[0][0], -q[1] - 1, q[2])), q[0][2])
+
+
+def tape_bytes(q):
+    # q = (ruban, début, fin) => cases début..fin-1 en bytes de 0/1, par moitiés (profondeur O(log n))
+    if q[2] - q[1] <= 0:
+        return b''
+    else:
+        if q[2] - q[1] == 1:
+            return bytes((tape_read((q[0], q[1])),))
+        else:
+            return (tape_bytes((q[0], q[1], (q[1] + q[2]) // 2))
+                    + tape_bytes((q[0], (q[1] + q[2]) // 2, q[2])))
+
+
+def tape_window(q):
+    # q = (ruban, début, fin) => contenu des cases début..fin-1, par exemple '0110'
+    return tape_bytes(q).translate(bytes.maketrans(b'\x00\x01', b'01')).decode('ascii')
+
+
+def node_first(q):
+    # q = (noeud, taille) => indice de la première feuille à 1, -1 si aucune
+    if q[0] == 0:
+        return -1
+    else:
+        if q[1] == 1:
+            return 0
+        else:
+            if q[0][0] != 0:
+                return node_first((q[0][0], q[1] // 2))
+            else:
+                return q[1] // 2 + node_first((q[0][1], q[1] // 2))
+
+
+def node_last(q):
+    # q = (noeud, taille) => indice de la dernière feuille à 1, -1 si aucune
+    if q[0] == 0:
+        return -1
+    else:
+        if q[1] == 1:
+            return 0
+        else:
+            if q[0][1] != 0:
+                return q[1] // 2 + node_last((q[0][1], q[1] // 2))
+            else:
+                return node_last((q[0][0], q[1] // 2))
+
+
+def tape_span(tape):
+    # (première, dernière case à 1) du ruban, None s'il est vide
+    if tape[1] == 0 and tape[2] == 0:
+        return None
+    else:
+        if tape[1] != 0:
+            if tape[2] != 0:
+                return (-node_last((tape[1], tape[0])) - 1, node_last((tape[2], tape[0])))
+            else:
+                return (-node_last((tape[1], tape[0])) - 1, -node_first((tape[1], tape[0])) - 1)
+        else:
+            return (node_first((tape[2], tape[0])), node_last((tape[2], tape[0])))
+
+
+def tape_bounds(q):
+    # q = (mode, largeur, tête, étendue ou None) => (début, fin), comme mtdv.affichage.bornes_fenetre
+    if q[0] == 'etendue' and q[3] is not None and max(q[3][1], q[2]) + 1 - min(q[3][0], q[2]) <= q[1]:
+        return (min(q[3][0], q[2]), max(q[3][1], q[2]) + 1)
+    else:
+        if q[0] == 'fixe':
+            return (0, q[1])
+        else:
+            return (q[2] - q[1] // 2, q[2] - q[1] // 2 + q[1])
+
+
+def tape_view(q):
+    # q = (ruban, (début, fin)) => contenu de la fenêtre
+    return tape_window((q[0], q[1][0], q[1][1]))
+
+
+def tape_display(q):
+    # q = (ruban, tête) => fenêtre affichée selon FENETRE et LARGEUR (mtdv/affichage.py)
+    return tape_view((q[0], tape_bounds((FENETRE, LARGEUR, q[1], tape_span(q[0])))))
+
+
+FONCTIONS = (empty_tape, tape_widen, node_pair, node_child, node_get, node_set,
+             tape_read, tape_write, tape_bytes, tape_window, node_first, node_last, tape_span,
+             tape_bounds, tape_view, tape_display)
+
+
+def source_persistant():
+    """
+    Source des fonctions du ruban persistant, à insérer dans un programme
+    généré autonome, précédée des constantes de la fenêtre d'affichage.
+    """
+    return "\n".join([
+        "# Fenêtre d'affichage (mtdv/affichage.py) : MTDV_FENETRE, MTDV_LARGEUR, lues une fois",
+        "import os",
+        "FENETRE = os.environ.get('MTDV_FENETRE', 'fixe')",
+        "LARGEUR = int(os.environ.get('MTDV_LARGEUR', '61'))",
+        "",
+    ]) + "\n" + "\n\n".join(inspect.getsource(f) for f in FONCTIONS)
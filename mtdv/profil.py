@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Profil d'exécution par instruction, rapporté aux lignes du fichier .TS.
+
+Un Profil compte les exécutions de chaque élément du Programme (compteurs :
+array('q') indexé comme prog.ops, '}' compris) et cumule le temps passé
+dans chaque boucle (temps : array('d'), à l'index de son 'boucle', mesuré
+par time.perf_counter de l'entrée dans la boucle au 'fin' qui en sort).
+Il est rempli par mtdv.moteur (execute(..., profil=Profil(len(prog)))) ou
+par le code généré par traducteur_1.py --profil, qui écrit ses compteurs en
+JSON à la fin de l'exécution (source_profil) ; 'python3 -m mtdv profil' en
+tire alors les rapports.
+
+Sans profil, rien n'est compté : le moteur passe par sa boucle habituelle
+(le comptage a sa propre boucle d'interprétation) et le code généré ne
+contient aucune ligne de comptage.
+
+Deux rapports (ecrire_rapports) :
+  - rapport : chaque ligne du .TS, commentaires '%' compris, précédée du
+    nombre d'exécutions de ses éléments, de leur part du total et du temps
+    des boucles qui y commencent ; puis les boucles par temps décroissant ;
+  - piles repliées (.folded, format de flamegraph.pl, inferno, speedscope) :
+    une pile par (boucles englobantes, ligne), valeur = nombre d'exécutions.
+"""
+
+import json
+import os
+import time
+from array import array
+
+from .ir import OP_BOUCLE, OP_FERME, VERSION_IR
+
+
+class Profil:
+    """
+    Compteurs d'une exécution (voir l'en-tête du module). entree garde
+    l'instant d'entrée de chaque boucle en cours (0 hors de la boucle).
+    """
+    __slots__ = ('compteurs', 'temps', 'entree')
+
+    def __init__(self, n):
+        self.compteurs = array('q', bytes(8 * n))
+        self.temps = array('d', bytes(8 * n))
+        self.entree = array('d', bytes(8 * n))
+
+    def __len__(self):
+        return len(self.compteurs)
+
+    def total(self):
+        return sum(self.compteurs)
+
+    def fermer(self, maintenant=None):
+        """
+        Ajoute leur temps aux boucles encore ouvertes : arrêt par '#' dans
+        une boucle, interruption (budget, recherche sans issue).
+        """
+        if maintenant is None:
+            maintenant = time.perf_counter()
+        for i, t in enumerate(self.entree):
+            if t:
+                self.temps[i] += maintenant - t
+                self.entree[i] = 0.0
+
+    def vers_dict(self, optimise=False):
+        return {'version': VERSION_IR, 'optimise': optimise, 'compteurs': list(self.compteurs),
+                'temps': [[i, t] for i, t in enumerate(self.temps) if t]}
+
+    @classmethod
+    def depuis_dict(cls, d):
+        """
+        Profil écrit par vers_dict ou par le code généré (source_profil).
+        Lève ValueError si d n'est pas un profil de cette version de l'IR.
+        """
+        if not isinstance(d, dict) or d.get('version') != VERSION_IR or 'compteurs' not in d:
+            raise ValueError("profil invalide ou d'une autre version de l'IR")
+        profil = cls(len(d['compteurs']))
+        profil.compteurs = array('q', d['compteurs'])
+        for i, t in d.get('temps', ()):
+            profil.temps[i] = t
+        return profil
+
+
+def lire_profil(chemin):
+    """
+    (Profil, optimise) depuis un fichier JSON écrit par le code généré.
+    """
+    with open(chemin, encoding='utf-8') as f:
+        d = json.load(f)
+    return Profil.depuis_dict(d), bool(d.get('optimise'))
+
+
+_SOURCE = '''\
+# Profil d'exécution (mtdv/profil.py) : MTDV_PROFIL
+import atexit
+import json
+import os
+from array import array
+from time import perf_counter
+COMPTEURS = array('q', bytes({octets}))
+TEMPS = array('d', bytes({octets}))
+ENTREE = array('d', bytes({octets}))
+
+def ecrire_profil():
+    maintenant = perf_counter()
+    for i, t in enumerate(ENTREE):
+        if t:
+            TEMPS[i] += maintenant - t
+            ENTREE[i] = 0.0
+    with open(os.environ.get('MTDV_PROFIL', {chemin!r}), 'w', encoding='utf-8') as f:
+        json.dump({{'version': {version}, 'optimise': {optimise}, 'compteurs': list(COMPTEURS),
+                   'temps': [[i, t] for i, t in enumerate(TEMPS) if t]}}, f)
+
+atexit.register(ecrire_profil)
+'''
+
+
+def source_profil(n, chemin, optimise=False):
+    """
+    Définitions à placer en tête du code généré pour un programme de n
+    éléments : compteurs, et écriture du profil dans chemin (ou
+    MTDV_PROFIL) à la sortie de l'interpréteur, sys.exit compris.
+    """
+    return _SOURCE.format(octets=8 * n, chemin=chemin, version=VERSION_IR, optimise=bool(optimise))
+
+
+def verifier_profil(prog, profil):
+    if len(profil) != len(prog):
+        raise ValueError(f"profil de {len(profil)} éléments pour un programme de {len(prog)} "
+                         "(programme modifié, ou option -O différente ?)")
+
+
+def rapport(prog, lignes, profil, nom='programme'):
+    """
+    Itère sur les lignes du rapport annoté : lignes est le texte du .TS
+    (liste, fichier ouvert ou lignes_fichier), lu une ligne à la fois.
+    """
+    verifier_profil(prog, profil)
+    ops, args = prog.ops, prog.args
+    compteurs, temps = profil.compteurs, profil.temps
+    par_ligne = {}
+    temps_ligne = {}
+    for i, c in enumerate(compteurs):
+        if c:
+            par_ligne[prog.lignes[i]] = par_ligne.get(prog.lignes[i], 0) + c
+        if ops[i] == OP_BOUCLE:
+            temps_ligne[prog.lignes[i]] = temps_ligne.get(prog.lignes[i], 0.0) + temps[i]
+    total = profil.total()
+    # exécutions d'éléments : les pas sans -O (une recherche compte pour un)
+    yield f"% Profil de {nom} : {total} exécutions"
+    yield f"{'exécutions':>12} {'%':>7} {'temps (s)':>12} | {'ligne':>5} | source"
+    for numero, texte in enumerate(lignes, 1):
+        c = par_ligne.get(numero)
+        compte = f"{c:>12} {100 * c / total:6.2f}%" if c else " " * 20
+        duree = f"{temps_ligne[numero]:>12.6f}" if numero in temps_ligne else " " * 12
+        yield f"{compte} {duree} | {numero:>5} | {texte.rstrip(chr(13) + chr(10))}"
+    boucles = [i for i, op in enumerate(ops) if op == OP_BOUCLE and compteurs[i]]
+    if not boucles:
+        return
+    yield ""
+    yield "% Boucles par temps décroissant (exécutions : tours compris, boucles imbriquées comprises)"
+    for i in sorted(boucles, key=lambda i: -temps[i]):
+        pas = sum(compteurs[i:args[i] + 1])
+        yield (f"%   ligne {prog.lignes[i]}, colonne {prog.colonnes[i]} : {temps[i]:.6f} s, "
+               f"{compteurs[i]} entrée(s), {compteurs[args[i]]} tour(s), {pas} exécutions "
+               f"({100 * pas / total:.2f}%)")
+
+
+def piles_repliees(prog, profil, nom='programme'):
+    """
+    Itère sur les lignes « pile valeur » du format replié : racine nom, un
+    cadre par boucle englobante ('boucle ligne:colonne'), puis la ligne du
+    .TS ; valeur = exécutions des éléments de cette ligne dans cette pile.
+    L'entrée dans une boucle compte dans la pile englobante, ses '}' dans
+    la boucle elle-même.
+    """
+    verifier_profil(prog, profil)
+    ops, args = prog.ops, prog.args
+    compteurs = profil.compteurs
+    pile = [nom.replace(';', '_')]
+    piles = {}
+    for i, op in enumerate(ops):
+        c = compteurs[i]
+        if c:
+            cle = f"{';'.join(pile)};ligne {prog.lignes[i]}"
+            piles[cle] = piles.get(cle, 0) + c
+        if op == OP_BOUCLE:
+            pile.append(f"boucle {prog.lignes[i]}:{prog.colonnes[i]}")
+        elif op == OP_FERME and ops[args[i]] == OP_BOUCLE:
+            pile.pop()
+    for cle, c in piles.items():
+        yield f"{cle} {c}"
+
+
+def chemins_rapports(sortie):
+    """
+    (rapport, piles repliées) : sortie et sortie avec l'extension .folded.
+    """
+    return sortie, os.path.splitext(sortie)[0] + '.folded'
+
+
+def ecrire_rapports(prog, lignes, profil, sortie, nom='programme'):
+    """
+    Écrit le rapport annoté dans sortie et les piles repliées à côté
+    (chemins_rapports) ; retourne les deux chemins.
+    """
+    chemin_rapport, chemin_piles = chemins_rapports(sortie)
+    with open(chemin_rapport, 'w', encoding='utf-8', buffering=1 << 16) as f:
+        for ligne in rapport(prog, lignes, profil, nom):
+            f.write(ligne + "\n")
+    with open(chemin_piles, 'w', encoding='utf-8', buffering=1 << 16) as f:
+        for ligne in piles_repliees(prog, profil, nom):
+            f.write(ligne + "\n")
+    return chemin_rapport, chemin_piles
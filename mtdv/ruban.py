@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Rubans MTdV non bornés.
+
+Le ruban est découpé en pages de taille fixe (bytearray), rangées dans un
+dictionnaire indexé par numéro de page. Il s'étend à la demande dans les deux
+directions (positions négatives comprises) et la mémoire occupée est
+proportionnelle à la zone visitée, pas à une taille maximale devinée à
+l'avance.
+
+RubanBits est la variante compacte (un bit par case) ; les deux classes ont
+la même interface et se choisissent avec classe_ruban(bits).
+"""
+
+import inspect
+
+
+class RubanPagine:
+    """
+    Ruban infini à gauche et à droite ; une case jamais écrite vaut 0.
+    La classe ne dépend de rien d'autre : sa source est recopiée telle quelle
+    dans le code généré par traducteur_1.py et traducteur_2.py.
+    """
+    TAILLE_PAGE = 4096
+    DECALAGE = 12
+    MASQUE = 4095
+    __slots__ = ('pages',)
+
+    def __init__(self, contenu=(), debut=0):
+        self.pages = {}
+        for i, v in enumerate(contenu):
+            if v:
+                self[debut + i] = v
+
+    def page(self, n):
+        # Page n (positions n*TAILLE_PAGE .. (n+1)*TAILLE_PAGE-1), créée si besoin
+        p = self.pages.get(n)
+        if p is None:
+            p = self.pages[n] = bytearray(self.TAILLE_PAGE)
+        return p
+
+    def __getitem__(self, pos):
+        p = self.pages.get(pos >> self.DECALAGE)
+        if p is None:
+            return 0
+        return p[pos & self.MASQUE]
+
+    def __setitem__(self, pos, val):
+        p = self.pages.get(pos >> self.DECALAGE)
+        if p is None:
+            if not val:
+                return
+            p = self.page(pos >> self.DECALAGE)
+        p[pos & self.MASQUE] = val
+
+    def fenetre(self, debut, fin):
+        # Contenu des cases debut..fin-1 sous forme de bytes (valeurs 0/1)
+        res = bytearray()
+        pos = debut
+        while pos < fin:
+            off = pos & self.MASQUE
+            k = min(fin - pos, self.TAILLE_PAGE - off)
+            p = self.pages.get(pos >> self.DECALAGE)
+            res += bytes(k) if p is None else p[off:off + k]
+            pos += k
+        return bytes(res)
+
+    def remplir(self, debut, fin, val=1):
+        # Cases debut..fin-1 mises à val, page par page
+        pos = debut
+        while pos < fin:
+            off = pos & self.MASQUE
+            k = min(fin - pos, self.TAILLE_PAGE - off)
+            self.page(pos >> self.DECALAGE)[off:off + k] = bytes([val]) * k
+            pos += k
+
+    def chercher(self, pos, val, sens=1):
+        # Première case valant val à partir de pos, vers la droite (sens=1) ou
+        # vers la gauche (sens=-1) ; None si aucune (la recherche ne finit pas).
+        # Une page absente ne contient que des 0.
+        pages = self.pages
+        n = pos >> self.DECALAGE
+        off = pos & self.MASQUE
+        while True:
+            p = pages.get(n)
+            if p is not None:
+                i = p.find(val, off) if sens > 0 else p.rfind(val, 0, off + 1)
+                if i >= 0:
+                    return (n << self.DECALAGE) + i
+                n += sens
+                off = 0 if sens > 0 else self.MASQUE
+                continue
+            if val == 0:
+                return (n << self.DECALAGE) + off
+            # saute directement à la prochaine page existante
+            autres = [k for k in pages if (k - n) * sens > 0]
+            if not autres:
+                return None
+            n = min(autres) if sens > 0 else max(autres)
+            off = 0 if sens > 0 else self.MASQUE
+
+    def etendue(self):
+        # (première, dernière) position contenant un 1, ou None si le ruban est vide
+        premier = dernier = None
+        for n in sorted(self.pages):
+            p = self.pages[n]
+            i = p.find(1)
+            if i < 0:
+                continue
+            if premier is None:
+                premier = (n << self.DECALAGE) + i
+            dernier = (n << self.DECALAGE) + p.rfind(1)
+        if premier is None:
+            return None
+        return (premier, dernier)
+
+    def compter(self):
+        # Nombre de cases à 1 ("bâtons")
+        return sum(p.count(1) for p in self.pages.values())
+
+    def __repr__(self):
+        e = self.etendue()
+        if e is None:
+            return "RubanPagine()"
+        contenu = ''.join(str(x) for x in self.fenetre(e[0], e[1] + 1))
+        return f"RubanPagine(debut={e[0]}, '{contenu}')"
+
+
+class RubanBits:
+    """
+    Même interface que RubanPagine, mais une case occupe un seul bit : la
+    case k d'une page est le bit (k & 7) de l'octet k >> 3. Prévu pour les
+    programmes unaires sur des millions de bâtons.
+    """
+    TAILLE_PAGE = 32768
+    DECALAGE = 15
+    MASQUE = 32767
+    # octet => ses 8 cases, bit de poids faible en premier
+    OCTETS = [bytes((b >> k) & 1 for k in range(8)) for b in range(256)]
+    __slots__ = ('pages',)
+
+    def __init__(self, contenu=(), debut=0):
+        self.pages = {}
+        for i, v in enumerate(contenu):
+            if v:
+                self[debut + i] = v
+
+    def page(self, n):
+        p = self.pages.get(n)
+        if p is None:
+            p = self.pages[n] = bytearray(self.TAILLE_PAGE >> 3)
+        return p
+
+    def __getitem__(self, pos):
+        p = self.pages.get(pos >> self.DECALAGE)
+        if p is None:
+            return 0
+        off = pos & self.MASQUE
+        return (p[off >> 3] >> (off & 7)) & 1
+
+    def __setitem__(self, pos, val):
+        p = self.pages.get(pos >> self.DECALAGE)
+        if p is None:
+            if not val:
+                return
+            p = self.page(pos >> self.DECALAGE)
+        off = pos & self.MASQUE
+        if val:
+            p[off >> 3] |= 1 << (off & 7)
+        else:
+            p[off >> 3] &= 0xFF ^ (1 << (off & 7))
+
+    def fenetre(self, debut, fin):
+        # Contenu des cases debut..fin-1 (bytes de 0/1), décodé octet par octet
+        if fin <= debut:
+            return b''
+        a = debut & ~7
+        res = bytearray()
+        pos = a
+        while pos < fin:
+            off = pos & self.MASQUE
+            k = min(fin - pos, self.TAILLE_PAGE - off)
+            octets = (k + 7) >> 3
+            p = self.pages.get(pos >> self.DECALAGE)
+            if p is None:
+                res += bytes(octets << 3)
+            else:
+                res += b''.join([self.OCTETS[b] for b in p[off >> 3:(off >> 3) + octets]])
+            pos += octets << 3
+        return bytes(res[debut - a:fin - a])
+
+    def remplir(self, debut, fin, val=1):
+        # Les octets entièrement couverts sont écrits d'un bloc
+        pos = debut
+        while pos < fin and pos & 7:
+            self[pos] = val
+            pos += 1
+        while fin - pos >= 8:
+            off = pos & self.MASQUE
+            k = min((fin - pos) >> 3, (self.TAILLE_PAGE - off) >> 3)
+            self.page(pos >> self.DECALAGE)[off >> 3:(off >> 3) + k] = bytes([0xFF if val else 0]) * k
+            pos += k << 3
+        while pos < fin:
+            self[pos] = val
+            pos += 1
+
+    def chercher(self, pos, val, sens=1):
+        # Comme RubanPagine.chercher, sur l'entier formé par les bits de la page
+        pages = self.pages
+        plein = (1 << self.TAILLE_PAGE) - 1
+        n = pos >> self.DECALAGE
+        off = pos & self.MASQUE
+        while True:
+            p = pages.get(n)
+            if p is not None:
+                v = int.from_bytes(p, 'little')
+                if val == 0:
+                    v ^= plein
+                if sens > 0:
+                    v >>= off
+                    if v:
+                        return (n << self.DECALAGE) + off + (v & -v).bit_length() - 1
+                    off = 0
+                else:
+                    v &= (2 << off) - 1
+                    if v:
+                        return (n << self.DECALAGE) + v.bit_length() - 1
+                    off = self.MASQUE
+                n += sens
+                continue
+            if val == 0:
+                return (n << self.DECALAGE) + off
+            autres = [k for k in pages if (k - n) * sens > 0]
+            if not autres:
+                return None
+            n = min(autres) if sens > 0 else max(autres)
+            off = 0 if sens > 0 else self.MASQUE
+
+    def etendue(self):
+        premier = dernier = None
+        for n in sorted(self.pages):
+            v = int.from_bytes(self.pages[n], 'little')
+            if not v:
+                continue
+            if premier is None:
+                premier = (n << self.DECALAGE) + ((v & -v).bit_length() - 1)
+            dernier = (n << self.DECALAGE) + v.bit_length() - 1
+        if premier is None:
+            return None
+        return (premier, dernier)
+
+    def compter(self):
+        # popcount de chaque page
+        return sum(int.from_bytes(p, 'little').bit_count() for p in self.pages.values())
+
+    def __repr__(self):
+        e = self.etendue()
+        if e is None:
+            return "RubanBits()"
+        contenu = ''.join(str(x) for x in self.fenetre(e[0], e[1] + 1))
+        return f"RubanBits(debut={e[0]}, '{contenu}')"
+
+
+# Ruban à sentinelles du mode --local de traducteur_1.py : un bytearray t dont
+# la case p du ruban est t[origine + p], bordé de marge cases qui restent à 0.
+# Le code généré ne vérifie la tête qu'au début de chaque tour de boucle et
+# après une recherche (marge <= head < limite, limite = len(t) - marge) ;
+# entre deux vérifications elle parcourt moins de marge cases, donc les
+# lectures et écritures t[head] n'ont besoin d'aucun test de bornes.
+
+def elargir_sentinelles(t, origine, head, marge):
+    # Ruban deux fois plus grand, ancien contenu au milieu => (t, origine, head, limite)
+    n = len(t)
+    nouveau = bytearray(2 * n + 4 * marge)
+    d = n // 2 + 2 * marge
+    nouveau[d:d + n] = t
+    return nouveau, origine + d, head + d, len(nouveau) - marge
+
+
+def remplir_sentinelles(t, origine, head, marge, debut, fin):
+    # Cases debut..fin-1 du ruban mises à 1, en l'élargissant si besoin
+    while fin > debut and (origine + debut < marge or origine + fin > len(t) - marge):
+        t, origine, head, _ = elargir_sentinelles(t, origine, head, marge)
+    if fin > debut:
+        t[origine + debut:origine + fin] = bytes([1]) * (fin - debut)
+    return t, origine, head, len(t) - marge
+
+
+def source_sentinelles():
+    """
+    Source des fonctions du ruban à sentinelles, à insérer dans un programme
+    généré autonome.
+    """
+    return "\n\n".join(inspect.getsource(f) for f in (elargir_sentinelles, remplir_sentinelles))
+
+
+def classe_ruban(bits=False):
+    return RubanBits if bits else RubanPagine
+
+
+def source_ruban(classe=RubanPagine):
+    """
+    Source de la classe de ruban, à insérer dans un programme généré autonome.
+    """
+    return inspect.getsource(classe)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Analyse syntaxique P0, version itérative.
+
+Produit le même flot (tokID, tok, K) que l'ancienne descente récursive
+_parse_tokens_P0, mais avec un simple index sur la liste des tokens : pas de
+copie tokens[1:] à chaque token et une profondeur de pile Python constante,
+quelle que soit la taille du programme.
+"""
+
+OUVRANTS = ('boucle', 'si(0)', 'si(1)')
+SIMPLES = ('I', 'P', 'G', 'D', '0', '1', 'fin')
+
+
+def analyse_P0(tokens, parse_result, diese_obligatoire=True):
+    """
+    Remplit parse_result avec (tokID, tok, K) et retourne True si l'analyse réussit.
+      - 'boucle', 'si(0)', 'si(1)' => K augmente de 1
+      - '}' => K diminue de 1 (erreur si K devient négatif)
+      - '#' => fin de l'analyse
+    diese_obligatoire=True (traducteur_1) : le programme doit se terminer par
+    '#' au niveau 0. Sinon (traducteur_2) : la fin des tokens ou un '#' à
+    n'importe quel niveau termine l'analyse avec succès.
+    """
+    append = parse_result.append
+    K = 0
+    tokid = 0
+    for tok in tokens:
+        tokid += 1
+        append((tokid, tok, K))
+        if tok in SIMPLES:
+            continue
+        elif tok in OUVRANTS:
+            K += 1
+        elif tok == '}':
+            if K < 1:
+                print(f"ERREUR : '}}' non apparié (token {tokid}).")
+                return False
+            K -= 1
+        elif tok == '#':
+            if K == 0 or not diese_obligatoire:
+                return True
+            print(f"ERREUR : '#' à l'intérieur d'un bloc (token {tokid}, K={K}).")
+            return False
+        elif diese_obligatoire:
+            print(f'ERREUR : token inattendu "{tok}" (K={K})')
+            return False
+    # Tokens épuisés sans '#'
+    return not diese_obligatoire
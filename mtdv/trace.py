@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Trace d'exécution binaire compacte, et relecture de l'état du ruban à
+n'importe quel pas.
+
+mtdv.moteur (execute(..., trace=EcrivainTrace(chemin))) enregistre un
+enregistrement (pas, noeud, tête, case écrite) pour chaque instruction qui
+déplace la tête ou écrit une case ; les 'si', 'boucle', '}', 'fin', 'I' et
+'P' ne changent pas l'état et ne sont pas enregistrés.
+
+Format :
+  en-tête  MAGIC (4 o), FORMAT (H), options (H) ; OPT_ZLIB => le corps est
+           compressé par zlib
+  corps    suite d'entiers varint (7 bits par octet, bit de poids fort =>
+           octet suivant), les entiers signés en zigzag :
+             tête initiale, nombre de plages de 1 du ruban initial, puis
+             pour chaque plage (début - fin de la précédente, longueur) ;
+             puis trois entiers par enregistrement, différences avec le
+             précédent :
+               (noeud - noeud précédent - 1) << 2 | écriture
+                   (écriture : 0 aucune, 1 case mise à 0, 2 case mise à 1)
+               tête - tête précédente
+               pas - pas précédent - 1
+Une boucle serrée produit des différences constantes : un enregistrement
+tient en général en 3 octets, bien moins encore avec OPT_ZLIB.
+
+L'écrivain accumule les octets dans un tampon écrit (et compressé) par blocs
+de TAILLE_TAMPON ; le lecteur décode le fichier par blocs, en mémoire
+bornée, pour reconstituer le ruban au pas voulu (etat_au_pas).
+"""
+
+import struct
+import zlib
+
+from .ruban import RubanPagine
+
+MAGIC = b'MTDT'
+FORMAT = 1
+EXTENSION_TRACE = '.mtt'
+
+OPT_ZLIB = 1
+
+TAILLE_TAMPON = 1 << 16
+
+_ENTETE = struct.Struct('<4sHH')
+
+
+class TraceInvalide(ValueError):
+    """
+    Fichier qui n'est pas une trace mtdv, ou d'un autre format.
+    """
+
+
+def _varint(tampon, v):
+    while v > 0x7f:
+        tampon.append((v & 0x7f) | 0x80)
+        v >>= 7
+    tampon.append(v)
+
+
+def _zigzag(v):
+    return v << 1 if v >= 0 else ((-v) << 1) - 1
+
+
+def _dezigzag(v):
+    return v >> 1 if not v & 1 else -((v + 1) >> 1)
+
+
+def plages_ruban(tape):
+    """
+    (début, longueur) des suites de cases à 1 d'un ruban (RubanPagine ou
+    RubanBits), dans l'ordre.
+    """
+    e = tape.etendue()
+    if not e:
+        return []
+    plages = []
+    debut = None
+    for pos, x in enumerate(tape.fenetre(e[0], e[1] + 2), e[0]):
+        if x and debut is None:
+            debut = pos
+        elif not x and debut is not None:
+            plages.append((debut, pos - debut))
+            debut = None
+    return plages
+
+
+class EcrivainTrace:
+    """
+    Trace en cours d'écriture dans le fichier chemin (voir l'en-tête du
+    module). S'utilise avec 'with', ou fermer() à la fin de l'exécution.
+    """
+    __slots__ = ('f', 'tampon', 'compresseur', 'taille_tampon', 'pas', 'noeud', 'head', 'enregistrements')
+
+    def __init__(self, chemin, compresser=False, taille_tampon=TAILLE_TAMPON):
+        self.f = open(chemin, 'wb')
+        self.f.write(_ENTETE.pack(MAGIC, FORMAT, OPT_ZLIB if compresser else 0))
+        self.compresseur = zlib.compressobj() if compresser else None
+        self.tampon = bytearray()
+        self.taille_tampon = taille_tampon
+        self.pas = 0
+        self.noeud = -1
+        self.head = 0
+        self.enregistrements = 0
+
+    def debut(self, tape, head):
+        """
+        État initial : position de la tête et plages de 1 du ruban.
+        """
+        tampon = self.tampon
+        _varint(tampon, _zigzag(head))
+        plages = plages_ruban(tape)
+        _varint(tampon, len(plages))
+        fin = 0
+        for debut, longueur in plages:
+            _varint(tampon, _zigzag(debut - fin))
+            _varint(tampon, longueur)
+            fin = debut + longueur
+        self.head = head
+
+    def enregistrer(self, pas, noeud, head, ecrit):
+        """
+        L'instruction noeud, exécutée au pas pas, a laissé la tête en head
+        et écrit ecrit dans la case (-1 : aucune écriture).
+        """
+        tampon = self.tampon
+        v = _zigzag(noeud - self.noeud - 1) << 2 | (ecrit + 1)
+        while v > 0x7f:
+            tampon.append((v & 0x7f) | 0x80)
+            v >>= 7
+        tampon.append(v)
+        v = head - self.head
+        v = v << 1 if v >= 0 else ((-v) << 1) - 1
+        while v > 0x7f:
+            tampon.append((v & 0x7f) | 0x80)
+            v >>= 7
+        tampon.append(v)
+        v = pas - self.pas - 1
+        while v > 0x7f:
+            tampon.append((v & 0x7f) | 0x80)
+            v >>= 7
+        tampon.append(v)
+        self.pas, self.noeud, self.head = pas, noeud, head
+        self.enregistrements += 1
+        if len(tampon) >= self.taille_tampon:
+            self.vider()
+
+    def vider(self):
+        if self.compresseur is not None:
+            self.f.write(self.compresseur.compress(self.tampon))
+        else:
+            self.f.write(self.tampon)
+        self.tampon.clear()
+
+    def fermer(self):
+        if self.f.closed:
+            return
+        self.vider()
+        if self.compresseur is not None:
+            self.f.write(self.compresseur.flush())
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+def _blocs(f, compresse, taille=TAILLE_TAMPON):
+    # Octets du corps, par blocs (décompressés si besoin)
+    decompresseur = zlib.decompressobj() if compresse else None
+    while True:
+        bloc = f.read(taille)
+        if not bloc:
+            break
+        if decompresseur is not None:
+            bloc = decompresseur.decompress(bloc)
+        if bloc:
+            yield bloc
+    if decompresseur is not None:
+        reste = decompresseur.flush()
+        if reste:
+            yield reste
+
+
+def _entiers(f, compresse):
+    # Entiers varint du corps, décodés bloc par bloc
+    v = 0
+    decalage = 0
+    for bloc in _blocs(f, compresse):
+        for octet in bloc:
+            v |= (octet & 0x7f) << decalage
+            if octet & 0x80:
+                decalage += 7
+            else:
+                yield v
+                v = 0
+                decalage = 0
+    if decalage:
+        raise TraceInvalide("trace tronquée")
+
+
+class LecteurTrace:
+    """
+    Relecture d'une trace : head et plages initiales, puis itération sur les
+    enregistrements (pas, noeud, tête, écriture ; écriture -1 si aucune).
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.f = open(chemin, 'rb')
+        entete = self.f.read(_ENTETE.size)
+        if len(entete) < _ENTETE.size:
+            self.f.close()
+            raise TraceInvalide(f"{chemin} : fichier trop court")
+        magic, fmt, options = _ENTETE.unpack(entete)
+        if magic != MAGIC or fmt != FORMAT:
+            self.f.close()
+            raise TraceInvalide(f"{chemin} : pas une trace mtdv de format {FORMAT}")
+        self.entiers = _entiers(self.f, options & OPT_ZLIB)
+        try:
+            self.head = _dezigzag(next(self.entiers))
+            self.plages = []
+            fin = 0
+            for _ in range(next(self.entiers)):
+                debut = fin + _dezigzag(next(self.entiers))
+                longueur = next(self.entiers)
+                self.plages.append((debut, longueur))
+                fin = debut + longueur
+        except StopIteration:
+            self.f.close()
+            raise TraceInvalide(f"{chemin} : en-tête de trace incomplet") from None
+
+    def __iter__(self):
+        entiers = self.entiers
+        pas, noeud, head = 0, -1, self.head
+        for a in entiers:
+            try:
+                dh = next(entiers)
+                dp = next(entiers)
+            except StopIteration:
+                raise TraceInvalide("enregistrement incomplet") from None
+            noeud += _dezigzag(a >> 2) + 1
+            head += _dezigzag(dh)
+            pas += dp + 1
+            yield pas, noeud, head, (a & 3) - 1
+
+    def fermer(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+def etat_au_pas(chemin, pas=None):
+    """
+    (ruban, tête, pas du dernier enregistrement appliqué) après le pas pas
+    de l'exécution tracée dans chemin (None : à la fin de la trace). Le
+    ruban est un RubanPagine reconstruit depuis l'état initial.
+    """
+    with LecteurTrace(chemin) as lecteur:
+        tape = RubanPagine()
+        for debut, longueur in lecteur.plages:
+            tape.remplir(debut, debut + longueur)
+        head = lecteur.head
+        dernier = 0
+        for p, _, h, ecrit in lecteur:
+            if pas is not None and p > pas:
+                break
+            head = h
+            dernier = p
+            if ecrit >= 0:
+                tape[h] = ecrit
+        return tape, head, dernier
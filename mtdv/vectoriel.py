@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+Exécution d'un même programme sur N rubans à la fois, avec NumPy.
+
+Les N rubans forment un tableau 2-D uint8 (une ligne par ruban), les têtes
+et les compteurs ordinaux (pc) des vecteurs. À chaque tour, toutes les
+exécutions encore actives avancent d'une instruction : les déplacements,
+les écritures et les tests 'si' sont des opérations masquées sur ces
+tableaux, et une exécution est retirée dès qu'elle atteint la fin du
+programme ('fin' hors boucle, '#'). Les tables par instruction (déplacement,
+symbole écrit, condition, cible de saut) sont précalculées à partir du
+Moteur.
+
+NumPy est une dépendance optionnelle : sans lui, ce module s'importe mais
+MoteurVectoriel lève ImportError.
+"""
+
+import time
+
+try:
+    import numpy as np
+except ImportError:  # dépendance optionnelle
+    np = None
+
+from .ir import (OP_0, OP_1, OP_BOUCLE, OP_CHERCHE_D, OP_CHERCHE_G, OP_D, OP_DEPLACE, OP_DIESE,
+                 OP_FERME, OP_FIN, OP_G, OP_SI0, OP_SI1)
+from .moteur import MOTIF_DELAI, MOTIF_PAS, MOTIF_SANS_FIN, Moteur, arret_recherche, pas_recherche
+from .multi import LARGEUR_RESUME, ruban_depuis_spec, statut
+
+# Cases ajoutées au minimum quand une tête sort du tableau
+MARGE = 64
+# Avec un délai, l'horloge est lue une fois tous les TOURS_VERIF tours
+TOURS_VERIF = 1024
+
+# ResultatVectoriel.motifs contient l'index du motif dans MOTIFS
+MOTIFS = (None, MOTIF_PAS, MOTIF_DELAI, MOTIF_SANS_FIN)
+_PAS, _DELAI, _SANS_FIN = 1, 2, 3
+
+
+class ResultatVectoriel:
+    """
+    États finaux de N exécutions. La case k du ruban i est
+    tapes[i, k + origine] ; heads sont en coordonnées de ruban (comme
+    Resultat.head), motifs les index dans MOTIFS des motifs d'interruption.
+    """
+    __slots__ = ('tapes', 'origine', 'heads', 'pas', 'motifs')
+
+    def __init__(self, tapes, origine, heads, pas, motifs):
+        self.tapes = tapes
+        self.origine = origine
+        self.heads = heads
+        self.pas = pas
+        self.motifs = motifs
+
+    def motif(self, i):
+        return MOTIFS[self.motifs[i]]
+
+    def __len__(self):
+        return len(self.heads)
+
+    def resume(self, i, largeur=LARGEUR_RESUME):
+        """
+        Même dictionnaire que mtdv.multi.resume pour l'exécution i.
+        """
+        ligne = self.tapes[i]
+        uns = np.flatnonzero(ligne)
+        motif = self.motif(i)
+        d = {'tete': int(self.heads[i]), 'pas': int(self.pas[i]), 'statut': statut(motif)}
+        if d['statut'] == 'limite':
+            d['motif'] = motif
+        d['batons'] = int(len(uns))
+        if len(uns):
+            e = (int(uns[0]) - self.origine, int(uns[-1]) - self.origine)
+            d['etendue'] = list(e)
+            if e[1] - e[0] < largeur:
+                d['ruban'] = ''.join('1' if x else '0' for x in ligne[uns[0]:uns[-1] + 1])
+        else:
+            d['etendue'] = None
+        return d
+
+
+class MoteurVectoriel:
+    """
+    Programme préparé pour l'exécution simultanée sur de nombreux rubans.
+    'I' et 'P' n'affichent rien (pas de sens pour N rubans à la fois).
+    """
+
+    def __init__(self, programme):
+        if np is None:
+            raise ImportError("mtdv.vectoriel nécessite numpy (pip install numpy)")
+        moteur = Moteur(programme)
+        n = len(moteur.ops)
+        self.n = n
+        self.ops = moteur.ops
+        self.args = moteur.arg
+        # Tables indexées par pc ; la case n (programme terminé) ne fait rien.
+        #   suivant[2*pc + case lue] : pc suivant (les 'si' y sont résolus)
+        #   valeur[2*pc + case lue]  : nouveau contenu de la case
+        #   depl[pc]                 : déplacement de la tête
+        #   poids[pc]                : pas comptés (un OP_DEPLACE de d cases en compte |d|)
+        suivant = np.empty(2 * (n + 1), dtype=np.int64)
+        valeur = np.tile(np.array([0, 1], dtype=np.uint8), n + 1)
+        self.depl = np.zeros(n + 1, dtype=np.int64)
+        self.poids = np.ones(n + 1, dtype=np.int64)
+        self.controle = np.zeros(n + 1, dtype=bool)
+        self.cherche = np.zeros(n + 1, dtype=bool)
+        suivant[2 * n:] = n
+        for i, op in enumerate(moteur.ops):
+            suivant[2 * i] = suivant[2 * i + 1] = i + 1
+            if op == OP_D:
+                self.depl[i] = 1
+            elif op == OP_G:
+                self.depl[i] = -1
+            elif op == OP_DEPLACE:
+                self.depl[i] = moteur.arg[i]
+                self.poids[i] = abs(moteur.arg[i])
+            elif op == OP_0 or op == OP_1:
+                valeur[2 * i] = valeur[2 * i + 1] = 1 if op == OP_1 else 0
+            elif op == OP_SI0:
+                suivant[2 * i + 1] = moteur.cible[i]
+            elif op == OP_SI1:
+                suivant[2 * i] = moteur.cible[i]
+            elif op in (OP_BOUCLE, OP_FERME, OP_FIN, OP_DIESE):
+                suivant[2 * i] = suivant[2 * i + 1] = moteur.cible[i]
+                self.controle[i] = True
+            elif op == OP_CHERCHE_D or op == OP_CHERCHE_G:
+                self.cherche[i] = True
+        self.suivant = suivant
+        self.valeur = valeur
+        self.a_cherche = bool(self.cherche.any())
+        self.depl_max = max(1, int(np.abs(self.depl).max()))
+
+    def execute(self, tapes, heads, origine=0, pas_max=None, delai=None):
+        """
+        Exécute le programme sur chaque ligne de tapes (tableau uint8 N x L,
+        case k du ruban en colonne k + origine) à partir des têtes heads.
+        Le tableau est agrandi si une tête en sort. pas_max vaut pour chaque
+        ruban, les pas comptés comme mtdv.moteur (instructions d'origine) ; à l'échéance de delai (pour tout le lot), les exécutions
+        encore actives sont interrompues. Retourne un ResultatVectoriel.
+        """
+        tapes = np.array(tapes, dtype=np.uint8)
+        nb, largeur = tapes.shape
+        n = self.n
+        suivant, valeur, depl = self.suivant, self.valeur, self.depl
+        col_final = np.asarray(heads, dtype=np.int64) + origine
+        pas = np.zeros(nb, dtype=np.int64)
+        motifs = np.zeros(nb, dtype=np.int8)
+        echeance = None if delai is None else time.monotonic() + delai
+        # État des exécutions actives, compacté à chaque retrait
+        actifs = np.arange(nb) if n else np.arange(0)
+        pc = np.zeros(len(actifs), dtype=np.int64)
+        col = col_final[actifs].copy()
+        p = np.zeros(len(actifs), dtype=np.int64)
+        tapes, col, decale, largeur = _agrandir(tapes, col, 0, self.depl_max)
+        col_final += decale
+        origine += decale
+        ruban = tapes.reshape(-1)
+        base = actifs * largeur
+        # nombre de tours sûrs avant de revérifier les bords du tableau
+        sur = min(int(col.min()), largeur - 1 - int(col.max())) // self.depl_max if len(col) else 0
+        t = 0
+        while len(actifs):
+            t += 1
+            # toutes les exécutions actives ont fait exactement t tours ; p
+            # compte leurs pas
+            idx = base + col
+            case = ruban[idx]
+            k = 2 * pc + case
+            ruban[idx] = valeur[k]
+            col += depl[pc]
+            p += self.poids[pc]
+            nouveau = suivant[k]
+            if self.a_cherche:
+                m = self.cherche[pc]
+                if m.any():
+                    for j in np.flatnonzero(m):
+                        arret = self._recherche(tapes[actifs[j]], int(pc[j]), int(col[j]), int(p[j]), pas_max)
+                        if arret[2]:
+                            motifs[actifs[j]] = arret[2]
+                            nouveau[j] = n
+                        col[j], p[j] = arret[0], arret[1]
+                    sur = 0
+            if pas_max is not None:
+                lim = self.controle[pc] & (p >= pas_max)
+                if lim.any():
+                    motifs[actifs[lim]] = _PAS
+                    nouveau[lim] = n
+            if echeance is not None and t % TOURS_VERIF == 0 and time.monotonic() >= echeance:
+                motifs[actifs[nouveau != n]] = _DELAI
+                nouveau[:] = n
+            pc = nouveau
+            fini = pc == n
+            if fini.any():
+                f = actifs[fini]
+                pas[f] = p[fini]
+                col_final[f] = col[fini]
+                garde = ~fini
+                actifs, pc, col, p = actifs[garde], pc[garde], col[garde], p[garde]
+                base = base[garde]
+                if not len(actifs):
+                    break
+            sur -= 1
+            if sur <= 0:
+                tapes2, col, decale, largeur2 = _agrandir(tapes, col, 0, self.depl_max)
+                if tapes2 is not tapes:
+                    tapes, largeur = tapes2, largeur2
+                    ruban = tapes.reshape(-1)
+                    base = actifs * largeur
+                    col_final += decale
+                    origine += decale
+                sur = min(int(col.min()), largeur - 1 - int(col.max())) // self.depl_max
+        return ResultatVectoriel(tapes, origine, col_final - origine, pas, motifs)
+
+    def _recherche(self, ligne, p, c, pas, pas_max):
+        """
+        Recherche de l'instruction p depuis la colonne c, au pas pas (voir
+        mtdv.moteur._recherche) => (colonne, pas, index du motif ou 0).
+        """
+        arg = int(self.args[p])
+        if pas_max is not None and pas >= pas_max:
+            return c, pas, _PAS
+        pos = self._chercher(ligne, p, c)
+        if pos is None and pas_max is None:
+            # recherche sans issue : boucle sans fin
+            return c, pas, _SANS_FIN
+        k = None if pos is None else abs(pos - c)
+        fin = None if k is None else pas + pas_recherche(arg, k) - 1
+        if k is None or (pas_max is not None and fin >= pas_max):
+            j, r = arret_recherche(arg, k, pas_max - pas + 1)
+            return c + j if self.ops[p] == OP_CHERCHE_D else c - j, pas + r - 1, _PAS
+        return pos, fin, 0
+
+    def _chercher(self, ligne, p, c):
+        """
+        Colonne de la première case à x rencontrée (voir RubanPagine.chercher),
+        éventuellement hors du tableau ; None si elle n'existe pas.
+        """
+        arg = int(self.args[p])
+        val = arg & 1
+        if self.ops[p] == OP_CHERCHE_D:
+            debut = c + (arg >> 1)
+            trouve = np.flatnonzero(ligne[debut:] == val)
+            if len(trouve):
+                return debut + int(trouve[0])
+            if val == 0:
+                # au-delà du tableau, le ruban est vide
+                return max(debut, len(ligne))
+        else:
+            debut = c - (arg >> 1)
+            trouve = np.flatnonzero(ligne[:debut + 1] == val) if debut >= 0 else ()
+            if len(trouve):
+                return int(trouve[-1])
+            if val == 0:
+                return min(debut, -1)
+        return None
+
+
+def _agrandir(tapes, col, origine, marge):
+    """
+    Agrandit le tableau (à gauche et/ou à droite) pour que toutes les têtes
+    col soient à plus de marge cases des bords.
+    Retourne (tapes, col, origine, largeur) décalés d'autant.
+    """
+    largeur = tapes.shape[1]
+    if not len(col):
+        return tapes, col, origine, largeur
+    bas = int(col.min()) - marge
+    haut = int(col.max()) + marge
+    if bas >= 0 and haut < largeur:
+        return tapes, col, origine, largeur
+    gauche = max(MARGE, largeur // 2, -bas) if bas < 0 else 0
+    droite = max(MARGE, largeur // 2, haut - largeur + 1) if haut >= largeur else 0
+    tapes = np.pad(tapes, ((0, 0), (gauche, droite)))
+    return tapes, col + gauche, origine + gauche, tapes.shape[1]
+
+
+def tableau_depuis_rubans(rubans, heads):
+    """
+    (tapes, origine) pour une liste de rubans (RubanPagine, RubanBits...) et
+    leurs têtes : toutes les cases à 1 et toutes les têtes tiennent dans le
+    tableau.
+    """
+    bas, haut = 0, 0
+    etendues = []
+    for tape, head in zip(rubans, heads):
+        e = tape.etendue()
+        etendues.append(e)
+        bas = min(bas, head, e[0] if e else 0)
+        haut = max(haut, head, e[1] if e else 0)
+    tapes = np.zeros((len(rubans), haut - bas + 1 + MARGE), dtype=np.uint8)
+    origine = -bas
+    for i, (tape, e) in enumerate(zip(rubans, etendues)):
+        if e:
+            tapes[i, e[0] + origine:e[1] + origine + 1] = np.frombuffer(bytes(tape.fenetre(e[0], e[1] + 1)), dtype=np.uint8)
+    return tapes, origine
+
+
+def executer_vectoriel(programme, rubans, heads, pas_max=None, delai=None):
+    """
+    Raccourci : exécute programme sur chaque (ruban, tête) et retourne un
+    ResultatVectoriel.
+    """
+    tapes, origine = tableau_depuis_rubans(rubans, heads)
+    return MoteurVectoriel(programme).execute(tapes, heads, origine, pas_max, delai)
+
+
+def executer_specs(programme, specs, pas_max=None, bits=False, taille_lot=4096, largeur=LARGEUR_RESUME,
+                   delai=None):
+    """
+    Équivalent de mtdv.multi.executer_multi, dans le processus courant :
+    les spécifications sont exécutées par lots de taille_lot rubans à la
+    fois, résultats produits dans l'ordre. delai vaut ici pour chaque lot.
+    """
+    moteur = MoteurVectoriel(programme)
+    lot = []
+    for spec in specs:
+        lot.append(spec)
+        if len(lot) == taille_lot:
+            yield from _executer_lot(moteur, lot, pas_max, bits, largeur, delai)
+            lot = []
+    if lot:
+        yield from _executer_lot(moteur, lot, pas_max, bits, largeur, delai)
+
+
+def _executer_lot(moteur, lot, pas_max, bits, largeur, delai):
+    rubans, heads, valides, erreurs = [], [], [], {}
+    for numero, spec in lot:
+        try:
+            tape, head = ruban_depuis_spec(spec, bits)
+        except ValueError as e:
+            erreurs[numero] = str(e)
+            continue
+        rubans.append(tape)
+        heads.append(head)
+        valides.append(numero)
+    res = None
+    if rubans:
+        tapes, origine = tableau_depuis_rubans(rubans, heads)
+        res = moteur.execute(tapes, heads, origine, pas_max, delai)
+    k = 0
+    for numero, _ in lot:
+        d = {'id': numero}
+        if numero in erreurs:
+            d['erreur'] = erreurs[numero]
+        else:
+            d.update(res.resume(k, largeur))
+            k += 1
+        yield d
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Éléments communs aux tests : programmes de programmesTS/, rubans d'entrée
+(les deux plages saisies par le code généré) et exécution de référence par
+l'interprète mtdv.moteur, sortie des 'I' / 'P' écartée.
+"""
+
+import contextlib
+import glob
+import io
+import os
+import random
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# les traducteurs sont des scripts à la racine, à côté du paquet mtdv
+if RACINE not in sys.path:
+    sys.path.insert(0, RACINE)
+
+from mtdv import execute, programme_depuis_lignes  # noqa: E402
+from mtdv.lexeur import lire_lignes  # noqa: E402
+from mtdv.ruban import classe_ruban  # noqa: E402
+
+DOSSIER_TS = os.path.join(RACINE, 'programmesTS')
+PROGRAMMES = sorted(glob.glob(os.path.join(DOSSIER_TS, '*.TS')) + glob.glob(os.path.join(DOSSIER_TS, '*.ts')))
+NOMS = [os.path.basename(f) for f in PROGRAMMES]
+
+# pas au-delà desquels une entrée est écartée (programme sans fin sur cette entrée)
+PAS_MAX = 200000
+
+
+def entrees(graine, nombre):
+    """
+    nombre entrées (début 1, longueur 1, début 2, longueur 2) tirées avec la
+    graine donnée : deux plages de bâtons séparées par une case vide, comme
+    les saisies de execute_program, la tête (case 30) sur la première.
+    """
+    hasard = random.Random(graine)
+    res = []
+    for _ in range(nombre):
+        debut = hasard.randint(22, 30)
+        longueur = hasard.randint(31 - debut, 9)
+        res.append((debut, longueur, debut + longueur + 1, hasard.randint(0, 9)))
+    return res
+
+
+def ruban(valeurs, bits=False):
+    tape = classe_ruban(bits)()
+    tape.remplir(valeurs[0], valeurs[0] + valeurs[1])
+    tape.remplir(valeurs[2], valeurs[2] + valeurs[3])
+    return tape
+
+
+def reference(prog, valeurs, pas_max=PAS_MAX, **options):
+    """
+    Resultat de l'interprète sur l'entrée valeurs, tête en 30.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return execute(prog, ruban(valeurs), 30, False, pas_max, **options)
+
+
+def programme(chemin, diese_obligatoire=False):
+    return programme_depuis_lignes(lire_lignes(chemin), diese_obligatoire=diese_obligatoire)
+
+
+def cases(tape, debut=-200, fin=400):
+    # contenu d'une fenêtre du ruban, quel que soit son type
+    return bytes(tape.fenetre(debut, fin))
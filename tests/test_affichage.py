@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Affichage du ruban (mtdv.affichage) : fenêtres fixe, tete et etendue,
+largeur, deux lignes en une écriture ; ruban à sentinelles affiché comme
+le ruban paginé ; code généré par les traducteurs 1 et 2 (--local compris)
+réglé par MTDV_FENETRE et MTDV_LARGEUR comme l'interprète et la commande
+executer (--fenetre, --largeur).
+"""
+
+import contextlib
+import io
+import os
+import random
+
+import pytest
+
+import traducteur_1
+import traducteur_2
+from conftest import DOSSIER_TS
+from mtdv import affichage
+from mtdv.__main__ import main
+from mtdv.affichage import (FENETRES, afficher_ruban, afficher_sentinelles, bornes_fenetre, rendre_ruban,
+                            source_affichage)
+from mtdv.moteur import ruban_depuis_texte
+from mtdv.ruban import RubanBits, RubanPagine
+
+
+@pytest.fixture
+def fenetre(monkeypatch):
+    # règle la fenêtre d'affichage le temps d'un test
+    def regler(mode, largeur):
+        monkeypatch.setattr(affichage, 'FENETRE', mode)
+        monkeypatch.setattr(affichage, 'LARGEUR', largeur)
+    return regler
+
+
+@pytest.mark.parametrize('mode, largeur, head, etendue, bornes', [
+    ('fixe', 61, 100, (90, 95), (0, 61)),
+    ('fixe', 5, -3, None, (0, 5)),
+    ('tete', 5, 10, None, (8, 13)),
+    ('tete', 4, 10, None, (8, 12)),
+    ('tete', 5, -10, (0, 1), (-12, -7)),
+    ('etendue', 10, 3, (5, 8), (3, 9)),
+    ('etendue', 10, 20, (5, 8), (15, 25)),    # plus de 10 cases : comme 'tete'
+    ('etendue', 10, 7, None, (2, 12)),        # ruban vide : comme 'tete'
+])
+def test_bornes(mode, largeur, head, etendue, bornes):
+    assert bornes_fenetre(mode, largeur, head, etendue) == bornes
+
+
+def test_rendre_ruban():
+    assert rendre_ruban(b'\x00\x01\x01\x00', -2, 0) == '0110\n  X\n'
+    assert rendre_ruban(b'\x01', 5, 5) == '1\nX\n'
+
+
+@pytest.mark.parametrize('classe', [RubanPagine, RubanBits])
+def test_afficher_ruban(classe, fenetre, capsys):
+    tape = classe()
+    tape.remplir(40, 44)
+    fenetre('fixe', 61)
+    afficher_ruban(tape, 41)
+    assert capsys.readouterr().out == '0' * 40 + '1111' + '0' * 17 + '\n' + ' ' * 41 + 'X\n'
+    fenetre('tete', 5)
+    afficher_ruban(tape, 39)
+    assert capsys.readouterr().out == '00011\n  X\n'
+    fenetre('etendue', 61)
+    afficher_ruban(tape, 46)
+    assert capsys.readouterr().out == '1111000\n      X\n'
+    # tête hors de la fenêtre 'fixe' : 'X' au-delà des cases affichées
+    fenetre('fixe', 5)
+    afficher_ruban(tape, 41)
+    assert capsys.readouterr().out == '00000\n' + ' ' * 41 + 'X\n'
+
+
+@pytest.mark.parametrize('mode', FENETRES)
+def test_sentinelles(mode, fenetre, capsys):
+    # bytearray à sentinelles (case p en t[origine + p]) : même affichage que le ruban paginé
+    hasard = random.Random(25)
+    for _ in range(200):
+        texte = ''.join(hasard.choice('0001') for _ in range(hasard.randint(0, 30)))
+        tape = ruban_depuis_texte(texte)
+        origine = hasard.randint(0, 40)
+        t = bytearray(origine) + bytearray(int(c) for c in texte) + bytearray(hasard.randint(0, 10))
+        head = hasard.randint(-80, 80)
+        fenetre(mode, hasard.randint(1, 70))
+        afficher_ruban(tape, head)
+        attendu = capsys.readouterr().out
+        afficher_sentinelles(t, origine, origine + head)
+        assert capsys.readouterr().out == attendu
+
+
+@pytest.mark.parametrize('sentinelles', [False, True])
+def test_source(sentinelles, monkeypatch):
+    monkeypatch.setenv('MTDV_FENETRE', 'tete')
+    monkeypatch.setenv('MTDV_LARGEUR', '3')
+    ns = {}
+    exec("import sys\n" + source_affichage(sentinelles), ns)
+    assert (ns['FENETRE'], ns['LARGEUR']) == ('tete', 3)
+    sortie = io.StringIO()
+    with contextlib.redirect_stdout(sortie):
+        if sentinelles:
+            ns['afficher_sentinelles'](bytearray(b'\x00\x00\x00\x01\x00'), 1, 2)
+        else:
+            ns['afficher_ruban'](ruban_depuis_texte('0010'), 1)
+    assert sortie.getvalue() == '001\n X\n'
+
+
+@pytest.mark.parametrize('numero, local', [(1, False), (1, True), (2, False)], ids=['1', '1-local', '2'])
+def test_code_genere(numero, local, monkeypatch):
+    # 'I' du code généré : fenêtre de MTDV_FENETRE et MTDV_LARGEUR
+    monkeypatch.setenv('MTDV_FENETRE', 'etendue')
+    monkeypatch.setenv('MTDV_LARGEUR', '20')
+    t = traducteur_1.MTdVTranslator(local=local) if numero == 1 else traducteur_2.MTdVTranslator()
+    code = t.generate_python_code(t.parse_ts_lines(["G G I 0 D I #"]))
+    saisies = iter(['30', '3', '34', '2'])
+    ns = {'__name__': 'test', 'input': lambda *a: next(saisies)}
+    sortie = io.StringIO()
+    with contextlib.redirect_stdout(sortie):
+        exec(code, ns)
+        ns['execute_program']()
+    lignes = sortie.getvalue().splitlines()
+    k = next(k for k, l in enumerate(lignes) if l.startswith('État initial'))
+    assert lignes[k + 1:k + 7] == ['111011', 'X',        # état initial, tête en 30
+                                   '00111011', 'X',      # 'I', tête en 28
+                                   '0111011', 'X']       # 'I' après '0 D', tête en 29
+
+
+def test_commande(fenetre, capsys):
+    # --fenetre et --largeur règlent l'affichage de l'interprète
+    fenetre('fixe', 61)
+    assert main(['executer', '--sans-cache', '--sans-pause', '--ruban', '0000000011', '--tete', '8',
+                 '--fenetre', 'tete', '--largeur', '3', os.path.join(DOSSIER_TS, 'infini.1.TS'), '--pas-max', '2']) == 3
+    assert '011\n X\n' in capsys.readouterr().out
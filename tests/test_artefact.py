@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Artefacts .mtb (mtdv.artefact) : écriture puis relecture du même Programme,
+refus des artefacts tronqués, étrangers ou périmés, cache __mtdvcache__,
+erreurs de la ligne de commande.
+"""
+
+import os
+import shutil
+
+import pytest
+
+from conftest import NOMS, PROGRAMMES, entrees, reference
+from mtdv import artefact
+from mtdv.__main__ import main
+from mtdv.artefact import ArtefactInvalide
+
+
+def memes_tableaux(a, b):
+    return (a.ops.tobytes(), list(a.args), list(a.lignes), list(a.colonnes)) == \
+           (b.ops.tobytes(), list(b.args), list(b.lignes), list(b.colonnes))
+
+
+@pytest.mark.parametrize('optimise', [False, True], ids=['brut', 'O'])
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_aller_retour(tmp_path, chemin, optimise):
+    with open(chemin, 'rb') as f:
+        octets = f.read()
+    prog = artefact.compiler_octets(octets, optimise)
+    if prog is None:
+        pytest.skip("analyse impossible")
+    sortie = artefact.compiler(chemin, str(tmp_path / 'p.mtb'), optimise)
+    relu = artefact.charger(sortie, artefact.empreinte(octets), artefact.OPT_OPTIMISE if optimise else 0)
+    assert memes_tableaux(relu, prog)
+    assert memes_tableaux(artefact.depuis_octets(artefact.serialiser(prog, b'\0' * 32, 0)), prog)
+    # le programme relu s'exécute comme l'original
+    for valeurs in entrees(7, 2):
+        r, r2 = reference(prog, valeurs, 20000), reference(relu, valeurs, 20000)
+        assert (r2.head, r2.pas, r2.motif, r2.tape.compter()) == (r.head, r.pas, r.motif, r.tape.compter())
+
+
+def test_artefacts_refuses(tmp_path):
+    chemin = PROGRAMMES[NOMS.index('addition.1.TS')]
+    sortie = artefact.compiler(chemin, str(tmp_path / 'a.mtb'))
+    with open(sortie, 'rb') as f:
+        donnees = f.read()
+    with pytest.raises(ArtefactInvalide):
+        artefact.depuis_octets(donnees[:-1])
+    with pytest.raises(ArtefactInvalide):
+        artefact.depuis_octets(b'XXXX' + donnees[4:])
+    with pytest.raises(ArtefactInvalide):
+        artefact.charger(sortie, source_hash=artefact.empreinte(b'autre source'))
+    with pytest.raises(ArtefactInvalide):
+        artefact.charger(sortie, options=0)
+    vide = tmp_path / 'vide.mtb'
+    vide.write_bytes(b'')
+    with pytest.raises(ArtefactInvalide):
+        artefact.charger(str(vide))
+
+
+def test_cache(tmp_path):
+    chemin = str(tmp_path / 'addition.1.TS')
+    shutil.copy(PROGRAMMES[NOMS.index('addition.1.TS')], chemin)
+    prog = artefact.programme_cache(chemin)
+    cache = artefact.chemin_cache(chemin)
+    assert os.path.dirname(cache) == str(tmp_path / artefact.DOSSIER_CACHE)
+    assert memes_tableaux(artefact.charger(cache), prog)
+    # source modifié : l'artefact est recompilé
+    with open(chemin, 'rb') as f:
+        octets = f.read()
+    with open(chemin, 'wb') as f:
+        f.write(b"D\n" + octets)
+    assert len(artefact.programme_cache(chemin)) == len(prog) + 1
+    assert len(artefact.charger(cache)) == len(prog) + 1
+
+
+def test_ligne_de_commande(tmp_path, capsys):
+    chemin = PROGRAMMES[NOMS.index('addition.1.TS')]
+    sortie = str(tmp_path / 'a.mtb')
+    assert main(['compiler', chemin, '-o', sortie]) == 0
+    assert main(['executer', sortie, '--ruban', '0011100111100', '--tete', '2', '--sans-pause']) == 0
+    assert capsys.readouterr().out.splitlines()[-1] == "Programme terminé en 141 pas, 6 bâton(s)."
+    # artefact tronqué, fichier absent : message d'erreur et code 1, sans traceback
+    tronque = tmp_path / 'tronque.mtb'
+    tronque.write_bytes(b'MTDV\1\0\7')
+    for fichier in (str(tronque), str(tmp_path / 'absent.mtb'), str(tmp_path / 'absent.TS')):
+        assert main(['executer', fichier, '--sans-pause']) == 1
+        assert capsys.readouterr().err.startswith(f"ERREUR : {fichier} : ")
+    assert main(['compiler', str(tmp_path / 'absent.TS')]) == 1
+    assert capsys.readouterr().err.startswith("ERREUR : ")
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Budget d'exécution du code généré (mtdv.budget) : avec --pas-max, le code de
+traducteur_1.py (--local compris) et de traducteur_2.py s'arrête sur la même
+case et au même pas que l'interprète, affiche le même résultat JSON que
+mtdv.multi.resume et sort avec le code 3 ; avec et sans -O, recherche sans
+issue comprise.
+"""
+
+import contextlib
+import io
+import json
+import random
+
+import pytest
+
+import traducteur_1
+import traducteur_2
+from conftest import NOMS, PROGRAMMES, entrees, reference
+from mtdv import programme_depuis_lignes
+from mtdv.budget import CODE_SORTIE
+from mtdv.lexeur import lire_lignes
+from mtdv.multi import resume
+from test_optim import programme_aleatoire
+
+# (traducteur, optimise, local)
+VARIANTES = [(1, False, False), (1, True, False), (1, False, True), (1, True, True), (2, False, False),
+             (2, True, False)]
+IDS = ['1', '1-O', '1-local', '1-local-O', '2', '2-O']
+
+
+def traduire(lignes, numero, optimise, local, pas_max=None, delai=None):
+    """
+    Code généré compilé et Programme de référence (passes de -O comprises,
+    la passe à lucarne retirant des pas).
+    """
+    if numero == 1:
+        t = traducteur_1.MTdVTranslator(False, optimise, pas_max, delai, local=local)
+    else:
+        t = traducteur_2.MTdVTranslator(False, optimise, pas_max, delai)
+    prog = t.parse_ts_lines(lignes)
+    return compile(t.generate_python_code(prog), 'genere', 'exec'), prog
+
+
+def executer(code, valeurs):
+    """
+    Exécute le code généré sur l'entrée valeurs => (code de sortie, dernière
+    ligne affichée).
+    """
+    saisies = iter(str(v) for v in valeurs)
+    ns = {'__name__': 'test', 'input': lambda *a: next(saisies, '')}
+    sortie = io.StringIO()
+    with contextlib.redirect_stdout(sortie):
+        try:
+            exec(code, ns)
+            ns['execute_program']()
+            code_sortie = 0
+        except SystemExit as e:
+            code_sortie = e.code
+    lignes = sortie.getvalue().splitlines()
+    return code_sortie, lignes[-1] if lignes else ''
+
+
+def verifier(code, prog, valeurs, pas_max):
+    r = reference(prog, valeurs, pas_max)
+    code_sortie, ligne = executer(code, valeurs)
+    if r.motif is None:
+        assert code_sortie == 0
+    else:
+        assert (code_sortie, ligne) == (CODE_SORTIE, json.dumps(resume(r)))
+
+
+@pytest.mark.parametrize('numero, optimise, local', VARIANTES, ids=IDS)
+def test_exemples(numero, optimise, local):
+    # 'si' dont le corps n'est exécuté qu'une fois sur deux ; recherche sans issue
+    for source, valeurs in [("boucle si (1) " + "D " * 18 + "} D } #", (30, 200, 0, 0)),
+                            ("boucle si (1) " + "D " * 18 + "} D } #", (60, 200, 0, 0)),
+                            ("boucle D si (1) fin } } #", (0, 0, 0, 0)),
+                            ("boucle G si (0) fin } } #", (0, 40, 0, 0))]:
+        for pas_max in (1, 2, 3, 4, 5, 999, 1000, 1001):
+            verifier(*traduire([source], numero, optimise, local, pas_max), valeurs, pas_max)
+
+
+@pytest.mark.parametrize('numero, optimise, local', VARIANTES, ids=IDS)
+def test_programmes_aleatoires(numero, optimise, local):
+    hasard = random.Random(13)
+    for _ in range(60):
+        lignes = [programme_aleatoire(hasard) + " #"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            if programme_depuis_lignes(lignes) is None:
+                # '#' à l'intérieur d'un bloc
+                continue
+        for pas_max in (hasard.randint(1, 30), hasard.randint(30, 3000)):
+            code, prog = traduire(lignes, numero, optimise, local, pas_max)
+            for valeurs in entrees(hasard.random(), 2):
+                verifier(code, prog, valeurs, pas_max)
+
+
+@pytest.mark.parametrize('numero, optimise, local', VARIANTES, ids=IDS)
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_programmes(chemin, numero, optimise, local):
+    lignes = lire_lignes(chemin)
+    if programme_depuis_lignes(lignes, diese_obligatoire=numero == 1) is None:
+        pytest.skip("analyse impossible")
+    for pas_max in (37, 500):
+        code, prog = traduire(lignes, numero, optimise, local, pas_max)
+        for valeurs in entrees(6, 3):
+            verifier(code, prog, valeurs, pas_max)
+
+
+@pytest.mark.parametrize('numero, local', [(1, False), (1, True), (2, False)], ids=['1', '1-local', '2'])
+def test_recherche_sans_issue_sans_pas_max(numero, local):
+    # délai seul : arrêt aussitôt, comme l'interprète (statut 'sans_fin')
+    lignes = ["D boucle D si (1) fin } } #"]
+    code_sortie, ligne = executer(traduire(lignes, numero, True, local, delai=60)[0], (0, 0, 0, 0))
+    assert code_sortie == CODE_SORTIE
+    assert json.loads(ligne) == {'tete': 31, 'pas': 2, 'statut': 'sans_fin', 'batons': 0, 'etendue': None}
+
+
+def test_sans_budget():
+    # sans --pas-max ni --delai, aucune ligne de budget dans le code généré
+    for t in (traducteur_1.MTdVTranslator(), traducteur_1.MTdVTranslator(local=True),
+              traducteur_2.MTdVTranslator()):
+        code = t.generate_python_code(t.parse_ts_lines(["boucle D si (1) fin } 1 } #"]))
+        assert 'budget' not in code and 'seuil' not in code.lower()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Cartes de correspondance (mtdv.carte) : fichier .map relu à l'identique,
+marqueurs '# ts:ligne:colonne' des quatre traducteurs sur un élément du
+.TS et d'accord avec la carte, positions d'un traceback réel et d'une
+sortie de profileur réécrites, commande carte.
+"""
+
+import re
+import traceback
+
+import pytest
+
+import traducteur_1
+import traducteur_2
+import traducteur_3
+import traducteur_4
+from conftest import NOMS, PROGRAMMES
+from mtdv import programme_depuis_lignes
+from mtdv.__main__ import main
+from mtdv.carte import Carte, CarteSource, lire_carte, retraduire
+from mtdv.lexeur import lire_lignes
+
+MARQUEUR = re.compile(r'  # ts:(\d+):(\d+)$')
+# début d'un élément du Programme dans le .TS
+ELEMENT = re.compile(r'(I|P|G|D|0|1|fin|boucle|si|\}|#)')
+
+# (traducteur, optimise, local)
+VARIANTES = [(1, False, False), (1, True, False), (1, False, True), (2, False, False), (2, True, False),
+             (3, False, False), (4, False, False)]
+IDS = ['1', '1-O', '1-local', '2', '2-O', '3', '4']
+
+
+def generer(lignes, numero, optimise=False, local=False, marqueurs=False):
+    """
+    (lignes du code généré, CarteSource) pour les lignes d'un .TS.
+    """
+    if numero in (1, 2):
+        t = traducteur_1.MTdVTranslator(False, optimise, local=local) if numero == 1 else \
+            traducteur_2.MTdVTranslator(False, optimise)
+        prog = t.parse_ts_lines(lignes)
+        carte = CarteSource(prog, marqueurs)
+        return t.generate_python_code(prog, carte).split("\n"), carte
+    t = (traducteur_3 if numero == 3 else traducteur_4).MTdVTranslator()
+    prog = t.parse_ts_lines(lignes)
+    carte = CarteSource(prog, marqueurs)
+    return [carte.ligne(l) for l in t.generate_pure_function_code(prog, carte)], carte
+
+
+def relire(carte, source='programme.TS', genere='sortie.py'):
+    # Carte relue depuis le contenu de son fichier .map
+    return Carte(carte.vers_dict(source, genere))
+
+
+def test_fichier(tmp_path):
+    prog = programme_depuis_lignes(["D", "  boucle G }"], diese_obligatoire=False)
+    carte = CarteSource(prog, marqueurs=True)
+    ecrire = carte.suivre([].append)
+    ecrire("# en-tête")
+    carte.placer(0)
+    ecrire("head += 1")
+    ecrire("")
+    carte.placer(2)
+    ecrire("head -= 1")
+    carte.placer(None)
+    ecrire("pass")
+    assert carte.ligne("x = 1") == "x = 1"
+    genere = str(tmp_path / 'sortie.py')
+    chemin = carte.ecrire_fichier('essai.TS', genere)
+    assert chemin == genere + '.map'
+    relue = lire_carte(chemin)
+    assert (relue.source, relue.genere) == ('essai.TS', 'sortie.py')
+    assert [relue.position(n) for n in range(0, 8)] == \
+           [None, None, (1, 1), (1, 1), (2, 10), None, None, None]
+
+
+def test_marqueur_ecrit():
+    prog = programme_depuis_lignes(["G D"], diese_obligatoire=False)
+    carte = CarteSource(prog, marqueurs=True)
+    carte.placer(1)
+    # ni sur une ligne vide ni sans position
+    assert [carte.ligne("head += 1"), carte.ligne("   ")] == ["head += 1  # ts:1:3", "   "]
+    carte.placer(None)
+    assert carte.ligne("pass") == "pass"
+
+
+@pytest.mark.parametrize('numero, optimise, local', VARIANTES, ids=IDS)
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_marqueurs(chemin, numero, optimise, local):
+    lignes = lire_lignes(chemin)
+    if programme_depuis_lignes(lignes, diese_obligatoire=numero == 1) is None:
+        pytest.skip("analyse impossible")
+    code, carte = generer(lignes, numero, optimise, local, marqueurs=True)
+    # sans --marqueurs : même code, commentaires retirés
+    assert generer(lignes, numero, optimise, local)[0] == [MARQUEUR.sub('', l) for l in code]
+    relue = relire(carte)
+    positions = set()
+    for n, ligne in enumerate(code, 1):
+        m = MARQUEUR.search(ligne)
+        if m is None:
+            assert not ligne.strip() or relue.position(n) is None
+            continue
+        l, c = int(m.group(1)), int(m.group(2))
+        assert relue.position(n) == (l, c)
+        assert ELEMENT.match(lignes[l - 1], c - 1)
+        positions.add((l, c))
+    assert positions
+
+
+def test_traceback():
+    # erreur levée par l'affichage d'un 'I' : le cadre du bloc généré pointe sur le 'I'
+    lignes = ["% essai", "D D", "  G I #"]
+    code, carte = generer(lignes, 1)
+    ns = {'__name__': 'test', 'input': lambda *a: '0'}
+    exec(compile("\n".join(code), '/tmp/traductions/sortie.py', 'exec'), ns)
+    appels = []
+
+    def afficher_ruban(tape, head):
+        # l'état initial, puis le 'I'
+        appels.append(head)
+        if len(appels) == 2:
+            raise RuntimeError("affichage")
+    ns['afficher_ruban'] = afficher_ruban
+    with pytest.raises(RuntimeError) as e:
+        ns['execute_program']()
+    texte = "".join(traceback.format_exception(e.type, e.value, e.tb))
+    assert 'programme.TS", line 3, colonne 5' in retraduire(texte, [relire(carte)])
+
+
+def test_retraduire():
+    prog = programme_depuis_lignes(["D G"], diese_obligatoire=False)
+    carte = CarteSource(prog)
+    for i in (None, 0, 1):
+        carte.placer(i)
+        carte.ligne("x")
+    autre = CarteSource(prog)
+    autre.placer(1)
+    autre.ligne("y")
+    cartes = [relire(carte), relire(autre, 'b.TS', 'autre.py')]
+    texte = ('  File "/tmp/sortie.py", line 3, in execute_program\n'
+             '1  0.0  sortie.py:2(execute_program)\n'
+             'sortie.py:1 autre.py:1 sortie.py:99 inconnu.py:2\n')
+    assert retraduire(texte, cartes) == (
+        '  File "programme.TS", line 1, colonne 3, in execute_program\n'
+        '1  0.0  programme.TS:1:1(execute_program)\n'
+        'sortie.py:1 b.TS:1:3 programme.TS:1:3 inconnu.py:2\n')
+
+
+def test_commande(tmp_path, capsys):
+    ts = tmp_path / 'essai.TS'
+    ts.write_text("D\nG #\n", encoding='utf-8')
+    code, carte = generer(lire_lignes(str(ts)), 1)
+    genere = str(tmp_path / 'sortie.py')
+    chemin = carte.ecrire_fichier(str(ts), genere)
+    n = next(n for n, l in enumerate(code, 1) if lire_carte(chemin).position(n) == (2, 1))
+    entree = tmp_path / 'trace.txt'
+    entree.write_text(f'File "{genere}", line {n}, in execute_program\nsans position\n', encoding='utf-8')
+    assert main(['carte', chemin, '-e', str(entree)]) == 0
+    assert capsys.readouterr().out == f'File "{ts}", line 2, colonne 1, in execute_program\nsans position\n'
+    (tmp_path / 'faux.map').write_text('{"version": 0}', encoding='utf-8')
+    assert main(['carte', str(tmp_path / 'faux.map')]) == 1
+    assert 'ERREUR' in capsys.readouterr().err
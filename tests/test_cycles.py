@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Détection de cycles (mtdv.moteur, option cycles) : programmes sans fin
+détectés, jamais une machine qui s'arrête, mêmes résultats que sans
+détection pour les programmes qui s'arrêtent ; statut 'sans_fin' de
+mtdv.multi.
+"""
+
+import os
+import random
+
+import pytest
+
+from conftest import DOSSIER_TS, NOMS, PROGRAMMES, entrees, programme, reference
+from mtdv import execute, programme_depuis_lignes
+from mtdv.moteur import MOTIF_PAS, MOTIF_SANS_FIN, ruban_depuis_texte
+from mtdv.multi import executer_multi
+from mtdv.optim import optimiser
+from mtdv.profil import Profil
+from test_optim import programme_aleatoire
+
+
+def executer(source, texte='', head=0, pas_max=None, optimise=False):
+    prog = programme_depuis_lignes(source.splitlines(), diese_obligatoire=False)
+    if optimise:
+        prog = optimiser(prog)
+    return execute(prog, ruban_depuis_texte(texte), head, False, pas_max, cycles=True)
+
+
+@pytest.mark.parametrize('source, texte', [
+    ("boucle }", ''),
+    ("boucle 1 0 }", ''),                     # tête immobile
+    ("boucle D 1 }", ''),                     # tête décalée, zone identique
+    ("boucle G }", '111'),
+    ("D boucle D D G }", ''),
+    ("boucle si (1) D } G }", '0110'),        # va-et-vient entre deux cases
+])
+def test_sans_fin(source, texte):
+    r = executer(source, texte)
+    assert r.motif == MOTIF_SANS_FIN and r.pas < 1000
+
+
+def test_infini():
+    r = reference(programme(os.path.join(DOSSIER_TS, 'infini.1.TS')), (30, 1, 32, 1), cycles=True)
+    assert (r.motif, r.pas) == (MOTIF_SANS_FIN, 3)
+
+
+def test_zone_qui_grandit():
+    # 01.1.TS agrandit le ruban des deux côtés : pas de preuve, arrêt par pas_max
+    r = reference(programme(os.path.join(DOSSIER_TS, '01.1.TS')), (30, 0, 32, 0), 20000, cycles=True)
+    assert r.motif == MOTIF_PAS and r.pas >= 20000
+
+
+def test_pas_de_faux_positif():
+    # recherche qui revient 500 fois au même pc, case lue identique : elle s'arrête
+    texte = '0' * 500 + '1'
+    r = executer("boucle D si (1) fin } } #", texte)
+    assert (r.motif, r.head) == (None, 500)
+    # recherche sans issue (-O) : aussitôt, même avec pas_max
+    r = executer("boucle D si (1) fin } } #", '', pas_max=10 ** 6, optimise=True)
+    assert (r.motif, r.pas) == (MOTIF_SANS_FIN, 1)
+
+
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_programmes(chemin):
+    prog = programme(chemin)
+    if prog is None:
+        pytest.skip("analyse impossible")
+    for valeurs in entrees(9, 3):
+        r0 = reference(prog, valeurs, 20000)
+        r = reference(prog, valeurs, 20000, cycles=True)
+        if r.motif == MOTIF_SANS_FIN:
+            assert r0.motif == MOTIF_PAS
+        else:
+            assert (r.head, r.pas, r.motif, r.tape.fenetre(-100, 300)) == \
+                   (r0.head, r0.pas, r0.motif, r0.tape.fenetre(-100, 300))
+
+
+def test_programmes_aleatoires():
+    # 'sans_fin' seulement pour une machine qui ne s'arrête pas, sinon même résultat
+    hasard = random.Random(14)
+    for _ in range(300):
+        prog = programme_depuis_lignes([programme_aleatoire(hasard)], diese_obligatoire=False)
+        for valeurs in entrees(hasard.random(), 2):
+            r0 = reference(prog, valeurs, 20000)
+            r = reference(prog, valeurs, 20000, cycles=True)
+            if r.motif == MOTIF_SANS_FIN:
+                assert r0.motif == MOTIF_PAS and r.pas <= r0.pas
+            else:
+                assert (r.head, r.pas, r.motif) == (r0.head, r0.pas, r0.motif)
+
+
+def test_profil_exclu():
+    prog = programme_depuis_lignes(["boucle }"], diese_obligatoire=False)
+    with pytest.raises(ValueError):
+        execute(prog, None, 0, False, 100, cycles=True, profil=Profil(len(prog)))
+
+
+def test_multi():
+    prog = programme(os.path.join(DOSSIER_TS, 'infini.1.TS'))
+    res = list(executer_multi(prog, [(1, "0011"), (2, "1")], processus=1, pas_max=10 ** 6, cycles=True))
+    assert [(r['statut'], r['pas']) for r in res] == [('sans_fin', 3)] * 2
+    res = list(executer_multi(prog, [(1, "0011")], processus=1, pas_max=1000))
+    assert res[0]['statut'] == 'limite'
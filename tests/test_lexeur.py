@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Analyse lexicale (mtdv.lexeur) : lignes et colonnes des tokens, texte
+ignoré, et tokeniser_flux (ligne par ligne) identique à tokeniser.
+"""
+
+import pytest
+
+from conftest import NOMS, PROGRAMMES
+from mtdv.lexeur import joindre_lignes, lignes_fichier, lire_lignes, tokeniser, tokeniser_flux
+
+
+def flux(lignes):
+    inconnus = []
+    return list(tokeniser_flux(lignes, inconnus)), inconnus
+
+
+def entier(texte):
+    lex = tokeniser(texte)
+    return list(lex), lex.inconnus
+
+
+def test_positions():
+    texte = ("% commentaire boucle\n"
+             "boucle D\n"
+             "  si (1) fin }\n"
+             "\tG 0 1 ?? I P\n"
+             "}  #\n")
+    lex = tokeniser(texte)
+    assert list(lex) == [('boucle', 2, 1), ('D', 2, 8),
+                         ('si(1)', 3, 3), ('fin', 3, 10), ('}', 3, 14),
+                         ('G', 4, 2), ('0', 4, 4), ('1', 4, 6),
+                         ('}', 5, 1), ('#', 5, 4)]
+    assert lex.position(2) == (3, 3)
+    # texte inconnu : ignoré jusqu'à la fin de la ligne
+    assert lex.inconnus == [(4, 8, '?? I P')]
+
+
+def test_si_sur_plusieurs_lignes():
+    # 'si (0)' coupé : le token prend la position de 'si'
+    texte = "D si\n  (\n0\n ) G\n"
+    attendu = [('D', 1, 1), ('si(0)', 1, 3), ('G', 4, 4)]
+    assert entier(texte) == (attendu, [])
+    assert flux(texte.splitlines(True)) == (attendu, [])
+    # 'si' incomplet en fin de fichier : texte ignoré
+    assert flux(["D\n", "si ("]) == entier("D\nsi (")
+    assert entier("D\nsi (")[1] == [(2, 1, 'si (')]
+
+
+@pytest.mark.parametrize('texte', [
+    "", "\n\n", "D", "boucle\r\nD\r\n}\r\n", "si(1)si (0)\nsi\n(1)", "% x\n%\nG % si (1)\n",
+    "boucle si\n", "si (2) D\n", "DG01\n  \t# fin", "sis (1)\n",
+])
+def test_flux_identique(texte):
+    for lignes in (texte.splitlines(True), texte.splitlines()):
+        assert flux(lignes) == entier(joindre_lignes(lignes))
+
+
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_flux_programmes(chemin):
+    lignes = lire_lignes(chemin)
+    attendu = entier(joindre_lignes(lignes))
+    assert flux(lignes) == attendu
+    assert flux(lignes_fichier(chemin, taille_bloc=7)) == attendu
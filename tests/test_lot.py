@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Traduction par lots (mtdv.lot) : fichiers traduits, en erreur ou inchangés
+d'un lot à l'autre selon le manifeste, empreinte du traducteur.
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from conftest import DOSSIER_TS, RACINE
+from mtdv import lot
+
+
+@pytest.fixture
+def sources(tmp_path):
+    dossier = tmp_path / 'ts'
+    dossier.mkdir()
+    shutil.copy(os.path.join(DOSSIER_TS, 'addition.1.TS'), dossier)
+    shutil.copy(os.path.join(DOSSIER_TS, 'ajout3batons.1.ts'), dossier)
+    (dossier / 'faux.TS').write_text("D }\n")
+    return dossier
+
+
+def statuts(resultats):
+    return {os.path.basename(r['source']): r['statut'] for r in resultats}
+
+
+def test_nom_sortie():
+    assert [lot.nom_sortie(n) for n in ('a/addition.1.TS', 'truc.ts', 'x.txt')] == \
+           ['addition.1.py', 'truc.py', 'x.txt.py']
+
+
+@pytest.mark.parametrize('numero', [1, 2, 3, 4])
+def test_lot(tmp_path, sources, numero):
+    sortie = str(tmp_path / 'py')
+    res = lot.traduire_lot([str(sources)], sortie, numero, processus=2)
+    assert statuts(res) == {'addition.1.TS': 'traduit', 'ajout3batons.1.ts': 'traduit', 'faux.TS': 'erreur'}
+    assert res[2]['erreur'].startswith('ValueError')
+    for nom in ('addition.1.py', 'ajout3batons.1.py'):
+        with open(os.path.join(sortie, nom), encoding='utf-8') as f:
+            compile(f.read(), nom, 'exec')
+        assert os.path.exists(os.path.join(sortie, nom + '.map'))
+    with open(os.path.join(sortie, lot.MANIFESTE), encoding='utf-8') as f:
+        assert len(json.load(f)) == 3
+
+
+def test_lot_incremental(tmp_path, sources):
+    sortie = str(tmp_path / 'py')
+    lot.traduire_lot([str(sources)], sortie, 1, processus=1)
+    # rien n'a changé : seul le fichier en erreur est repris
+    assert statuts(lot.traduire_lot([str(sources)], sortie, 1, processus=1)) == \
+        {'addition.1.TS': 'inchangé', 'ajout3batons.1.ts': 'inchangé', 'faux.TS': 'erreur'}
+    with open(sources / 'addition.1.TS', 'ab') as f:
+        f.write(b"\n% modifie\n")
+    assert statuts(lot.traduire_lot([str(sources)], sortie, 1, processus=1))['addition.1.TS'] == 'traduit'
+    # autres options, --force, fichier généré supprimé : retraduit
+    res = lot.traduire_lot([str(sources)], sortie, 1, {'optimiser': True}, processus=1)
+    assert statuts(res)['ajout3batons.1.ts'] == 'traduit'
+    assert statuts(lot.traduire_lot([str(sources)], sortie, 1, {'optimiser': True}, processus=1,
+                                    forcer=True))['ajout3batons.1.ts'] == 'traduit'
+    os.remove(os.path.join(sortie, 'ajout3batons.1.py'))
+    assert statuts(lot.traduire_lot([str(sources)], sortie, 1, {'optimiser': True},
+                                    processus=1))['ajout3batons.1.ts'] == 'traduit'
+
+
+def test_source_disparue(tmp_path, sources, monkeypatch):
+    # un fichier listé puis disparu (ou illisible) est en erreur, le reste du lot continue
+    listes = lot.lister_sources([str(sources)]) + [str(sources / 'disparu.TS')]
+    monkeypatch.setattr(lot, 'lister_sources', lambda entrees: listes)
+    sortie = str(tmp_path / 'py')
+    res = lot.traduire_lot([str(sources)], sortie, 2, processus=1)
+    assert statuts(res)['disparu.TS'] == 'erreur' and statuts(res)['addition.1.TS'] == 'traduit'
+    assert res[2]['erreur'].startswith('FileNotFoundError')
+    with open(os.path.join(sortie, lot.MANIFESTE), encoding='utf-8') as f:
+        assert json.load(f)[str(sources / 'disparu.TS')]['statut'] == 'erreur'
+
+
+def test_empreinte_traducteur(tmp_path, monkeypatch):
+    # le script et chaque module de MODULES_GENERATION font partie de l'empreinte
+    (tmp_path / 'mtdv').mkdir()
+    shutil.copy(os.path.join(RACINE, 'traducteur_1.py'), tmp_path)
+    for nom in lot.MODULES_GENERATION:
+        shutil.copy(os.path.join(RACINE, 'mtdv', nom + '.py'), tmp_path / 'mtdv')
+    monkeypatch.setattr(lot, 'RACINE', str(tmp_path))
+    avant = lot._empreinte_traducteur(1)
+    assert lot._empreinte_traducteur(1) == avant
+    with open(tmp_path / 'mtdv' / 'affichage.py', 'a') as f:
+        f.write("\n# modifié\n")
+    assert lot._empreinte_traducteur(1) != avant
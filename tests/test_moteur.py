@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Interprète en mémoire (mtdv.moteur) : ruban final, tête et nombre de pas
+sur de petits programmes, interruption par pas_max et delai, affichage de
+'I' / 'P', un même Moteur sur plusieurs rubans, mêmes résultats sur
+RubanPagine et RubanBits.
+"""
+
+import pytest
+
+from conftest import NOMS, PROGRAMMES, entrees, programme, reference, ruban
+from mtdv import Moteur, execute, programme_depuis_lignes
+from mtdv.moteur import MOTIF_DELAI, MOTIF_PAS, ruban_depuis_texte
+from mtdv.ruban import RubanBits
+
+
+def executer(source, texte='', head=0, **options):
+    prog = programme_depuis_lignes(source.splitlines(), diese_obligatoire=False)
+    return execute(prog, ruban_depuis_texte(texte), head, False, **options)
+
+
+def uns(tape, debut=-50, fin=50):
+    return [i for i in range(debut, fin) if tape[i]]
+
+
+@pytest.mark.parametrize('source, head, pas, cases', [
+    ("D D 1 #", 2, 4, [2]),
+    ("D D 1", 2, 3, [2]),                 # fin du programme sans '#'
+    ("G G 0 1 #", -2, 5, [-2]),           # tête en position négative
+    ("si (0) 1 } si (1) D } #", 1, 7, [0]),  # les deux '}' de 'si' comptent
+    ("boucle fin } 1 #", 0, 4, [0]),
+])
+def test_petits_programmes(source, head, pas, cases):
+    r = executer(source)
+    assert (r.head, r.pas, r.motif, uns(r.tape)) == (head, pas, None, cases)
+
+
+def test_boucle_de_recherche():
+    # 'boucle' puis 3 pas par case : D, si, '}' (ou 'fin' sur la case à 1), puis '#'
+    r = executer("boucle D si (1) fin } } #", '000001')
+    assert (r.head, r.pas, r.motif) == (5, 1 + 3 * 5 + 1, None)
+
+
+def test_pas_max():
+    r = executer("boucle D si (1) fin } } #", '000001', pas_max=7)
+    assert (r.head, r.pas, r.motif) == (2, 7, MOTIF_PAS)
+    assert r.limite
+    r = executer("boucle D 1 }", pas_max=100)
+    assert (r.head, r.pas, r.motif) == (33, 100, MOTIF_PAS)
+    assert uns(r.tape) == list(range(1, 34))
+
+
+def test_delai():
+    r = executer("boucle D G }", delai=0.05)
+    assert r.motif == MOTIF_DELAI and r.head == 0 and r.pas > 0
+
+
+def test_affichage(capsys):
+    r = executer("I P #", '101')
+    lignes = capsys.readouterr().out.splitlines()
+    # 'P' sans interactif n'attend pas Entrée ; ruban puis tête, deux fois
+    assert lignes[0].startswith('101000') and lignes[1] == 'X'
+    assert lignes[2:4] == lignes[0:2]
+    assert r.pas == 3
+
+
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_moteur_reutilise(chemin):
+    prog = programme(chemin)
+    if prog is None:
+        pytest.skip("analyse impossible")
+    moteur = Moteur(prog)
+    for valeurs in entrees(11, 3):
+        r = reference(prog, valeurs, 5000)
+        r2 = moteur.execute(ruban(valeurs), 30, False, 5000)
+        assert (r2.head, r2.pas, r2.motif, uns(r2.tape, -300, 600)) == \
+               (r.head, r.pas, r.motif, uns(r.tape, -300, 600))
+        # RubanBits : boucle générique (accès tape[head])
+        r3 = moteur.execute(ruban(valeurs, bits=True), 30, False, 5000)
+        assert isinstance(r3.tape, RubanBits)
+        assert (r3.head, r3.pas, r3.motif, uns(r3.tape, -300, 600)) == \
+               (r.head, r.pas, r.motif, uns(r.tape, -300, 600))
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Exécution sur de nombreux rubans (mtdv.multi) : formats de spécification,
+lignes invalides en erreur sans interrompre les autres, résultats dans
+l'ordre et identiques à ceux de l'interprète, commande multi.
+"""
+
+import io
+import json
+import os
+
+import pytest
+
+from conftest import DOSSIER_TS, entrees, programme, reference
+from mtdv.__main__ import main
+from mtdv.moteur import TETE_INITIALE
+from mtdv.multi import executer_multi, lire_specs, ruban_depuis_spec, statut
+from mtdv.ruban import RubanBits
+
+ADDITION = os.path.join(DOSSIER_TS, 'addition.1.TS')
+
+
+def uns(tape):
+    return [i for i in range(-20, 60) if tape[i]]
+
+
+@pytest.mark.parametrize('spec, head, cases', [
+    ("0011", TETE_INITIALE, [2, 3]),
+    ("0011 2", 2, [2, 3]),
+    ('{"ruban": "101", "tete": -1}', -1, [0, 2]),
+    ('{"plages": [[2, 3], [6, 1]], "tete": 2}', 2, [2, 3, 4, 6]),
+    ('{}', TETE_INITIALE, []),
+])
+def test_formats(spec, head, cases):
+    tape, h = ruban_depuis_spec(spec)
+    assert (h, uns(tape)) == (head, cases)
+    assert isinstance(ruban_depuis_spec(spec, bits=True)[0], RubanBits)
+
+
+@pytest.mark.parametrize('spec', [
+    "0012", "01 2 3", "01 x", '{"ruban": ', '[1, 2]',
+    '{"plages": 5}', '{"plages": [5]}', '{"plages": [[1, 2, 3]]}', '{"plages": [["1", 2]]}',
+    '{"ruban": 5}', '{"ruban": ["0", "1"]}', '{"tete": "2"}', '{"tete": 1.5}', '{"tete": true}',
+])
+def test_specs_invalides(spec):
+    with pytest.raises(ValueError):
+        ruban_depuis_spec(spec)
+
+
+def test_lire_specs():
+    flux = io.StringIO("% commentaire\n\n  0011 2  \n{}\n")
+    assert list(lire_specs(flux)) == [(3, "0011 2"), (4, "{}")]
+
+
+def test_executer_multi():
+    prog = programme(ADDITION)
+    valeurs = entrees(3, 20)
+    specs = [(i, json.dumps({'plages': [[v[0], v[1]], [v[2], v[3]]], 'tete': 30}))
+             for i, v in enumerate(valeurs, 1)]
+    # lignes invalides au milieu : en erreur, le reste du lot continue
+    specs[4:4] = [(100, '{"plages": 5}'), (101, '{"ruban": 5}')]
+    # seconde plage vide : addition sans fin, interrompue par pas_max
+    res = list(executer_multi(prog, specs, processus=2, pas_max=5000, taille_lot=3))
+    assert [r['id'] for r in res] == [i for i, _ in specs]
+    assert 'erreur' in res[4] and 'erreur' in res[5]
+    del res[4:6]
+    assert {r['statut'] for r in res} == {'arret', 'limite'}
+    for r, v in zip(res, valeurs):
+        r0 = reference(prog, v, 5000)
+        assert (r['tete'], r['pas'], r['statut'], r['batons']) == \
+               (r0.head, r0.pas, statut(r0.motif), r0.tape.compter())
+        e = r0.tape.etendue()
+        assert r['etendue'] == list(e)
+        assert r['ruban'] == ''.join(str(x) for x in r0.tape.fenetre(e[0], e[1] + 1))
+
+
+def test_pas_max():
+    prog = programme(ADDITION)
+    res = list(executer_multi(prog, [(1, "0011100111 2"), (2, "0011100111 2")], processus=1,
+                              pas_max=20, bits=True, largeur=2))
+    assert [(r['statut'], r['pas'] >= 20) for r in res] == [('limite', True)] * 2
+    # ruban plus large que largeur : non recopié
+    assert 'ruban' not in res[0] and res[0]['etendue'] is not None
+
+
+def test_commande(tmp_path, capsys):
+    rubans = tmp_path / 'rubans.txt'
+    rubans.write_text('% deux rubans\n0011100111 2\n{"plages": 5}\n{"plages": [[2, 3], [6, 5]], "tete": 2}\n')
+    assert main(['multi', ADDITION, str(rubans), '-j', '1', '--sans-cache']) == 0
+    res = [json.loads(l) for l in capsys.readouterr().out.splitlines()]
+    assert [r['id'] for r in res] == [2, 3, 4]
+    assert (res[0]['ruban'], res[0]['statut']) == ('11111', 'arret')
+    assert res[1]['erreur'].startswith('plages invalides')
+    assert res[2]['batons'] == 7
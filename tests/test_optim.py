@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Passes d'optimisation (mtdv.optim) : boucles de recherche reconnues et
+remplacées par une seule instruction qui compte les pas de la boucle
+d'origine, y compris quand pas_max l'interrompt ; passe à lucarne
+(réductions attendues, même ruban final que le programme d'origine).
+"""
+
+import random
+
+import pytest
+
+from conftest import NOMS, PROGRAMMES, entrees, programme, reference
+from mtdv import execute, programme_depuis_lignes
+from mtdv.ir import OP_CHERCHE_D, OP_CHERCHE_G, OP_D, OP_DEPLACE, OP_DIESE
+from mtdv.moteur import pas_recherche
+from mtdv.bench import bench_optim
+from mtdv.optim import compter_instructions, lucarne, optimiser, reconnaitre_recherches
+from mtdv.ruban import RubanPagine
+
+RECHERCHES = [
+    ("boucle D si (1) fin } }", OP_CHERCHE_D, 1, 1),
+    ("boucle D si (0) fin } }", OP_CHERCHE_D, 0, 1),
+    ("boucle G si (1) fin } }", OP_CHERCHE_G, 1, 1),
+    ("boucle si (1) fin } D }", OP_CHERCHE_D, 1, 0),
+    ("boucle si (0) fin } G }", OP_CHERCHE_G, 0, 0),
+]
+
+
+def analyser(source):
+    return programme_depuis_lignes(source.splitlines(), diese_obligatoire=False)
+
+
+def programme_aleatoire(hasard, profondeur=0, taille=8):
+    """
+    Texte d'un programme MTdV aléatoire, boucles de recherche comprises.
+    """
+    res = []
+    for _ in range(hasard.randint(1, taille)):
+        x = hasard.random()
+        if x < 0.45:
+            res.append(hasard.choice('GD01'))
+        elif x < 0.6:
+            res.append(hasard.choice(RECHERCHES)[0])
+        elif x < 0.75 and profondeur < 3:
+            res.append(f"si ({hasard.randint(0, 1)}) {programme_aleatoire(hasard, profondeur + 1, 4)} }}")
+        elif x < 0.9 and profondeur < 3:
+            corps = programme_aleatoire(hasard, profondeur + 1, 4)
+            res.append(f"boucle {corps} si ({hasard.randint(0, 1)}) fin }} }}")
+        else:
+            res.append(hasard.choice(['I', 'fin', '#']))
+    return " ".join(res)
+
+
+def etat(r):
+    return r.head, r.pas, r.motif, r.tape.fenetre(-100, 200)
+
+
+@pytest.mark.parametrize('source, op, val, avance', RECHERCHES)
+def test_motifs_reconnus(source, op, val, avance):
+    prog = reconnaitre_recherches(analyser(f"D {source} D #"))
+    assert list(prog.ops) == [OP_D, op, OP_D, OP_DIESE]
+    assert prog.args[1] == val | (avance << 1)
+    # position source : celle du 'boucle'
+    assert (prog.lignes[1], prog.colonnes[1]) == (1, 3)
+
+
+def test_non_reconnus():
+    for source in ("boucle D si (1) fin } D }", "boucle D D si (1) fin } }", "boucle si (1) 1 fin } D }"):
+        prog = analyser(source)
+        assert list(reconnaitre_recherches(prog).ops) == list(prog.ops)
+
+
+@pytest.mark.parametrize('source, op, val, avance', RECHERCHES)
+def test_pas_de_la_boucle_d_origine(source, op, val, avance):
+    sens = 1 if op == OP_CHERCHE_D else -1
+    brut = analyser(source)
+    optimise = reconnaitre_recherches(brut)
+    for k in range(0, 6):
+        # case cherchée à k cases (k + 1 quand la boucle avance avant de tester)
+        cible = sens * (k + avance)
+        r0 = executer_cible(brut, val, cible)
+        assert etat(executer_cible(optimise, val, cible)) == etat(r0)
+        assert r0.pas == pas_recherche(val | (avance << 1), k + avance)
+        # interrompue à chaque pas possible : même case, même pas
+        for pas_max in range(1, r0.pas + 1):
+            assert etat(executer_cible(optimise, val, cible, pas_max)) == \
+                   etat(executer_cible(brut, val, cible, pas_max))
+
+
+def executer_cible(prog, val, cible, pas_max=None):
+    """
+    Exécution depuis la case 0 sur un ruban où seule la case cible vaut val
+    (les autres valent 1 - val sur une zone assez large).
+    """
+    tape = RubanPagine()
+    if val == 0:
+        tape.remplir(-20, 21)
+    tape[cible] = val
+    return execute(prog, tape, 0, False, pas_max)
+
+
+def test_recherche_sans_issue():
+    # aucune case à 1 à droite : interrompue par pas_max au même pas et sur la même case
+    brut = analyser("boucle D si (1) fin } } #")
+    optimise = reconnaitre_recherches(brut)
+    for pas_max in (1, 2, 3, 4, 50, 1001):
+        r0, r1 = executer_cible(brut, 1, -5, pas_max), executer_cible(optimise, 1, -5, pas_max)
+        # budget vérifié aux seuls 'boucle', '}', 'fin', '#'
+        assert r0.motif == 'pas' and pas_max <= r0.pas < pas_max + 3
+        assert etat(r1) == etat(r0)
+
+
+def test_programmes_aleatoires():
+    hasard = random.Random(7)
+    for _ in range(300):
+        brut = analyser(programme_aleatoire(hasard))
+        if brut is None:
+            continue
+        optimise = reconnaitre_recherches(brut)
+        for valeurs in entrees(hasard.random(), 2):
+            pas_max = hasard.choice([40, 500, 20000])
+            r0 = reference(brut, valeurs, pas_max)
+            r1 = reference(optimise, valeurs, pas_max)
+            assert etat(r1) == etat(r0)
+
+
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_programmes(chemin):
+    brut = programme(chemin)
+    if brut is None:
+        pytest.skip("analyse impossible")
+    optimise = reconnaitre_recherches(brut)
+    for valeurs in entrees(2, 3):
+        for pas_max in (97, 20000):
+            assert etat(reference(optimise, valeurs, pas_max)) == etat(reference(brut, valeurs, pas_max))
+
+
+@pytest.mark.parametrize('source, attendu', [
+    ("D G #", "#"),                            # déplacements qui se compensent
+    ("1 0 #", "0 #"),                          # écriture écrasée
+    ("1 D G 0 #", "0 #"),
+    ("G D D 1 G 1 G #", "D 1 G 1 G #"),
+    ("1 si (1) D } #", "1 D #"),               # 'si' résolu : condition vraie
+    ("0 si (1) D } #", "0 #"),                 # condition fausse
+    ("boucle fin D } #", "boucle fin } #"),    # code après 'fin'
+    ("D si (1) G } #", "D si (1) G } #"),      # case inconnue : inchangé
+])
+def test_lucarne(source, attendu):
+    prog, ref = lucarne(analyser(source)), analyser(attendu)
+    assert (list(prog.ops), list(prog.args)) == (list(ref.ops), list(ref.args))
+
+
+def test_deplacements_regroupes():
+    prog = lucarne(analyser("D D D 1 G G G G G #"))
+    assert [(op, prog.args[i]) for i, op in enumerate(prog.ops)] == \
+           [(OP_DEPLACE, 3), (5, 0), (OP_DEPLACE, -5), (OP_DIESE, 0)]
+    assert compter_instructions(analyser("boucle D } #")) == 3
+
+
+def test_lucarne_aleatoire():
+    # même tête et même ruban à l'arrêt, jamais plus de pas
+    hasard = random.Random(8)
+    for _ in range(300):
+        brut = analyser(programme_aleatoire(hasard))
+        optimise = optimiser(brut)
+        for valeurs in entrees(hasard.random(), 2):
+            r0 = reference(brut, valeurs, 20000)
+            if r0.motif is not None:
+                continue
+            r1 = reference(optimise, valeurs, 20000)
+            assert (r1.head, r1.motif, r1.tape.fenetre(-100, 200)) == (r0.head, None, r0.tape.fenetre(-100, 200))
+            assert r1.pas <= r0.pas
+
+
+def test_bench_optim(tmp_path, capsys):
+    (tmp_path / 'a.TS').write_text("D D G 1 #\n")
+    (tmp_path / 'b.ts').write_text("boucle D si (1) fin } } #\n")
+    (tmp_path / 'c.TS').write_text("} D\n")
+    assert bench_optim(str(tmp_path)) == 0
+    lignes = capsys.readouterr().out.splitlines()[1:]
+    assert [l.split()[:4] for l in lignes] == [['a.TS', '5', '5', '3'], ['b.ts', '5', '2', '2'],
+                                               ['c.TS', 'analyse', 'impossible']]
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Ruban persistant (mtdv.persistant) contre un modèle naïf : lecture,
+écriture, anciens rubans inchangés, étendue, fenêtres ; bornes identiques à
+mtdv.affichage.bornes_fenetre ; source autonome dont la fenêtre d'affichage
+suit MTDV_FENETRE et MTDV_LARGEUR.
+"""
+
+import random
+
+import pytest
+
+from mtdv import persistant
+from mtdv.affichage import FENETRES, bornes_fenetre
+from mtdv.persistant import (empty_tape, source_persistant, tape_bounds, tape_display, tape_read, tape_span,
+                             tape_window, tape_write)
+
+
+def test_contre_modele():
+    hasard = random.Random(16)
+    tape, uns = empty_tape(4), set()
+    anciens = []
+    for _ in range(2000):
+        pos = hasard.choice([hasard.randint(-300, 300), hasard.randint(-10, 10)])
+        if hasard.random() < 0.6:
+            val = hasard.randint(0, 1)
+            anciens.append((tape, frozenset(uns)))
+            tape = tape_write((tape, pos, val))
+            (uns.add if val else uns.discard)(pos)
+        assert tape_read((tape, pos)) == (pos in uns)
+    assert tape_span(tape) == ((min(uns), max(uns)) if uns else None)
+    assert tape_window((tape, -310, 310)) == ''.join('1' if p in uns else '0' for p in range(-310, 310))
+    # une écriture ne modifie jamais un ancien ruban
+    for ancien, contenu in anciens[::50]:
+        assert tape_window((ancien, -310, 310)) == ''.join('1' if p in contenu else '0' for p in range(-310, 310))
+
+
+def test_ruban_vide():
+    tape = empty_tape(1000)
+    assert tape[0] >= 1000 and tape_read((tape, -10 ** 6)) == 0 and tape_span(tape) is None
+    # écrire 0 hors du ruban ne l'agrandit pas
+    assert tape_write((tape, 10 ** 6, 0)) is tape
+    tape = tape_write((tape_write((tape, -3, 1)), -3, 0))
+    assert tape_span(tape) is None and tape_window((tape, -4, 1)) == '00000'
+
+
+@pytest.mark.parametrize('mode', FENETRES)
+def test_bornes(mode):
+    for head in (-40, 0, 30, 70):
+        for etendue in (None, (0, 5), (-100, 100), (25, 35)):
+            assert tape_bounds((mode, 21, head, etendue)) == bornes_fenetre(mode, 21, head, etendue)
+
+
+def test_affichage(monkeypatch):
+    tape = tape_write((tape_write((empty_tape(4), 40, 1)), 43, 1))
+    monkeypatch.setattr(persistant, 'FENETRE', 'fixe')
+    monkeypatch.setattr(persistant, 'LARGEUR', 61)
+    assert tape_display((tape, 41)) == '0' * 40 + '1001' + '0' * 17
+    monkeypatch.setattr(persistant, 'FENETRE', 'etendue')
+    assert tape_display((tape, 41)) == '1001'
+    monkeypatch.setattr(persistant, 'FENETRE', 'tete')
+    monkeypatch.setattr(persistant, 'LARGEUR', 5)
+    assert tape_display((tape, 41)) == '01001'
+
+
+def test_source_autonome(monkeypatch):
+    # variables d'environnement lues une fois, à l'exécution de la source
+    monkeypatch.setenv('MTDV_FENETRE', 'tete')
+    monkeypatch.setenv('MTDV_LARGEUR', '3')
+    ns = {}
+    exec(source_persistant(), ns)
+    assert (ns['FENETRE'], ns['LARGEUR']) == ('tete', 3)
+    tape = ns['tape_write']((ns['empty_tape'](8), 5, 1))
+    assert ns['tape_display']((tape, 5)) == '010'
+    assert source_persistant().count('os.environ') == 2
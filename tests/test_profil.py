@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Profil d'exécution (mtdv.profil) : compteurs de l'interprète égaux au
+nombre de pas sans -O et résultats inchangés ; mêmes compteurs dans le code
+de traducteur_1.py --profil (--local compris) et de traducteur_2.py
+--profil ; rapport annoté, piles repliées, fichier JSON et commande profil.
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+
+import pytest
+
+import traducteur_1
+import traducteur_2
+from conftest import DOSSIER_TS, NOMS, PROGRAMMES, entrees, programme, reference
+from mtdv import programme_depuis_lignes
+from mtdv.__main__ import main
+from mtdv.lexeur import lire_lignes
+from mtdv.profil import Profil, lire_profil, piles_repliees, rapport
+from test_optim import programme_aleatoire
+
+ADDITION = os.path.join(DOSSIER_TS, 'addition.1.TS')
+
+# (traducteur, optimise, local)
+VARIANTES = [(1, False, False), (1, True, False), (1, False, True), (1, True, True), (2, False, False),
+             (2, True, False)]
+IDS = ['1', '1-O', '1-local', '1-local-O', '2', '2-O']
+
+
+def profiler(prog, valeurs):
+    """
+    (Resultat, Profil) de l'interprète sur l'entrée valeurs.
+    """
+    profil = Profil(len(prog))
+    return reference(prog, valeurs, profil=profil), profil
+
+
+def generer(lignes, numero, optimise, local, chemin):
+    """
+    Espace de noms du code généré avec --profil, exécuté sur l'entrée
+    valeurs (generer(...)(valeurs)), et Programme traduit.
+    """
+    if numero == 1:
+        t = traducteur_1.MTdVTranslator(False, optimise, local=local, profil=chemin)
+    else:
+        t = traducteur_2.MTdVTranslator(False, optimise, profil=chemin)
+    prog = t.parse_ts_lines(lignes)
+    code = compile(t.generate_python_code(prog), 'genere', 'exec')
+
+    def executer(valeurs):
+        saisies = iter(str(v) for v in valeurs)
+        ns = {'__name__': 'test', 'input': lambda *a: next(saisies, '')}
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(code, ns)
+            ns['execute_program']()
+        return ns
+    return executer, prog
+
+
+def test_compteurs_interprete():
+    # sans -O, une exécution d'élément par pas ; résultat identique sans profil
+    hasard = random.Random(22)
+    for _ in range(200):
+        prog = programme_depuis_lignes([programme_aleatoire(hasard)], diese_obligatoire=False)
+        for valeurs in entrees(hasard.random(), 2):
+            r0 = reference(prog, valeurs, 20000)
+            profil = Profil(len(prog))
+            r = reference(prog, valeurs, 20000, profil=profil)
+            assert (r.head, r.pas, r.motif) == (r0.head, r0.pas, r0.motif)
+            assert profil.total() == r.pas
+
+
+def test_compteurs_boucle():
+    prog = programme_depuis_lignes(["boucle D si (1) fin } }"], diese_obligatoire=False)
+    profil = Profil(len(prog))
+    reference(prog, (30, 1, 40, 1), profil=profil)
+    # boucle, D, si, fin, '}' du si (jamais atteint), '}' de la boucle : sortie par fin au 10e tour
+    assert list(profil.compteurs) == [1, 10, 10, 1, 0, 9]
+    assert profil.temps[0] > 0 and not any(profil.temps[1:])
+
+
+def test_rapport():
+    lignes = ["% deux lignes", "boucle D si (1) fin }", "}"]
+    prog = programme_depuis_lignes(lignes, diese_obligatoire=False)
+    profil = Profil(len(prog))
+    reference(prog, (30, 1, 40, 1), profil=profil)
+    texte = list(rapport(prog, lignes, profil, 'essai.TS'))
+    assert texte[0] == "% Profil de essai.TS : 31 exécutions"
+    # une ligne du rapport par ligne du .TS, commentaires compris
+    assert [l.split('|')[2] for l in texte[2:5]] == [' ' + l for l in lignes]
+    assert texte[2].split('|')[0].strip() == ''
+    assert texte[3].split()[:2] == ['22', '70.97%'] and texte[4].split()[:2] == ['9', '29.03%']
+    assert texte[-1].startswith("%   ligne 2, colonne 1 : ") and "1 entrée(s), 9 tour(s), 31 exécutions" in texte[-1]
+
+
+def test_piles_repliees():
+    prog = programme_depuis_lignes(["boucle D", "si (1) fin }", "}"], diese_obligatoire=False)
+    profil = Profil(len(prog))
+    reference(prog, (30, 1, 40, 1), profil=profil)
+    piles = dict(l.rsplit(' ', 1) for l in piles_repliees(prog, profil, 'a;b'))
+    assert piles == {'a_b;ligne 1': '1', 'a_b;boucle 1:1;ligne 1': '10',
+                     'a_b;boucle 1:1;ligne 2': '11', 'a_b;boucle 1:1;ligne 3': '9'}
+    assert sum(int(v) for v in piles.values()) == profil.total()
+
+
+def test_profil_autre_programme():
+    prog = programme_depuis_lignes(["boucle D }"], diese_obligatoire=False)
+    with pytest.raises(ValueError):
+        list(rapport(prog, ["boucle D }"], Profil(len(prog) + 1)))
+    with pytest.raises(ValueError):
+        Profil.depuis_dict({'version': -1, 'compteurs': [0]})
+
+
+@pytest.mark.parametrize('numero, optimise, local', VARIANTES, ids=IDS)
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_code_genere(chemin, numero, optimise, local, tmp_path):
+    # mêmes compteurs que l'interprète sur le Programme traduit (-O compris)
+    lignes = lire_lignes(chemin)
+    if programme_depuis_lignes(lignes, diese_obligatoire=numero == 1) is None:
+        pytest.skip("analyse impossible")
+    executer, prog = generer(lignes, numero, optimise, local, str(tmp_path / 'p.json'))
+    for valeurs in entrees(22, 3):
+        r, profil = profiler(prog, valeurs)
+        if r.motif:
+            continue
+        assert list(executer(valeurs)['COMPTEURS']) == list(profil.compteurs)
+
+
+@pytest.mark.parametrize('numero, local', [(1, False), (1, True), (2, False)], ids=['1', '1-local', '2'])
+def test_fichier_et_commande(numero, local, tmp_path, capsys):
+    donnees = tmp_path / 'addition.json'
+    executer, prog = generer(lire_lignes(ADDITION), numero, False, local, str(donnees))
+    valeurs = (26, 5, 32, 4)
+    ns = executer(valeurs)
+    ns['ecrire_profil']()
+    profil, optimise = lire_profil(str(donnees))
+    assert not optimise and list(profil.compteurs) == list(ns['COMPTEURS'])
+    assert profil.total() == reference(programme(ADDITION), valeurs).pas
+    # rapports du fichier JSON : mêmes exécutions par ligne qu'un profil de l'interprète (temps exceptés)
+    sortie = tmp_path / 'rapport.txt'
+    assert main(['profil', ADDITION, str(donnees), '-o', str(sortie)]) == 0
+    assert str(sortie) in capsys.readouterr().out
+    n = len(lire_lignes(ADDITION)) + 2
+    attendu = list(rapport(prog, lire_lignes(ADDITION), profiler(prog, valeurs)[1], 'addition.1.TS'))[:n]
+    obtenu = sortie.read_text(encoding='utf-8').splitlines()[:n]
+    assert [(l[:20], l[33:]) for l in obtenu] == [(l[:20], l[33:]) for l in attendu]
+    assert (tmp_path / 'rapport.folded').read_text(encoding='utf-8').splitlines() == \
+           list(piles_repliees(prog, profil, 'addition.1.TS'))
+
+
+def test_commande_erreurs(tmp_path, capsys):
+    donnees = tmp_path / 'p.json'
+    donnees.write_text(json.dumps({'version': -1, 'compteurs': []}))
+    assert main(['profil', ADDITION, str(donnees)]) == 1
+    # profil d'un autre programme
+    donnees.write_text(json.dumps(Profil(3).vers_dict()))
+    assert main(['profil', ADDITION, str(donnees)]) == 1
+    assert 'ERREUR' in capsys.readouterr().err
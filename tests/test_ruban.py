@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Rubans non bornés (mtdv.ruban), RubanPagine et RubanBits, contre un modèle
+naïf (ensemble des cases à 1) : lecture, écriture, remplissage, fenêtre,
+recherche, étendue et comptage, positions négatives et changements de page
+compris ; ruban à sentinelles de traducteur_1.py --local.
+"""
+
+import random
+
+import pytest
+
+from mtdv.ruban import (RubanBits, RubanPagine, classe_ruban, elargir_sentinelles, remplir_sentinelles,
+                        source_ruban)
+
+CLASSES = [RubanPagine, RubanBits]
+
+
+def chercher_naif(uns, pos, val, sens):
+    if val == 1 and not any((p - pos) * sens >= 0 for p in uns):
+        return None
+    while (pos in uns) != bool(val):
+        pos += sens
+    return pos
+
+
+@pytest.mark.parametrize('classe', CLASSES, ids=lambda c: c.__name__)
+def test_contre_modele(classe):
+    hasard = random.Random(1)
+    page = classe.TAILLE_PAGE
+    tape, uns = classe(), set()
+    for _ in range(3000):
+        pos = hasard.choice([hasard.randint(-3 * page, 3 * page), hasard.randint(-40, 40)])
+        choix = hasard.random()
+        if choix < 0.5:
+            val = hasard.randint(0, 1)
+            tape[pos] = val
+            (uns.add if val else uns.discard)(pos)
+        elif choix < 0.6:
+            fin, val = pos + hasard.randint(0, 2 * page), hasard.randint(0, 1)
+            tape.remplir(pos, fin, val)
+            for p in range(pos, fin):
+                (uns.add if val else uns.discard)(p)
+        else:
+            val, sens = hasard.randint(0, 1), hasard.choice([1, -1])
+            assert tape.chercher(pos, val, sens) == chercher_naif(uns, pos, val, sens)
+        assert tape[pos] == (pos in uns)
+    assert tape.compter() == len(uns)
+    assert tape.etendue() == (min(uns), max(uns))
+    debut = min(uns) - 5
+    assert tape.fenetre(debut, max(uns) + 6) == bytes(p in uns for p in range(debut, max(uns) + 6))
+
+
+@pytest.mark.parametrize('classe', CLASSES, ids=lambda c: c.__name__)
+def test_ruban_vide(classe):
+    tape = classe()
+    assert tape[-10 ** 9] == 0 and tape.etendue() is None and tape.compter() == 0
+    assert tape.chercher(5, 1) is None and tape.chercher(5, 0, -1) == 5
+    # écrire 0 sur une case jamais écrite n'alloue rien
+    tape[123456] = 0
+    assert tape.pages == {} and repr(tape) == f"{classe.__name__}()"
+    tape = classe([1, 0, 1], debut=-1)
+    assert tape.fenetre(-2, 3) == b'\0\1\0\1\0' and repr(tape) == f"{classe.__name__}(debut=-1, '101')"
+
+
+@pytest.mark.parametrize('classe', CLASSES, ids=lambda c: c.__name__)
+def test_source_autonome(classe):
+    # la source recopiée dans le code généré définit la même classe, sans import
+    ns = {}
+    exec(source_ruban(classe), ns)
+    tape = ns[classe.__name__]()
+    tape.remplir(-5, 5)
+    tape[0] = 0
+    assert (tape.etendue(), tape.compter(), tape.chercher(0, 1)) == ((-5, 4), 9, 1)
+
+
+def test_classe_ruban():
+    assert (classe_ruban(), classe_ruban(True)) == (RubanPagine, RubanBits)
+
+
+def test_sentinelles():
+    # contenu conservé, marge de cases à 0 de chaque côté après chaque élargissement
+    marge = 5
+    t, origine, head = bytearray(32), 16, 16
+    t, origine, head, limite = remplir_sentinelles(t, origine, head, marge, -100, -97)
+    t, origine, head, limite = remplir_sentinelles(t, origine, head, marge, 200, 201)
+    assert origine - 100 >= marge and origine + 201 <= limite and limite == len(t) - marge
+    assert [p - origine for p in range(len(t)) if t[p]] == [-100, -99, -98, 200]
+    assert head - origine == 0
+    t2, origine2, head2, limite2 = elargir_sentinelles(t, origine, head + 7, marge)
+    assert len(t2) > 2 * len(t) and head2 - origine2 == 7 and limite2 == len(t2) - marge
+    assert t2[origine2 - 100:origine2 + 201] == t[origine - 100:origine + 201]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Traces .mtt (mtdv.trace) : l'état reconstruit par etat_au_pas, à la fin et
+à un pas quelconque, est celui de l'interprète arrêté à ce pas, avec et sans
+-O, compression et petit tampon ; commande trace.
+"""
+
+import pytest
+
+from conftest import NOMS, PROGRAMMES, cases, entrees, programme, reference
+from mtdv.__main__ import main
+from mtdv.optim import optimiser
+from mtdv.trace import EcrivainTrace, LecteurTrace, TraceInvalide, etat_au_pas
+
+PAS = 20000
+COUPES = (1, 2, 7, 100, 1234, 19999)
+
+
+@pytest.mark.parametrize('compresse, tampon', [(False, 1 << 16), (True, 7)], ids=['brut', 'zlib'])
+@pytest.mark.parametrize('optimise', [False, True], ids=['brut', 'O'])
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_etat_au_pas(tmp_path, chemin, optimise, compresse, tampon):
+    prog = programme(chemin)
+    if prog is None:
+        pytest.skip("analyse impossible")
+    if optimise:
+        prog = optimiser(prog)
+    fichier = str(tmp_path / 'p.mtt')
+    for valeurs in entrees(3, 2):
+        r = reference(prog, valeurs, PAS, trace=EcrivainTrace(fichier, compresse, taille_tampon=tampon))
+        tape, head, _ = etat_au_pas(fichier)
+        assert (head, cases(tape)) == (r.head, cases(r.tape))
+        # pas fixes, et répartis sur l'exécution
+        for pas in COUPES + (r.pas // 3, r.pas // 2, r.pas - 1):
+            r2 = reference(prog, valeurs, pas)
+            tape, head, _ = etat_au_pas(fichier, r2.pas)
+            assert (head, cases(tape)) == (r2.head, cases(r2.tape))
+
+
+def test_trace_invalide(tmp_path):
+    fichier = tmp_path / 'p.mtt'
+    fichier.write_bytes(b'pas une trace')
+    with pytest.raises(TraceInvalide):
+        LecteurTrace(str(fichier))
+
+
+def test_commande(tmp_path, capsys):
+    prog = programme(PROGRAMMES[NOMS.index('addition.1.TS')])
+    fichier = str(tmp_path / 'p.mtt')
+    r = reference(prog, (26, 5, 32, 4), trace=EcrivainTrace(fichier, True))
+    assert main(['trace', fichier]) == 0
+    sortie = capsys.readouterr().out
+    # pas du dernier enregistrement (déplacement ou écriture), au plus r.pas
+    pas = int(sortie.split('(pas ')[1].split(')')[0])
+    assert sortie.startswith('État à la fin de la trace (pas ') and pas <= r.pas
+    assert sortie.endswith(f'Tête en {r.head}, {r.tape.compter()} bâton(s).\n')
+    assert main(['trace', fichier, '--pas', '3']) == 0
+    assert capsys.readouterr().out.startswith('État après le pas 3 ')
+    (tmp_path / 'faux.mtt').write_bytes(b'pas une trace')
+    assert main(['trace', str(tmp_path / 'faux.mtt')]) == 1
+    assert 'ERREUR' in capsys.readouterr().err
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Code généré par traducteur_1.py à traducteur_4.py, exécuté sur les programmes
+de programmesTS/ : même tête et même ruban final que l'interprète, avec et
+sans -O et --bits (traducteur_1 et traducteur_2, --local compris).
+"""
+
+import contextlib
+import io
+
+import pytest
+
+import traducteur_1
+import traducteur_2
+import traducteur_3
+import traducteur_4
+from conftest import NOMS, PROGRAMMES, cases, entrees, programme, reference
+from mtdv.ir import programme_plat
+from mtdv.lexeur import lire_lignes
+
+ENTREES = entrees(5, 4)
+
+# (optimise, bits, local) pour traducteur_1, (optimise, bits) pour traducteur_2
+OPTIONS_1 = [(False, False, False), (True, False, False), (False, True, False), (True, True, False),
+             (False, False, True), (True, False, True)]
+OPTIONS_2 = [(False, False), (True, False), (False, True), (True, True)]
+
+
+def executer_genere(code, valeurs):
+    """
+    Exécute le code généré (execute_program) en répondant valeurs aux
+    saisies, sortie écartée ; retourne l'espace de noms et le résultat.
+    """
+    saisies = iter(valeurs)
+    ns = {'__name__': 'test', 'input': lambda *a: next(saisies, '')}
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(code, ns)
+        res = ns['execute_program']()
+    return ns, res
+
+
+def resultats(prog, traduire):
+    """
+    (attendu, obtenu) pour chaque entrée sur laquelle l'interprète s'arrête.
+    """
+    paires = []
+    for valeurs in ENTREES:
+        r = reference(prog, valeurs)
+        if r.motif is None:
+            paires.append(((r.head, cases(r.tape)), traduire(valeurs)))
+    return paires
+
+
+@pytest.mark.parametrize('optimise, bits, local', OPTIONS_1)
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_traducteur_1(chemin, optimise, bits, local):
+    prog = programme(chemin, diese_obligatoire=True)
+    if prog is None:
+        pytest.skip("'#' absent : refusé par traducteur_1")
+    t = traducteur_1.MTdVTranslator(bits, optimise, local=local)
+    code = compile(t.generate_python_code(t.parse_ts_lines(lire_lignes(chemin))), chemin, 'exec')
+
+    def traduire(valeurs):
+        ns, res = executer_genere(code, valeurs)
+        if local:
+            # bytearray à sentinelles, case 0 en origine
+            t, origine, head = res
+            return head - origine, bytes(t[origine + i] if 0 <= origine + i < len(t) else 0
+                                         for i in range(-200, 400))
+        return ns['head'], cases(ns['tape'])
+
+    for attendu, obtenu in resultats(prog, traduire):
+        assert obtenu == attendu
+
+
+@pytest.mark.parametrize('optimise', [False, True], ids=['brut', 'O'])
+def test_local_elargi(optimise):
+    # la tête part loin des deux côtés : ruban à sentinelles élargi plusieurs fois
+    lignes = ["boucle G si (1) fin } } 0 boucle D si (1) fin } } #"]
+    t = traducteur_1.MTdVTranslator(False, optimise, local=True)
+    code = compile(t.generate_python_code(t.parse_ts_lines(lignes)), 'local', 'exec')
+    _, (ruban, origine, head) = executer_genere(code, ('-5000', '1', '7000', '1'))
+    assert head - origine == 7000 and ruban[origine - 5000] == 0 and ruban.count(1) == 1
+
+
+@pytest.mark.parametrize('optimise, bits', OPTIONS_2)
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_traducteur_2(chemin, optimise, bits):
+    prog = programme(chemin)
+    if prog is None:
+        pytest.skip("analyse impossible")
+    t = traducteur_2.MTdVTranslator(bits, optimise)
+    code = compile(t.generate_python_code(t.parse_ts_lines(lire_lignes(chemin))), chemin, 'exec')
+
+    def traduire(valeurs):
+        ns, _ = executer_genere(code, valeurs)
+        return ns['head'], cases(ns['tape'])
+
+    for attendu, obtenu in resultats(prog, traduire):
+        assert obtenu == attendu
+
+
+def _lancer_3(ns, tape, prog):
+    return ns['run_instructions'](tape, 30, prog, 0, 1)
+
+
+def _lancer_4(ns, tape, prog):
+    etat = ns['run_instructions']([tape, 30, prog, 0])
+    return etat[0], etat[1]
+
+
+@pytest.mark.parametrize('module, lancer', [(traducteur_3, _lancer_3), (traducteur_4, _lancer_4)],
+                         ids=['traducteur_3', 'traducteur_4'])
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_traducteurs_fonctionnels(chemin, module, lancer):
+    prog = programme(chemin)
+    if prog is None:
+        pytest.skip("analyse impossible")
+    t = module.MTdVTranslator()
+    ir = t.parse_ts_lines(lire_lignes(chemin))
+    ns = {'__name__': 'test', 'input': lambda *a: ''}
+    exec(compile("\n".join(t.generate_pure_function_code(ir)), chemin, 'exec'), ns)
+    plat = programme_plat(ir)
+
+    def traduire(valeurs):
+        tape = ns['empty_tape'](1000)
+        for debut, longueur in (valeurs[:2], valeurs[2:]):
+            for c in range(debut, debut + longueur):
+                tape = ns['tape_write']((tape, c, 1))
+        with contextlib.redirect_stdout(io.StringIO()):
+            tape, head = lancer(ns, tape, plat)
+        return head, bytes(int(c) for c in ns['tape_window']((tape, -200, 400)))
+
+    for attendu, obtenu in resultats(prog, traduire):
+        assert obtenu == attendu
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+mtdv.vectoriel contre Moteur : même tête, même nombre de pas, même motif
+d'interruption et mêmes cases à 1 pour chaque ruban d'un lot, avec et sans
+-O, budgets courts (interruption en cours de boucle ou de recherche) compris ;
+executer_specs identique à mtdv.multi.
+"""
+
+import os
+
+import pytest
+
+from conftest import DOSSIER_TS, NOMS, PROGRAMMES, entrees, programme, reference, ruban
+from mtdv.multi import executer_multi
+from mtdv.optim import optimiser
+
+np = pytest.importorskip('numpy')
+
+from mtdv.vectoriel import executer_specs, executer_vectoriel  # noqa: E402
+
+ENTREES = entrees(4, 12)
+
+
+def cases_a_1(tape):
+    e = tape.etendue()
+    return [] if not e else [i for i in range(e[0], e[1] + 1) if tape[i]]
+
+
+@pytest.mark.parametrize('pas_max', [1, 17, 250, 5000])
+@pytest.mark.parametrize('optimise', [False, True], ids=['brut', 'O'])
+@pytest.mark.parametrize('chemin', PROGRAMMES, ids=NOMS)
+def test_contre_moteur(chemin, optimise, pas_max):
+    prog = programme(chemin)
+    if prog is None:
+        pytest.skip("analyse impossible")
+    if optimise:
+        prog = optimiser(prog)
+    res = executer_vectoriel(prog, [ruban(v) for v in ENTREES], [30] * len(ENTREES), pas_max)
+    for i, valeurs in enumerate(ENTREES):
+        r = reference(prog, valeurs, pas_max)
+        obtenu = (int(res.heads[i]), int(res.pas[i]), res.motif(i),
+                  [int(c) - res.origine for c in np.flatnonzero(res.tapes[i])])
+        assert obtenu == (r.head, r.pas, r.motif, cases_a_1(r.tape))
+
+
+def test_specs_comme_multi():
+    # mêmes résultats que mtdv.multi, lignes invalides comprises
+    prog = programme(os.path.join(DOSSIER_TS, 'addition.1.TS'))
+    specs = [(1, "0011100111 2"), (2, '{"plages": 5}'), (3, '{"plages": [[2, 3], [6, 5]], "tete": 2}'),
+             (4, "0012"), (5, '{"ruban": "0111", "tete": 1}')]
+    attendu = list(executer_multi(prog, specs, processus=1, pas_max=1000))
+    assert list(executer_specs(prog, specs, 1000, taille_lot=2)) == attendu
+    assert [('erreur' in r) for r in attendu] == [False, True, False, True, False]
@@ -1,13 +1,42 @@
-import re
+import os
 import sys
 
+from mtdv.affichage import source_affichage
+from mtdv.ir import (OP_0, OP_1, OP_BOUCLE, OP_CHERCHE_D, OP_CHERCHE_G, OP_D, OP_DEPLACE, OP_DIESE,
+                     OP_FERME, OP_FIN, OP_G, OP_I, OP_P, OP_SI0, OP_SI1, Programme, contient_boucle,
+                     debuts_blocs, programme_depuis_lignes)
+from mtdv.budget import CompteurPas, source_budget
+from mtdv.carte import CarteSource
+from mtdv.lexeur import lignes_fichier
+from mtdv.optim import optimiser
+from mtdv.profil import source_profil
+from mtdv.ruban import classe_ruban, source_ruban, source_sentinelles
+
 class MTdVTranslator:
-    def __init__(self):
+    def __init__(self, ruban_bits=False, optimiser=False, pas_max=None, delai=None, local=False, profil=None):
+        # ruban_bits : ruban compact d'un bit par case (RubanBits) dans le code généré
+        # optimiser : appliquer mtdv.optim (boucles de recherche => tape.chercher)
+        # pas_max, delai : budget d'exécution vérifié aux points de contrôle (mtdv.budget)
+        # local : tout le programme dans une fonction à variables locales (emit_local_code)
+        # profil : fichier JSON du profil d'exécution (mtdv.profil) ; None => aucun comptage
+        self.ruban = classe_ruban(ruban_bits)
+        self.optimiser = optimiser
+        self.local = local
+        self.budget = pas_max is not None or delai is not None
+        self.pas_max = pas_max
+        self.delai = delai
+        # pas en attente depuis le dernier point de contrôle (mtdv.budget.CompteurPas)
+        self.compteur = CompteurPas()
+        self.profil = profil
         self.indent_level = 0
-        self.initialized = False
-        self.boucle_count = 0
-        self.boucle_stack = []
+        self.blocs = {}
+        self.fonctions = []
         self.code = []
+        # reçoit chaque ligne générée : self.code.append, ou l'écriture dans
+        # le fichier de sortie (write_python_code)
+        self.ecrire = self.code.append
+        # carte de correspondance vers le .TS (mtdv.carte.CarteSource) ou None
+        self.carte = None
     
     def indent(self):
         return "    " * self.indent_level
@@ -16,293 +45,275 @@ class MTdVTranslator:
         if indent_level is not None:
             old_indent = self.indent_level
             self.indent_level = indent_level
-            self.code.append(self.indent() + line)
+            self.ecrire(self.indent() + line)
             self.indent_level = old_indent
         else:
-            self.code.append(self.indent() + line)
+            self.ecrire(self.indent() + line)
 
     def parse_ts_lines(self, lines):
         """
-        À partir des lignes d'un fichier .ts, effectue une analyse avec tokenize + P0 pour obtenir une liste de (tokID, tok, level).
-        Ensuite, convertit cette liste en une structure d'instructions requise pour la génération de code.
-        """
-        # 1) Utilise le nouveau parseur pour obtenir la liste (tokID, tok, level)
-        parse_result = self.parse_ts_lines_new(lines)
-
-        # 2) Convertit parse_result en une liste/arborescence d'instructions
-        instructions = self._convert_tokens_to_instructions(parse_result)
-        return instructions
-
-    def parse_ts_lines_new(self, lines):
-        """
-        使用新的解析器逻辑来对 .ts 文件的行进行解析，
-        返回 [(tokID, tok, level), ...] 形式的解析结果。
+        À partir des lignes d'un fichier .ts : analyse lexicale, puis construction de la
+        représentation compacte (mtdv.ir : opcodes dans un array('b') + sauts dans un array('i')).
+        Les générateurs parcourent ce Programme au travers de vues Noeud.
         """
-        # 1) Prépare les expressions régulières nécessaires pour l'analyse lexicale
-        terminals_re = {
-            '#'      : r'^[ \n]*#[ \n]*',
-            '}'      : r'^[ \n]*}[ \n]*',
-            'I'      : r'^[ \n]*I[ \n]*',
-            'P'      : r'^[ \n]*P[ \n]*',
-            'G'      : r'^[ \n]*G[ \n]*',
-            'D'      : r'^[ \n]*D[ \n]*',
-            '0'      : r'^[ \n]*0[ \n]*',
-            '1'      : r'^[ \n]*1[ \n]*',
-            'fin'    : r'^[ \n]*fin[ \n]*',
-            'boucle' : r'^[ \n]*boucle[ \n]*',
-            'si(0)'  : r'^[ \n]*si[ \n]*\([ \n]*0[ \n]*\)[ \n]*',
-            'si(1)'  : r'^[ \n]*si[ \n]*\([ \n]*1[ \n]*\)[ \n]*'
-        }
-        terminals_automata = {
-            x: re.compile(terminals_re[x]) for x in terminals_re.keys()
-        }
-
-        # 2) Assemble les lignes en une grande chaîne pour l'analyse lexicale
-        txt = "\n".join(lines)
-        tokens = self._tokenize_string(txt, terminals_automata)
-
-        # 3) Utilise une petite machine à états P0 pour une analyse syntaxique simple (obtenir (tokID, tok, K))
-        parse_result = []
-        success = self._parse_tokens_P0(tokens, parse_result)
-        if not success:
+        programme = programme_depuis_lignes(lines, diese_obligatoire=True)
+        if programme is None:
             print("ERROR: parse failed.")
-            return []
-        
-        return parse_result
+            return Programme()
+        if self.optimiser:
+            programme = optimiser(programme)
+        return programme
 
-    def _tokenize_string(self, txt, terms_automata):
+    def recherche(self, inst):
         """
-        Divise le texte txt en une liste de tokens en utilisant plusieurs expressions régulières.
-        Si un texte non reconnu est rencontré, signale une erreur ou lève une exception.。
+        Lignes Python d'une boucle de recherche reconnue par mtdv.optim :
+        déplacer la tête jusqu'à la première case valant inst.value.
         """
-        txt_sz = len(txt)
-        tokens = []
-        match = True
-
-        while match and (len(txt) != 0):
-            # Saute les lignes de commentaires
-            if txt.lstrip().startswith('%'):
-                # Trouve la position du prochain saut de ligne
-                next_newline = txt.find('\n')
-                if next_newline != -1:
-                    txt = txt[next_newline + 1:]
-                    continue
-                else:
-                    # Si aucun saut de ligne n'est trouvé, c'est la fin du fichier
-                    break
-            
-            # sauter lignes vides
-            if txt.strip() == '':
-                next_newline = txt.find('\n')
-                if next_newline != -1:
-                    txt = txt[next_newline + 1:]
-                    continue
-                else:
-                    break
-
-            for tok_nm, pattern in terms_automata.items():
-                match = pattern.search(txt)
-                if match:
-                    (b, e) = match.span(0)
-                    if b == 0:
-                        tokens.append(tok_nm)
-                        txt = txt[e:]
-                        break
-            else:
-                next_newline = txt.find('\n')
-                if next_newline != -1:
-                    txt = txt[next_newline + 1:]
-                else:
-                    match = False
-
-        if match or len(txt) == 0:
-            return tokens
-        else:
-            offset = txt_sz - len(txt)
-            print(f"ERROR: unknown token at position {offset}. Remainder: {txt[:40]!r}...")
-            return []
-
-    def _parse_tokens_P0(self, tokens, parse_result, parse_state='P0', K=0, tokid=0):
+        sens = 1 if inst.op == OP_CHERCHE_D else -1
+        val, avance = inst.arg & 1, inst.arg >> 1
+        depart = f"head {'+' if sens > 0 else '-'} {avance}" if avance else "head"
+        if self.budget:
+            # pas et arrêt de la boucle d'origine (recherche_budget, mtdv.budget)
+            return self.compteur.recherche(f"tape.chercher({depart}, {val}, {sens})", inst.arg, sens)
+        return [f"head = tape.chercher({depart}, {val}, {sens})",
+                "if head is None:",
+                f"    sys.exit('boucle sans fin : aucune case à {val} sur le ruban')"]
+
+    def lignes_budget(self, lignes):
+        # lignes du compteur de pas (mtdv.budget.CompteurPas), avec le budget seulement
+        if self.budget:
+            for l in lignes:
+                self.add_line(l)
+
+    def controle(self):
+        # point de contrôle du budget : 'boucle', '}', 'fin', '#'
+        self.lignes_budget(self.compteur.controle())
+
+    def placer(self, pc=None):
+        # position .TS des lignes suivantes (carte de correspondance)
+        if self.carte is not None:
+            self.carte.placer(pc)
+
+    def compter(self, pc):
+        # exécutions de l'élément pc (profil)
+        if self.profil:
+            self.add_line(f"COMPTEURS[{pc}] += 1")
+
+    def entrer_boucle(self, pc):
+        if self.profil:
+            self.add_line(f"ENTREE[{pc}] = perf_counter()")
+
+    def sortir_boucle(self, pc):
+        if self.profil:
+            self.add_line(f"TEMPS[{pc}] += perf_counter() - ENTREE[{pc}]")
+            self.add_line(f"ENTREE[{pc}] = 0.0")
+
+    def entete_profil(self, prog):
+        if self.profil:
+            for l in source_profil(len(prog), self.profil, self.optimiser).splitlines():
+                self.add_line(l)
+            self.add_line("")
+
+    # =============== Machine à états : un bloc de base par fonction ===============
+    # Le programme est découpé en blocs de base (mtdv.ir.debuts_blocs) : début,
+    # corps de chaque boucle, sortie de boucle, suite d'un 'si' qui contient une
+    # boucle. Chaque bloc devient une fonction sans boucle qui retourne le numéro
+    # du bloc suivant (-1 => arrêt) ; execute_program enchaîne les blocs par
+    # STEP = BLOCS[STEP](), un accès à une liste quel que soit le nombre de blocs.
+    def chercher_blocs(self, prog):
         """
-        Descente récursive simple / automate à pile :
-          - '#' et K==0 => fin
-          - '}' => K diminue de 1
-          - 'boucle','si(0)','si(1)' => K augmente de 1
-          - autres instructions => K reste inchangé
-        parse_result enregistre (tokID, tok, K)
+        Début de chaque bloc => numéro du bloc (rang dans BLOCS) ; une position
+        au-delà du programme => -1. Un bloc qui commence par 'boucle' ne ferait
+        que sauter au corps : il prend le numéro du corps (pas de fonction),
+        sauf avec le profil qui compte les entrées dans la boucle et le
+        budget qui y compte un pas.
         """
-        if not tokens:
-            # Si aucun token restant, on considère une fin erronée, sauf si '#' a été rencontré
-            return False
-
-        tok = tokens[0]
-        tokid += 1
-        parse_result.append((tokid, tok, K))
-
-        if tok == '#' and K == 0:
-            # Rencontrer '#' au niveau supérieur indique une fin réussie
-            return True
-        elif tok in ['I','P','G','D','0','1','fin']:
-            # Instructions normales => K reste inchangé
-            return self._parse_tokens_P0(tokens[1:], parse_result, parse_state, K, tokid)
-        elif tok in ['boucle','si(0)','si(1)']:
-            # Ouvre un bloc => K augmente de 1
-            return self._parse_tokens_P0(tokens[1:], parse_result, parse_state, K+1, tokid)
-        elif tok == '}':
-            # Ferme un bloc => K diminue de 1
-            if K < 1:
-                print('ERROR: unbalanced "}" encountered.')
-                return False
-            else:
-                return self._parse_tokens_P0(tokens[1:], parse_result, parse_state, K-1, tokid)
-        else:
-            print(f'ERROR: unexpected token "{tok}" (K={K})')
-            return False
-
-
-    def _convert_tokens_to_instructions(self, parse_result):
+        ops = prog.ops
+        n = len(ops)
+        debuts = debuts_blocs(prog)
+        self.blocs = {}
+        self.fonctions = []
+        for pc in debuts:
+            if pc >= n:
+                self.blocs[pc] = -1
+            elif ops[pc] != OP_BOUCLE or self.profil or self.budget:
+                self.blocs[pc] = len(self.fonctions)
+                self.fonctions.append(pc)
+        for pc in reversed(debuts):
+            if pc < n and ops[pc] == OP_BOUCLE and not (self.profil or self.budget):
+                self.blocs[pc] = self.blocs[pc + 1]
+
+    def cible(self, pc):
+        return self.blocs.get(pc, -1)
+
+    def translate_bloc(self, prog, debut):
         """
-        Convertit une série de (tokID, tok, K) de parse_result en une structure comme :
-          [
-            {"type":"boucle", "content":[]},
-            {"type":"si","condition":0,"content":[]},
-            {"type":"instruction","value":"I"},
-            {"type":"fin"},
-            {"type":"endfile"},
-            ...
-          ]
-        Ce format est utilisable par generate_python_code().
-
-        Idée d'implémentation :
-          - Maintenir un nœud racine root = {"type":"root","content":[]}
-          - Maintenir une correspondance {level -> bloc courant}
-          - Lors de la rencontre de "boucle" / "si(0)" / "si(1)", créer un nouveau bloc, l'ajouter au contenu du bloc courant, et mettre à jour level_map[level+1]
-          - Lors de la rencontre de "}", retirer de level_map
-          - Lors de la rencontre de '#', ajouter endfile
-          - Pour une instruction normale, l'ajouter au bloc courant
+        Fonction du bloc commençant en debut : instructions en ligne jusqu'au
+        prochain saut (entrée ou retour de boucle, 'fin', '#', début d'un autre
+        bloc), qui devient 'return <numéro du bloc suivant>'.
         """
-        root = {"type": "root", "content": []}
-        level_map = {0: root}   # Utiliser level_map[k] pour représenter "le bloc courant au niveau k"
-        
-        for (tokid, tok, k) in parse_result:
-            # Si k n'est pas encore dans level_map, créer un "bloc vide"
-            # Sinon, les blocs sautés causeraient des erreurs
-            if k not in level_map:
-                # Attention : nécessiterait plus de vérifications en cas de sauts de niveau
-                level_map[k] = {"type": "unknown", "content": []}
-
-            current_block = level_map[k]
-
-            # Analyse du token
-            if tok == '#':
-                current_block["content"].append({"type": "endfile"})
-            elif tok in ['I','P','G','D','0','1']:
-                current_block["content"].append({
-                    "type": "instruction",
-                    "value": tok
-                })
-            elif tok == 'fin':
-                current_block["content"].append({"type": "fin"})
-            elif tok == 'boucle':
-                new_block = {"type": "boucle", "content": []}
-                current_block["content"].append(new_block)
-                # Le bloc suivant (k+1) devient new_block
-                level_map[k+1] = new_block
-            elif tok == 'si(0)':
-                new_block = {"type": "si", "condition": 0, "content": []}
-                current_block["content"].append(new_block)
-                level_map[k+1] = new_block
-            elif tok == 'si(1)':
-                new_block = {"type": "si", "condition": 1, "content": []}
-                current_block["content"].append(new_block)
-                level_map[k+1] = new_block
-            elif tok == '}':
-                # Ferme le bloc courant => Retirer de level_map
-                # Ainsi, les instructions suivantes retournent au bloc parent
-                level_map.pop(k, None)
+        ops, args = prog.ops, prog.args
+        n = len(ops)
+        self.placer(debut)
+        self.add_line(f"def bloc_{self.blocs[debut]}():")
+        self.indent_level += 1
+        self.add_line("global head" + (", PAS" if self.budget else ""))
+        self.compteur = CompteurPas()
+        pc = debut
+        while True:
+            if pc < n:
+                self.placer(pc)
+            if pc >= n or ops[pc] == OP_DIESE:
+                if pc < n:
+                    self.compter(pc)
+                    self.controle()
+                self.add_line("return -1")
+                break
+            op = ops[pc]
+            if pc != debut and pc in self.blocs:
+                self.lignes_budget(self.compteur.vider())
+                self.add_line(f"return {self.blocs[pc]}")
+                break
+            if op == OP_BOUCLE:
+                # entrer dans la boucle
+                self.compter(pc)
+                self.controle()
+                self.entrer_boucle(pc)
+                self.add_line(f"return {self.blocs[pc + 1]}")
+                break
+            if op == OP_FERME:
+                j = args[pc]
+                self.compter(pc)
+                self.controle()
+                if ops[j] == OP_BOUCLE:
+                    # retour de boucle : recommencer le corps
+                    self.add_line(f"return {self.blocs[j + 1]}")
+                    break
+                # fin d'un 'si' contenant une boucle, déplié ci-dessous
+                pc += 1
+            elif (op == OP_SI0 or op == OP_SI1) and contient_boucle(prog, pc):
+                # condition fausse => après le '}', sinon continuer dans le corps
+                self.compter(pc)
+                self.add_line(f"if tape[head] != {prog.noeud(pc).condition}:")
+                self.indent_level += 1
+                self.lignes_budget(self.compteur.si())
+                self.add_line(f"return {self.cible(args[pc] + 1)}")
+                self.indent_level -= 1
+                pc += 1
             else:
-                # Token inconnu, ne devrait pas arriver car géré dans parse_ts_lines_new
-                pass
-
-        # Finalement, toutes les instructions sont dans root["content"], avec des blocs imbriqués
-        # Si seules les instructions de niveau supérieur sont nécessaires, retourner root["content"]
-        return root["content"]
-
+                self.translate_instruction(prog.noeud(pc))
+                pc = args[pc] + 1 if (op == OP_SI0 or op == OP_SI1) else pc + 1
+        self.indent_level -= 1
+        self.add_line("")
 
     def translate_instruction(self, inst):
-        if inst["type"] == "instruction":
-            val = inst.get("value", "")
-            if val == "I" and not self.initialized:
-                self.add_line("tape = [0] * 1000")
-                self.add_line("head = 30")
-                self.initialized = True
-            elif val == "P":
+        """
+        Une instruction à l'intérieur d'un bloc ('si' sans boucle compris).
+        """
+        op = inst.op
+        self.placer(inst.index)
+        self.compter(inst.index)
+        if op <= OP_1 or op == OP_DEPLACE:
+            # pas en attente jusqu'au prochain point de contrôle
+            self.compteur.instruction(op, inst.arg)
+        if op == OP_I or op == OP_P:
+            self.add_line("afficher_ruban(tape, head)")
+            if op == OP_P:
                 self.add_line("input('Appuyez sur Entrée pour continuer...')")
-            elif val == "G":
-                self.add_line("if head > 0:")
-                self.indent_level += 1
-                self.add_line("head = head - 1")
-                self.indent_level -= 1
-            elif val == "D":
-                self.add_line("if head < 999:")
-                self.indent_level += 1
-                self.add_line("head = head + 1")
-                self.indent_level -= 1
-            elif val in ["0","1"]:
-                self.add_line("if head >= 0 and head < 1000:")
-                self.indent_level += 1
-                self.add_line(f"tape[head] = {val}")
-                self.indent_level -= 1
-
-        elif inst["type"] == "si":
-            cond = inst.get("condition", 0)
-            self.add_line(f"if tape[head] == {cond}:")
+        elif op == OP_G:
+            self.add_line("head = head - 1")
+        elif op == OP_D:
+            self.add_line("head = head + 1")
+        elif op == OP_DEPLACE:
+            self.add_line(f"head = head {'+' if inst.arg > 0 else '-'} {abs(inst.arg)}")
+        elif op == OP_0 or op == OP_1:
+            self.add_line(f"tape[head] = {inst.value}")
+        elif op == OP_CHERCHE_D or op == OP_CHERCHE_G:
+            for l in self.recherche(inst):
+                self.add_line(l)
+
+        elif op == OP_SI0 or op == OP_SI1:
+            self.add_line(f"if tape[head] == {inst.condition}:")
             self.indent_level += 1
-            sub_insts = inst.get("content", [])
-            if not sub_insts:
+            faux = self.compteur.si()
+            if inst.vide and not self.profil and not self.budget:
                 self.add_line("pass")
             else:
-                for sub in sub_insts:
+                for sub in inst.enfants():
                     self.translate_instruction(sub)
+            self.placer(inst.fin_bloc)
+            self.compter(inst.fin_bloc)
+            self.controle()
             self.indent_level -= 1
-
-        elif inst["type"] == "fin":
-            # lors de "fin", insérer cette ligne
-            self.add_line("program_continue = 0")
-
-        elif inst["type"] == "boucle":
-            sub_insts = inst.get("content", [])
-            if not sub_insts:
-                # si aucune sous-instruction, ne pas créer de boulce et écrire pas
-                self.add_line("# boucle vide")
-                self.add_line("pass")
-            else:
-                self.add_line("while program_continue:")
+            if self.budget:
+                # condition fausse : pas du 'si' et de ceux qui le précèdent
+                self.add_line("else:")
                 self.indent_level += 1
-                for sub in sub_insts:
-                    self.translate_instruction(sub)
+                self.lignes_budget(faux)
                 self.indent_level -= 1
 
-        elif inst["type"] == "endfile":
-            # si nécessaire, traiter la fin de fichier ici
-            pass
+        elif op == OP_FIN:
+            # sortie de la boucle englobante (arrêt hors boucle)
+            self.controle()
+            if inst.arg >= 0:
+                self.sortir_boucle(inst.programme.args[inst.arg])
+            self.add_line(f"return {self.cible(inst.arg + 1) if inst.arg >= 0 else -1}")
 
+        elif op == OP_DIESE:
+            self.controle()
+            self.add_line("return -1")
 
-    def generate_python_code(self, instructions):
+    def generate_python_code(self, instructions, carte=None):
         self.code = []
-        self.step_counter = 0
+        self.ecrire = self.code.append
+        self.suivre_carte(carte)
+        self.emit_python_code(instructions)
+        # retourner le code final sous forme de chaîne
+        return "\n".join(self.code)
+
+    def write_python_code(self, instructions, f, carte=None):
+        """
+        Écrit le code généré dans le fichier texte f au fur et à mesure du
+        parcours du Programme, sans garder les lignes en mémoire.
+        """
+        self.ecrire = lambda line: f.write(line + "\n")
+        self.suivre_carte(carte)
+        self.emit_python_code(instructions)
+
+    def suivre_carte(self, carte):
+        # carte (mtdv.carte.CarteSource) : chaque ligne y passe avant self.ecrire
+        self.carte = carte
+        if carte is not None:
+            self.ecrire = carte.suivre(self.ecrire)
+
+    def emit_python_code(self, instructions):
+        if self.local:
+            self.emit_local_code(instructions)
+            return
         self.indent_level = 0
         
         # entête: déclaration des variables globales
         self.add_line("import sys")
         self.add_line("")
+        # ruban non borné (pages allouées à la demande), recopié depuis mtdv/ruban.py
+        for l in source_ruban(self.ruban).splitlines():
+            self.add_line(l)
+        self.add_line("")
+        # fenêtre d'affichage du ruban ('I', 'P'), recopiée depuis mtdv/affichage.py
+        for l in source_affichage().splitlines():
+            self.add_line(l)
+        self.add_line("")
+        if self.budget:
+            for l in source_budget(self.pas_max, self.delai).splitlines():
+                self.add_line(l)
+            self.add_line("")
+        self.entete_profil(instructions)
         self.add_line("# Global variables")
-        self.add_line("tape = [0] * 1000")
+        self.add_line(f"tape = {self.ruban.__name__}()")
         self.add_line("head = 30")
         self.add_line("ARGC = 0")
         self.add_line("ARG0 = ''")
-        self.add_line("program_continue = 1")
-        self.add_line("STEP = 0  # 用于模拟程序执行步骤")
+        self.add_line("STEP = 0  # bloc courant de la machine à états (-1 => arrêt)")
         self.add_line("")
 
         # déf process_args
@@ -315,47 +326,49 @@ class MTdVTranslator:
         self.indent_level -= 1
         self.add_line("")
 
+        # -- un bloc de base par fonction, puis la table de dispatch --
+        self.chercher_blocs(instructions)
+        for debut in self.fonctions:
+            self.translate_bloc(instructions, debut)
+        self.placer(None)
+        self.add_line("BLOCS = [" + ", ".join(f"bloc_{k}" for k in range(len(self.fonctions))) + "]")
+        self.add_line("")
+
         # déf execute_program
         self.add_line("def execute_program():")
         self.indent_level += 1
-        self.add_line("global tape, head, program_continue, STEP")
+        self.add_line("global tape, head, STEP")
         self.add_line("")
 
         # -- initialisation des entrées (2 entrées) --
         self.add_line("# Initialisation", self.indent_level)
         # 1ère entrée
-        self.add_line("start1 = int(input('Veuillez entrer la position de début de la 1re plage (0-999): '))", self.indent_level)
+        self.add_line("start1 = int(input('Veuillez entrer la position de début de la 1re plage: '))", self.indent_level)
         self.add_line("length1 = int(input('Veuillez entrer la longueur de la 1re plage: '))", self.indent_level)
-        self.add_line("if 0 <= start1 < 1000:", self.indent_level)
-        self.add_line("    for i in range(length1):", self.indent_level)
-        self.add_line("        if start1 + i < 1000:", self.indent_level)
-        self.add_line("            tape[start1 + i] = 1", self.indent_level)
+        self.add_line("tape.remplir(start1, start1 + length1)", self.indent_level)
 
         # 2ème entrée
         self.add_line("", self.indent_level)
-        self.add_line("start2 = int(input('Veuillez entrer la position de début de la 2e plage (0-999): '))", self.indent_level)
+        self.add_line("start2 = int(input('Veuillez entrer la position de début de la 2e plage: '))", self.indent_level)
         self.add_line("length2 = int(input('Veuillez entrer la longueur de la 2e plage: '))", self.indent_level)
-        self.add_line("if 0 <= start2 < 1000:", self.indent_level)
-        self.add_line("    for i in range(length2):", self.indent_level)
-        self.add_line("        if start2 + i < 1000:", self.indent_level)
-        self.add_line("            tape[start2 + i] = 1", self.indent_level)
+        self.add_line("tape.remplir(start2, start2 + length2)", self.indent_level)
 
         # print l'état initial
         self.add_line("", self.indent_level)
         self.add_line("print('État initial :')", self.indent_level)
-        self.add_line("print(''.join(str(x) for x in tape[0:61]))", self.indent_level)
-        self.add_line("print(' ' * head + 'X')", self.indent_level)
+        self.add_line("afficher_ruban(tape, head)", self.indent_level)
         self.add_line("", self.indent_level)
 
-        # -- instructions, sans boucle ni récursivité --
-        self.translate_instructions_no_loop(instructions, self.indent_level)
+        # -- machine à états : un accès à BLOCS par bloc exécuté --
+        self.add_line(f"STEP = {self.cible(0)}", self.indent_level)
+        self.add_line("while STEP >= 0:", self.indent_level)
+        self.add_line("    STEP = BLOCS[STEP]()", self.indent_level)
 
         # -- print l'état final --
         self.add_line("", self.indent_level)
         self.add_line("# Imprimer l'état final", self.indent_level)
         self.add_line("print('État final :')", self.indent_level)
-        self.add_line("print(''.join(str(x) for x in tape[0:61]))", self.indent_level)
-        self.add_line("print(' ' * head + 'X')", self.indent_level)
+        self.add_line("afficher_ruban(tape, head)", self.indent_level)
         self.add_line("print('Programme terminé.')", self.indent_level)
         self.add_line("", self.indent_level)
 
@@ -365,123 +378,210 @@ class MTdVTranslator:
         self.add_line("if __name__ == '__main__':")
         self.indent_level += 1
         self.add_line("process_args()")
+        self.add_line("tamponner_sortie()")
         self.add_line("execute_program()")
 
-        # retourner le code final sous forme de chaîne
-        return "\n".join(self.code)
-
-    def translate_instructions_no_loop(self, instructions, indent_level):
-        """
-        Lire séquentiellement les instructions, chaque instruction est exécutée dans une branche "STEP == X", puis STEP = X+1.
-        
-        Si une "boucle" ou un "si(...)" nécessitant plusieurs exécutions est rencontré :
-          - Faire un "déroulement limité", dérouler N fois la boucle
-            ou émettre un avertissement/erreur disant que "les boucles infinies ne peuvent pas être réalisées sans boucle".
+    # =============== Mode --local : une seule fonction, variables locales ===============
+    # Dans le code ci-dessus, tape, head et STEP sont des globales du module (une recherche dans un dictionnaire à chaque accès).
+    # Ici tout le programme est dans execute_program : t, head, origine et limite
+    # sont des variables locales, le ruban est un bytearray à sentinelles
+    # (mtdv.ruban.elargir_sentinelles) lu et écrit sans test de bornes, chaque
+    # boucle est un 'while True:' et 'fin' un 'break'.
+    def marge_locale(self, prog):
         """
-        for inst in instructions:
-            self.add_line(f"# Translating {inst}", indent_level)
-
-            # noter le stepID actuel de l'instruction
-            current_step = self.step_counter
-            self.step_counter += 1
-            next_step = self.step_counter  # 下一个 step
-
-            # générer if STEP == current_step: ...
-            self.add_line(f"if STEP == {current_step}:", indent_level)
-            self.add_line("    # 指令开始", indent_level)
-            # traduire ici la logique spécifique de l'instruction
-            self.translate_single_instruction(inst, indent_level+1)
-            # après l'instruction, définir STEP au next_step (= "continuer")
-            self.add_line(f"STEP = {next_step}", indent_level+1)
-            self.add_line("", indent_level)
-
-    def translate_single_instruction(self, inst, level):
+        Nombre de cases à 0 autour du ruban à sentinelles : plus que le plus grand
+        déplacement de la tête entre deux vérifications, borné par la somme de tous
+        les déplacements du programme.
         """
-        Traduire une instruction individuelle en utilisant if/else/print/assignation, etc.
-        Ne pas générer de boucle/ni de récursivité.
-        """
-        t = inst.get("type", "")
-        if t == "instruction":
-            val = inst.get("value","")
-            if val == "I":
-                self.add_line("# init tape/head (example)", level)
-                # Décider si l'initialisation doit être répétée selon besoins
-            elif val == "P":
-                self.add_line("input('Appuyez sur Entrée pour continuer...')", level)
-            elif val == "G":
-                self.add_line("if head > 0:", level)
-                self.add_line("    head = head - 1", level)
-            elif val == "D":
-                self.add_line("if head < 999:", level)
-                self.add_line("    head = head + 1", level)
-            elif val == "0":
-                self.add_line("if 0 <= head < 1000:", level)
-                self.add_line("    tape[head] = 0", level)
-            elif val == "1":
-                self.add_line("if 0 <= head < 1000:", level)
-                self.add_line("    tape[head] = 1", level)
-
-        elif t == "si":
-            cond = inst.get("condition", 0)
-            # Utiliser if/else
-            # sub_insts est exécuté uniquement si cond est vrai
-            sub_insts = inst.get("content", [])
-            self.add_line(f"if tape[head] == {cond}:", level)
-            if sub_insts:
-                for s in sub_insts:
-                    self.translate_single_instruction(s, level+1)
+        ops, args = prog.ops, prog.args
+        total = 0
+        for i, op in enumerate(ops):
+            if op == OP_G or op == OP_D:
+                total += 1
+            elif op == OP_DEPLACE:
+                total += abs(args[i])
+        return total + 1
+
+    def verification_locale(self):
+        self.add_line(f"if head < {self.marge} or head >= limite:")
+        self.add_line(f"    t, origine, head, limite = elargir_sentinelles(t, origine, head, {self.marge})")
+
+    def emit_local_code(self, instructions):
+        self.marge = self.marge_locale(instructions)
+        self.compteur = CompteurPas(local=True)
+        self.indent_level = 0
+        self.add_line("import sys")
+        self.add_line("")
+        # ruban à sentinelles, recopié depuis mtdv/ruban.py
+        for l in source_sentinelles().splitlines():
+            self.add_line(l)
+        self.add_line("")
+        for l in source_affichage(sentinelles=True).splitlines():
+            self.add_line(l)
+        self.add_line("")
+        if self.budget:
+            # budget à compteur local (pas, seuil), vérifié aux points de contrôle
+            for l in source_budget(self.pas_max, self.delai, local=True).splitlines():
+                self.add_line(l)
+            self.add_line("")
+        self.entete_profil(instructions)
+        self.add_line("")
+        self.add_line("def execute_program():")
+        self.indent_level += 1
+        self.add_line(f"t = bytearray({2 * self.marge + 1024})")
+        self.add_line(f"origine = {self.marge + 512}")
+        self.add_line("head = origine + 30")
+        self.add_line(f"limite = len(t) - {self.marge}")
+        if self.budget:
+            self.add_line("pas = 0")
+            self.add_line("seuil = prochain_seuil(0)")
+        self.add_line("")
+        self.add_line("# Initialisation")
+        for k, nom in ((1, '1re'), (2, '2e')):
+            self.add_line(f"start{k} = int(input('Veuillez entrer la position de début de la {nom} plage: '))")
+            self.add_line(f"length{k} = int(input('Veuillez entrer la longueur de la {nom} plage: '))")
+            self.add_line(f"t, origine, head, limite = remplir_sentinelles(t, origine, head, {self.marge}, "
+                          f"start{k}, start{k} + length{k})")
+            self.add_line("")
+        self.add_line("print('État initial :')")
+        self.add_line("afficher_sentinelles(t, origine, head)")
+        self.add_line("")
+        self.add_line("# Programme : 'fin' hors boucle et '#' sortent de ce while")
+        self.add_line("while True:")
+        self.indent_level += 1
+        for inst in instructions.racine():
+            self.translate_local(inst)
+        self.placer(None)
+        self.add_line("break")
+        self.indent_level -= 1
+        self.add_line("")
+        self.add_line("# Imprimer l'état final")
+        self.add_line("print('État final :')")
+        self.add_line("afficher_sentinelles(t, origine, head)")
+        self.add_line("print('Programme terminé.')")
+        self.add_line("return t, origine, head")
+        self.indent_level -= 1
+        self.add_line("")
+        self.add_line("")
+        self.add_line("if __name__ == '__main__':")
+        self.add_line("    tamponner_sortie()")
+        self.add_line("    execute_program()")
+
+    def translate_local(self, inst):
+        op = inst.op
+        self.placer(inst.index)
+        self.compter(inst.index)
+        if op <= OP_1 or op == OP_DEPLACE:
+            self.compteur.instruction(op, inst.arg)
+        if op == OP_I or op == OP_P:
+            self.add_line("afficher_sentinelles(t, origine, head)")
+            if op == OP_P:
+                self.add_line("input('Appuyez sur Entrée pour continuer...')")
+        elif op == OP_G:
+            self.add_line("head -= 1")
+        elif op == OP_D:
+            self.add_line("head += 1")
+        elif op == OP_DEPLACE:
+            self.add_line(f"head {'+' if inst.arg > 0 else '-'}= {abs(inst.arg)}")
+        elif op == OP_0 or op == OP_1:
+            self.add_line(f"t[head] = {inst.value}")
+        elif op == OP_CHERCHE_D or op == OP_CHERCHE_G:
+            # les cases t[0] et t[-1] restent à 0 : seule la recherche d'un 1 peut échouer
+            val, avance = inst.arg & 1, inst.arg >> 1
+            if op == OP_CHERCHE_D:
+                position = f"t.find({val}, head + {avance})" if avance else f"t.find({val}, head)"
             else:
-                self.add_line("    pass", level)
-
-        elif t == "fin":
-            # pour fin -> arrêter l'exécution
-            self.add_line("program_continue = 0", level)
-            self.add_line("# 你也可以选择这里就把 STEP 设置为一个大值，以防继续执行", level)
-
-        elif t == "boucle":
-            sub_insts = inst.get("content", [])
-            # Normalement, on utilisera while program_continue: ...
-            # Mais ici, pas de boucle => dérouler ou émettre un avertissement
-            # Par exemple, dérouler une fois + avertissement
-            self.add_line("# [WARNING] boucle => 无循环模式只能执行一次", level)
-            for s in sub_insts:
-                self.translate_single_instruction(s, level)
-
-        elif t == "endfile":
-            # pas d'opération
-            self.add_line("# endfile => do nothing", level)
-        else:
-            self.add_line(f"# Unrecognized instruction: {t}", level)
+                position = f"t.rfind({val}, 0, head{' - ' + str(avance) if avance else ''} + 1)"
+            if self.budget:
+                # pas et arrêt de la boucle d'origine (recherche_budget, mtdv.budget)
+                self.lignes_budget(self.compteur.recherche(position, inst.arg, 1 if op == OP_CHERCHE_D else -1))
+            else:
+                self.add_line(f"head = {position}")
+                if val:
+                    self.add_line("if head < 0:")
+                    self.add_line(f"    sys.exit('boucle sans fin : aucune case à {val} sur le ruban')")
+            self.verification_locale()
+        elif op == OP_SI0 or op == OP_SI1:
+            self.add_line("if t[head]:" if op == OP_SI1 else "if not t[head]:")
+            self.indent_level += 1
+            faux = self.compteur.si()
+            if inst.vide and not self.profil and not self.budget:
+                self.add_line("pass")
+            for sub in inst.enfants():
+                self.translate_local(sub)
+            self.placer(inst.fin_bloc)
+            self.compter(inst.fin_bloc)
+            self.controle()
+            self.indent_level -= 1
+            if self.budget:
+                # condition fausse : pas du 'si' et de ceux qui le précèdent
+                self.add_line("else:")
+                self.indent_level += 1
+                self.lignes_budget(faux)
+                self.indent_level -= 1
+        elif op == OP_BOUCLE:
+            # un tour de boucle vide ne fait rien : 'boucle }' ne s'arrête jamais
+            self.controle()
+            self.entrer_boucle(inst.index)
+            self.add_line("while True:")
+            self.indent_level += 1
+            self.verification_locale()
+            for sub in inst.enfants():
+                self.translate_local(sub)
+            self.placer(inst.fin_bloc)
+            self.compter(inst.fin_bloc)
+            self.controle()
+            self.indent_level -= 1
+            self.sortir_boucle(inst.index)
+        elif op == OP_FIN or op == OP_DIESE:
+            self.controle()
+            self.add_line("break")
 
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python traducteur_2.py input.ts output.py")
+    # option --bits : ruban d'un bit par case dans le code généré
+    # option -O : optimisations de mtdv.optim avant la génération
+    # options --pas-max N / --delai S : budget d'exécution du code généré
+    # option --local : une seule fonction à variables locales, ruban à sentinelles
+    # option --profil : le code généré compte les exécutions par instruction et le
+    # temps par boucle, écrits dans output.profil.json (python3 -m mtdv profil)
+    # option --marqueurs : commentaire '# ts:ligne:colonne' sur chaque ligne traduite
+    # (la carte de correspondance output.py.map est toujours écrite, voir mtdv.carte)
+    ruban_bits = '--bits' in sys.argv[1:]
+    optim = '-O' in sys.argv[1:]
+    local = '--local' in sys.argv[1:]
+    profil = '--profil' in sys.argv[1:]
+    marqueurs = '--marqueurs' in sys.argv[1:]
+    argv = [a for a in sys.argv[1:] if a not in ('--bits', '-O', '--local', '--profil', '--marqueurs')]
+    pas_max = delai = None
+    while '--pas-max' in argv[:-1] or '--delai' in argv[:-1]:
+        k = argv.index('--pas-max') if '--pas-max' in argv[:-1] else argv.index('--delai')
+        if argv[k] == '--pas-max':
+            pas_max = int(argv[k + 1])
+        else:
+            delai = float(argv[k + 1])
+        del argv[k:k + 2]
+    if len(argv) != 2:
+        print("Usage: python traducteur_1.py input.ts output.py [--bits] [-O] [--pas-max N] [--delai S] [--local] [--profil] [--marqueurs]")
+        sys.exit(1)
+    if local and ruban_bits:
+        print("ERREUR : --local utilise son propre ruban (bytearray à sentinelles) : --bits est exclu.")
         sys.exit(1)
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+    input_file = argv[0]
+    output_file = argv[1]
     
-    translator = MTdVTranslator()
+    chemin_profil = os.path.splitext(output_file)[0] + '.profil.json' if profil else None
+    translator = MTdVTranslator(ruban_bits, optim, pas_max, delai, local, chemin_profil)
     
-    # lire le fichier d'entrée (avec plusieurs encodages)
-    encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-    for enc in encodings:
-        try:
-            with open(input_file, 'r', encoding=enc) as f:
-                lines = f.readlines()
-            break
-        except UnicodeDecodeError:
-            pass
-
-    # appeler le nouveau parser
-    instructions = translator.parse_ts_lines(lines)
-    # générer code python
-    code = translator.generate_python_code(instructions)
+    # lire le fichier d'entrée ligne par ligne (avec plusieurs encodages)
+    instructions = translator.parse_ts_lines(lignes_fichier(input_file))
     
-    # écrire dans le fichier de sortie
-    with open(output_file, 'w', encoding='utf-8') as f_out:
-        f_out.write(code)
+    # générer le code python directement dans le fichier de sortie (tamponné)
+    carte = CarteSource(instructions, marqueurs)
+    with open(output_file, 'w', encoding='utf-8', buffering=1 << 16) as f_out:
+        translator.write_python_code(instructions, f_out, carte)
+    carte.ecrire_fichier(input_file, output_file)
 
 
 if __name__ == '__main__':
@@ -1,249 +1,310 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import re
+import os
 import sys
 
+from mtdv.affichage import source_affichage
+from mtdv.ir import (OP_0, OP_1, OP_BOUCLE, OP_CHERCHE_D, OP_CHERCHE_G, OP_D, OP_DEPLACE, OP_DIESE,
+                     OP_FERME, OP_FIN, OP_G, OP_I, OP_P, OP_SI0, OP_SI1, Programme, contient_boucle,
+                     debuts_blocs, programme_depuis_lignes)
+from mtdv.budget import CompteurPas, source_budget
+from mtdv.carte import CarteSource
+from mtdv.lexeur import lignes_fichier
+from mtdv.optim import optimiser
+from mtdv.profil import source_profil
+from mtdv.ruban import classe_ruban, source_ruban
+
 class MTdVTranslator:
-    def __init__(self):
+    def __init__(self, ruban_bits=False, optimiser=False, pas_max=None, delai=None, profil=None):
         # État interne actuel du traducteur
+        # ruban_bits : ruban d'un bit par case (RubanBits) dans le code généré
+        # optimiser : appliquer mtdv.optim (boucles de recherche => tape.chercher)
+        # pas_max, delai : budget d'exécution vérifié aux points de contrôle (mtdv.budget)
+        # profil : fichier JSON du profil d'exécution (mtdv.profil) ; None => aucun comptage
+        self.ruban = classe_ruban(ruban_bits)
+        self.optimiser = optimiser
+        self.budget = pas_max is not None or delai is not None
+        self.pas_max = pas_max
+        self.delai = delai
+        # Pas en attente depuis le dernier point de contrôle (mtdv.budget.CompteurPas)
+        self.compteur = CompteurPas()
+        self.profil = profil
         self.indent_level = 0
-        self.initialized = False
         self.boucle_count = 0
-        self.boucle_stack = []
+        self.blocs = {}
         self.code = []
+        # Reçoit chaque ligne générée : self.code.append, ou l'écriture dans
+        # le fichier de sortie (write_python_code)
+        self.ecrire = self.code.append
+        # Carte de correspondance vers le .TS (mtdv.carte.CarteSource) ou None
+        self.carte = None
 
     def indent(self):
         return "    " * self.indent_level
 
     def add_line(self, line):
-        self.code.append(self.indent() + line)
-
-    # =============== 1) Point d'entrée principal : analyse .ts => arbre d'instructions ===============
+        self.ecrire(self.indent() + line)
+
+    def placer(self, pc=None):
+        # Position .TS des lignes suivantes (carte de correspondance)
+        if self.carte is not None:
+            self.carte.placer(pc)
+
+    def compter(self, pc):
+        # Exécutions de l'élément pc (profil)
+        if self.profil:
+            self.add_line(f"COMPTEURS[{pc}] += 1")
+
+    def entrer_boucle(self, pc):
+        if self.profil:
+            self.add_line(f"ENTREE[{pc}] = perf_counter()")
+
+    def sortir_boucle(self, pc):
+        if self.profil:
+            self.add_line(f"TEMPS[{pc}] += perf_counter() - ENTREE[{pc}]")
+            self.add_line(f"ENTREE[{pc}] = 0.0")
+
+    def lignes_budget(self, lignes):
+        # Lignes du compteur de pas (mtdv.budget.CompteurPas), avec le budget seulement
+        if self.budget:
+            for l in lignes:
+                self.add_line(l)
+
+    def controle(self):
+        # Point de contrôle du budget : 'boucle', '}', 'fin', '#'
+        self.lignes_budget(self.compteur.controle())
+
+    def entete_profil(self, prog):
+        # Compteurs et écriture du profil à la sortie, recopiés depuis mtdv/profil.py
+        if self.profil:
+            for l in source_profil(len(prog), self.profil, self.optimiser).splitlines():
+                self.add_line(l)
+            self.add_line("")
+
+    # =============== 1) Point d'entrée principal : analyse .ts => Programme compact ===============
     def parse_ts_lines(self, lines):
         """
-        À partir des lignes du fichier .ts, d'abord tokeniser + analyse P0 => (tokID, tok, level), puis convertir en arbre d'instructions
-        """
-        parse_result = self.parse_ts_lines_new(lines)
-        instructions = self._convert_tokens_to_instructions(parse_result)
-        return instructions
-
-    # =============== 2) Tokenisation + analyse descendante simple ===============
-    def parse_ts_lines_new(self, lines):
-        """
-        Supprimer d'abord les commentaires (lignes commençant par '%') et les lignes vides, puis correspondre avec des tokens à l'aide de regex.
+        À partir des lignes du fichier .ts : tokeniser en un seul passage, puis construire la
+        représentation compacte (mtdv.ir). '#' ou la fin du fichier terminent le programme.
         """
-        terminals_re = {
-            '#'      : r'^[ \n]*#[ \n]*',
-            '}'      : r'^[ \n]*}[ \n]*',
-            'I'      : r'^[ \n]*I[ \n]*',
-            'P'      : r'^[ \n]*P[ \n]*',
-            'G'      : r'^[ \n]*G[ \n]*',
-            'D'      : r'^[ \n]*D[ \n]*',
-            '0'      : r'^[ \n]*0[ \n]*',
-            '1'      : r'^[ \n]*1[ \n]*',
-            'fin'    : r'^[ \n]*fin[ \n]*',
-            'boucle' : r'^[ \n]*boucle[ \n]*',
-            'si(0)'  : r'^[ \n]*si[ \n]*\(\s*0\s*\)\s*',
-            'si(1)'  : r'^[ \n]*si[ \n]*\(\s*1\s*\)\s*'
-        }
-        terminals_automata = {x: re.compile(terminals_re[x]) for x in terminals_re}
-
-        txt = "\n".join(lines)
-        tokens = self._tokenize_string(txt, terminals_automata)
-
-        parse_result = []
-        success = self._parse_tokens_P0(tokens, parse_result)
-        if not success:
+        programme = programme_depuis_lignes(lines, diese_obligatoire=False)
+        if programme is None:
             print("ERREUR : échec de l'analyse ou '}' non apparié.")
-            return []
-        return parse_result
-
-    def _tokenize_string(self, txt, terms_automata):
-        """
-        Correspondre aux tokens de manière séquentielle ; si une ligne ne peut pas être appariée, elle est ignorée
-        """
-        tokens = []
-        still_good = True
-        while still_good and len(txt)>0:
-            # Supprimer les commentaires commençant par '%'
-            if txt.lstrip().startswith('%'):
-                newl = txt.find('\n')
-                if newl!=-1:
-                    txt=txt[newl+1:]
-                    continue
-                else:
-                    break
-            # Ignorer les lignes vides
-            if txt.strip()=='':
-                newl = txt.find('\n')
-                if newl!=-1:
-                    txt=txt[newl+1:]
-                    continue
-                else:
-                    break
+            return Programme()
+        if self.optimiser:
+            programme = optimiser(programme)
+        return programme
 
-            matched_something=False
-            for tk_name, pattern in terms_automata.items():
-                m = pattern.match(txt)
-                if m:
-                    tokens.append(tk_name)
-                    txt=txt[m.end():]
-                    matched_something=True
-                    break
-            if not matched_something:
-                # Passer à la ligne suivante
-                newl = txt.find('\n')
-                if newl!=-1:
-                    txt=txt[newl+1:]
-                else:
-                    still_good=False
-        return tokens
-
-    def _parse_tokens_P0(self, tokens, parse_result, parse_state='P0', K=0, tokid=0):
+    # =============== 4) Convertir la structure d'instructions => Code Python (interdiction des boucles for => utiliser while ou récursivité) ===============
+    # Trampoline : le programme est découpé en blocs, un par fonction. Chaque bloc
+    # s'exécute sans boucle ni appel et retourne le bloc suivant (None => arrêt) ;
+    # une seule boucle while les enchaîne, la pile ne grandit donc jamais.
+    def chercher_blocs(self, prog):
         """
-        Analyse descendante simple : boucle, si(...) => K+1 ; '}' => K-1 ; '#' => stop ; autres instructions => K inchangé
+        Débuts de blocs (mtdv.ir.debuts_blocs) => nom de la fonction : début du
+        programme, corps de chaque boucle, sortie de boucle (cible d'un 'fin'),
+        suite d'un 'si' qui contient une boucle. Une cible au-delà du programme
+        vaut None.
         """
-        if not tokens:
-            return True
-        tk = tokens[0]
-        tokid+=1
-        parse_result.append((tokid, tk, K))
-
-        if tk in ['I','P','G','D','0','1','fin']:
-            return self._parse_tokens_P0(tokens[1:], parse_result, parse_state, K, tokid)
-        elif tk in ['boucle','si(0)','si(1)']:
-            return self._parse_tokens_P0(tokens[1:], parse_result, parse_state, K+1, tokid)
-        elif tk=='}':
-            if K<1:
-                print("ERREUR : '}' non apparié => K négatif.")
-                return False
-            else:
-                return self._parse_tokens_P0(tokens[1:], parse_result, parse_state, K-1, tokid)
-        elif tk=='#':
-            # Fin => terminé
-            return True
-        else:
-            return self._parse_tokens_P0(tokens[1:], parse_result, parse_state, K, tokid)
-
-    # =============== 3) Convertir (tokID, tok, K) => arbre d'instructions ===============
-    def _convert_tokens_to_instructions(self, parse_result):
-        root = {"type":"root","content":[]}
-        level_map = {0: root}
-        for (tid, tk, k) in parse_result:
-            if k not in level_map:
-                level_map[k] = {"type":"unknown","content":[]}
-            current_block=level_map[k]
-
-            if tk in ['I','P','G','D','0','1']:
-                current_block["content"].append({"type":"instruction","value":tk})
-            elif tk=='fin':
-                current_block["content"].append({"type":"fin"})
-            elif tk=='boucle':
-                newb = {"type":"boucle","content":[]}
-                current_block["content"].append(newb)
-                level_map[k+1]=newb
-            elif tk=='si(0)':
-                newsi={"type":"si","condition":0,"content":[]}
-                current_block["content"].append(newsi)
-                level_map[k+1]=newsi
-            elif tk=='si(1)':
-                newsi={"type":"si","condition":1,"content":[]}
-                current_block["content"].append(newsi)
-                level_map[k+1]=newsi
-            elif tk=='}':
-                level_map.pop(k,None)
-            elif tk=='#':
-                current_block["content"].append({"type":"endfile"})
+        ops = prog.ops
+        n = len(ops)
+        self.blocs = {}
+        suites = 0
+        for pc in debuts_blocs(prog):
+            if pc>=n:
+                self.blocs[pc] = "None"
+            elif pc==0:
+                self.blocs[pc] = "debut"
+            elif ops[pc-1]==OP_BOUCLE:
+                self.blocs[pc] = f"boucle_{self.boucle_count}"
+                self.boucle_count+=1
             else:
-                # Inconnu => ignorer
-                pass
-        return root["content"]
+                self.blocs[pc] = f"suite_{suites}"
+                suites+=1
 
-    # =============== 4) Convertir la structure d'instructions => Code Python (interdiction des boucles for => utiliser while ou récursivité) ===============
-    def translate_instruction(self, inst):
-        t = inst["type"]
-        if t=="instruction":
-            val = inst.get("value","")
-            if val=="I" and not self.initialized:
-                self.add_line("# Initialiser la bande & la tête (une seule fois)")
-                self.add_line("tape = [0]*1000")
-                self.add_line("head = 30")
-                self.initialized=True
-            elif val=="P":
-                self.add_line("print('Pause => tape, head:')") 
-                self.add_line("print('Tape=', tape)")
-                self.add_line("print('Head=', head)") 
-                self.add_line("input('Appuyez sur Entrée...')")
-
-            elif val=="G":
-                self.add_line("if head>0:")
-                self.indent_level+=1
-                self.add_line("head = head-1")
-                self.indent_level-=1
+    def cible(self, pc):
+        return self.blocs.get(pc, "None")
 
-            elif val=="D":
-                self.add_line("if head<999:")
+    def translate_bloc(self, prog, debut):
+        """
+        Fonction du bloc commençant en debut : instructions en ligne jusqu'au
+        prochain saut (entrée ou retour de boucle, 'fin', '#', début d'un
+        autre bloc), qui devient 'return <bloc suivant>'.
+        """
+        ops, args = prog.ops, prog.args
+        n = len(ops)
+        self.placer(debut)
+        self.add_line(f"def {self.blocs[debut]}():")
+        self.indent_level+=1
+        self.add_line("global head, tape" + (", PAS" if self.budget else ""))
+        self.compteur = CompteurPas()
+        pc = debut
+        while True:
+            if pc<n:
+                self.placer(pc)
+            if pc>=n or ops[pc]==OP_DIESE:
+                if pc<n:
+                    self.compter(pc)
+                    self.controle()
+                self.add_line("return None")
+                break
+            op = ops[pc]
+            if pc!=debut and pc in self.blocs:
+                self.lignes_budget(self.compteur.vider())
+                self.add_line(f"return {self.blocs[pc]}")
+                break
+            if op==OP_BOUCLE:
+                # Entrer dans la boucle
+                self.compter(pc)
+                self.controle()
+                self.entrer_boucle(pc)
+                self.add_line(f"return {self.blocs[pc+1]}")
+                break
+            if op==OP_FERME:
+                j = args[pc]
+                self.compter(pc)
+                self.controle()
+                if ops[j]==OP_BOUCLE:
+                    # Retour de boucle : recommencer le corps
+                    self.add_line(f"return {self.blocs[j+1]}")
+                    break
+                # Fin d'un 'si' contenant une boucle, déplié ci-dessous
+                pc+=1
+            elif (op==OP_SI0 or op==OP_SI1) and contient_boucle(prog, pc):
+                # Condition fausse => sauter après le '}', sinon continuer dans le corps
+                self.compter(pc)
+                self.add_line(f"if tape[head]!={prog.noeud(pc).condition}:")
                 self.indent_level+=1
-                self.add_line("head = head+1")
+                self.lignes_budget(self.compteur.si())
+                self.add_line(f"return {self.cible(args[pc]+1)}")
                 self.indent_level-=1
+                pc+=1
+            else:
+                self.translate_instruction(prog.noeud(pc))
+                pc = args[pc]+1 if (op==OP_SI0 or op==OP_SI1) else pc+1
+        self.indent_level-=1
+        self.add_line("")
 
-            elif val in ["0","1"]:
-                self.add_line("if head>=0 and head<1000:")
+    def translate_instruction(self, inst):
+        op = inst.op
+        self.placer(inst.index)
+        self.compter(inst.index)
+        if op<=OP_1 or op==OP_DEPLACE:
+            # Pas en attente jusqu'au prochain point de contrôle
+            self.compteur.instruction(op, inst.arg)
+        if op==OP_I:
+            # Afficher le ruban (le ruban saisi au départ n'est pas réinitialisé)
+            self.add_line("afficher_ruban(tape, head)")
+        elif op==OP_P:
+            # Fenêtre d'affichage (mtdv.affichage) plutôt que tout le ruban
+            self.add_line("print('Pause => tape, head:')")
+            self.add_line("afficher_ruban(tape, head)")
+            self.add_line("print('Head=', head)")
+            self.add_line("input('Appuyez sur Entrée...')")
+
+        elif op==OP_G:
+            self.add_line("head = head-1")
+
+        elif op==OP_D:
+            self.add_line("head = head+1")
+
+        elif op==OP_DEPLACE:
+            self.add_line(f"head = head{inst.arg:+d}")
+
+        elif op==OP_0 or op==OP_1:
+            self.add_line(f"tape[head] = {inst.value}")
+
+        elif op==OP_CHERCHE_D or op==OP_CHERCHE_G:
+            # Boucle de recherche reconnue par mtdv.optim : un seul appel, sans récursion
+            sens = 1 if op==OP_CHERCHE_D else -1
+            val, avance = inst.arg & 1, inst.arg >> 1
+            position = f"tape.chercher(head{'+' if sens>0 else '-'}{avance}, {val}, {sens})"
+            if self.budget:
+                # Pas et arrêt de la boucle d'origine (recherche_budget, mtdv.budget)
+                self.lignes_budget(self.compteur.recherche(position, inst.arg, sens))
+            else:
+                self.add_line(f"head = {position}")
+                self.add_line("if head is None:")
                 self.indent_level+=1
-                self.add_line(f"tape[head] = {val}")
+                self.add_line(f"sys.exit('boucle sans fin : aucune case à {val} sur le ruban')")
                 self.indent_level-=1
 
-            elif val=="fin":
-                self.add_line("program_continue = 0")
-
-        elif t=="si":
-            cond = inst.get("condition",0)
-            sub_insts = inst.get("content",[])
-            # Générer if head>=0 and head<1000 and tape[head]==cond:
-            self.add_line(f"if head>=0 and head<1000 and tape[head]=={cond}:")
+        elif op==OP_SI0 or op==OP_SI1:
+            cond = inst.condition
+            self.add_line(f"if tape[head]=={cond}:")
             self.indent_level+=1
-            if not sub_insts:
+            faux = self.compteur.si()
+            if inst.vide and not self.profil and not self.budget:
                 self.add_line("pass  # Pas de sous-instructions")
             else:
-                for s in sub_insts:
+                for s in inst.enfants():
                     self.translate_instruction(s)
+            self.placer(inst.fin_bloc)
+            self.compter(inst.fin_bloc)
+            self.controle()
             self.indent_level-=1
-
-        elif t=="boucle":
-            sub_insts = inst.get("content", [])
-            if not sub_insts:
-                self.add_line("# boucle vide => pass")
-                self.add_line("pass")
-            else:
-                func_name = f"boucle_{self.boucle_count}"
-                self.boucle_count+=1
-                self.add_line(f"def {func_name}():")
+            if self.budget:
+                # Condition fausse : pas du 'si' et de ceux qui le précèdent
+                self.add_line("else:")
                 self.indent_level+=1
-                self.add_line("global program_continue, head, tape")
-                # Traduire les sous-instructions
-                for s in sub_insts:
-                    self.translate_instruction(s)
-                # Répéter récursivement à la fin de la fonction
-                self.add_line("if program_continue!=0:")
-                self.indent_level+=1
-                self.add_line(f"{func_name}()")
+                self.lignes_budget(faux)
                 self.indent_level-=1
-                self.indent_level-=1
-                # Appel immédiat
-                self.add_line(f"{func_name}()")
 
-        elif t=="endfile":
-            pass
+        elif op==OP_FIN:
+            # Sortie de la boucle englobante (arrêt hors boucle)
+            self.controle()
+            j = inst.arg
+            if j>=0:
+                self.sortir_boucle(inst.programme.args[j])
+            self.add_line(f"return {self.cible(j+1) if j>=0 else 'None'}")
+
+        elif op==OP_DIESE:
+            self.controle()
+            self.add_line("return None")
+
+    def generate_python_code(self, instructions, carte=None):
+        self.code = []
+        self.ecrire = self.code.append
+        self.suivre_carte(carte)
+        self.emit_python_code(instructions)
+        return "\n".join(self.code)
+
+    def write_python_code(self, instructions, f, carte=None):
+        """
+        Écrit le code généré dans le fichier texte f au fur et à mesure du
+        parcours du Programme, sans garder les lignes en mémoire.
+        """
+        self.ecrire = lambda line: f.write(line + "\n")
+        self.suivre_carte(carte)
+        self.emit_python_code(instructions)
+
+    def suivre_carte(self, carte):
+        # Carte (mtdv.carte.CarteSource) : chaque ligne y passe avant self.ecrire
+        self.carte = carte
+        if carte is not None:
+            self.ecrire = carte.suivre(self.ecrire)
 
-    def generate_python_code(self, instructions):
+    def emit_python_code(self, instructions):
         # En-tête
         self.add_line("import sys")
         self.add_line("")
-        self.add_line("# Définir les variables globales (entiers + liste unique utilisable) :")
-        self.add_line("tape = [0]*1000")
+        # Ruban non borné (pages allouées à la demande), recopié depuis mtdv/ruban.py
+        for l in source_ruban(self.ruban).splitlines():
+            self.add_line(l)
+        self.add_line("")
+        # Fenêtre d'affichage du ruban ('I', 'P'), recopiée depuis mtdv/affichage.py
+        for l in source_affichage().splitlines():
+            self.add_line(l)
+        self.add_line("")
+        if self.budget:
+            for l in source_budget(self.pas_max, self.delai).splitlines():
+                self.add_line(l)
+            self.add_line("")
+        self.entete_profil(instructions)
+        self.add_line("# Définir les variables globales (entiers + ruban paginé) :")
+        self.add_line(f"tape = {self.ruban.__name__}()")
         self.add_line("head = 30")
-        self.add_line("program_continue = 1")
         self.add_line("ARGC = 0")
         self.add_line("ARG0 = ''")
         self.add_line("")
@@ -258,91 +319,92 @@ class MTdVTranslator:
 
         self.add_line("def execute_program():")
         self.indent_level+=1
-        self.add_line("global tape, head, program_continue")
-        self.add_line("# Pas de boucle for => utiliser une fonction récursive fill_tape")
+        self.add_line("global tape, head")
+        self.add_line("# Pas de boucle for => remplissage par blocs (tape.remplir), sans récursion")
 
         # Définir fill_tape
         self.add_line("def fill_tape(pos, remain):")
         self.indent_level+=1
-        self.add_line("if remain<=0:")
-        self.indent_level+=1
-        self.add_line("return")
+        self.add_line("tape.remplir(pos, pos+remain)")
         self.indent_level-=1
-        self.add_line("if pos<1000:")
-        self.indent_level+=1
-        self.add_line("tape[pos] = 1")
-        self.add_line("fill_tape(pos+1, remain-1)")
-        self.indent_level-=2
 
         # Entrée utilisateur
-        self.add_line("start1 = int(input('Début 1re plage(0-999)? '))")
+        self.add_line("start1 = int(input('Début 1re plage? '))")
         self.add_line("length1= int(input('Longueur 1re plage? '))")
-        self.add_line("if start1>=0 and start1<1000:")
-        self.indent_level+=1
         self.add_line("fill_tape(start1, length1)")
-        self.indent_level-=1
         self.add_line("")
-        self.add_line("start2 = int(input('Début 2e plage(0-999)? '))")
+        self.add_line("start2 = int(input('Début 2e plage? '))")
         self.add_line("length2= int(input('Longueur 2e plage? '))")
-        self.add_line("if start2>=0 and start2<1000:")
-        self.indent_level+=1
         self.add_line("fill_tape(start2, length2)")
-        self.indent_level-=1
         self.add_line("")
 
         self.add_line("print('État initial:')")
-        self.add_line("print(''.join(str(x) for x in tape[0:61]))")
-        self.add_line("print(' ' * head + 'X')")
+        self.add_line("afficher_ruban(tape, head)")
         self.add_line("")
 
-        # Parcourir les instructions
-        for inst in instructions:
-            if inst.get("type")=="endfile":
-                break
-            self.translate_instruction(inst)
-
+        # Un bloc par fonction, puis le trampoline
+        self.chercher_blocs(instructions)
+        for debut in sorted(self.blocs):
+            if debut<len(instructions):
+                self.translate_bloc(instructions, debut)
+        self.placer(None)
+        self.add_line("# Trampoline : chaque bloc retourne le suivant, None => arrêt")
+        self.add_line(f"bloc = {self.blocs[0]}")
+        self.add_line("while bloc is not None:")
+        self.indent_level+=1
+        self.add_line("bloc = bloc()")
+        self.indent_level-=1
         self.add_line("")
         self.add_line("print('État final:')")
-        self.add_line("print(''.join(str(x) for x in tape[0:61]))")
-        self.add_line("print(' ' * head + 'X')")
+        self.add_line("afficher_ruban(tape, head)")
         self.add_line("print('Programme terminé.')")
         self.indent_level=0
         self.add_line("")
         self.add_line("if __name__=='__main__':")
         self.indent_level+=1
         self.add_line("process_args()")
+        self.add_line("tamponner_sortie()")
         self.add_line("execute_program()")
         self.indent_level=0
 
-        return "\n".join(self.code)
-
 
 def main():
-    if len(sys.argv)!=3:
-        print("Utilisation : python traducteur_2.py input.ts output.py")
+    # option --bits : ruban d'un bit par case dans le code généré
+    # option -O : optimisations de mtdv.optim avant la génération
+    # options --pas-max N / --delai S : budget d'exécution du code généré
+    # option --profil : le code généré compte les exécutions par instruction et le
+    # temps par boucle, écrits dans output.profil.json (python3 -m mtdv profil)
+    # option --marqueurs : commentaire '# ts:ligne:colonne' sur chaque ligne traduite
+    # (la carte de correspondance output.py.map est toujours écrite, voir mtdv.carte)
+    ruban_bits='--bits' in sys.argv[1:]
+    optim='-O' in sys.argv[1:]
+    marqueurs='--marqueurs' in sys.argv[1:]
+    profil='--profil' in sys.argv[1:]
+    argv=[a for a in sys.argv[1:] if a not in ('--bits','-O','--profil','--marqueurs')]
+    pas_max=delai=None
+    while '--pas-max' in argv[:-1] or '--delai' in argv[:-1]:
+        k=argv.index('--pas-max') if '--pas-max' in argv[:-1] else argv.index('--delai')
+        if argv[k]=='--pas-max':
+            pas_max=int(argv[k+1])
+        else:
+            delai=float(argv[k+1])
+        del argv[k:k+2]
+    if len(argv)!=2:
+        print("Utilisation : python traducteur_2.py input.ts output.py [--bits] [-O] [--pas-max N] [--delai S] [--profil] [--marqueurs]")
         sys.exit(1)
 
-    input_ts=sys.argv[1]
-    output_py=sys.argv[2]
-
-    translator=MTdVTranslator()
-    # Lire input.ts (essayer divers encodages)
-    encodings = ['utf-8','latin-1','cp1252','iso-8859-1']
-    for enc in encodings:
-        try:
-            with open(input_ts,'r',encoding=enc) as f:
-                lines=f.readlines()
-            break
-        except UnicodeDecodeError:
-            pass
-
-    # Analyser => arbre d'instructions
-    instructions=translator.parse_ts_lines(lines)
-    # Générer le code Python
-    code=translator.generate_python_code(instructions)
-
-    with open(output_py,'w',encoding='utf-8') as fw:
-        fw.write(code)
+    input_ts=argv[0]
+    output_py=argv[1]
+
+    chemin_profil=os.path.splitext(output_py)[0]+'.profil.json' if profil else None
+    translator=MTdVTranslator(ruban_bits, optim, pas_max, delai, chemin_profil)
+    # Lire input.ts ligne par ligne (essayer divers encodages) => Programme compact
+    instructions=translator.parse_ts_lines(lignes_fichier(input_ts))
+    # Générer le code Python directement dans le fichier de sortie (tamponné)
+    carte=CarteSource(instructions, marqueurs)
+    with open(output_py,'w',encoding='utf-8',buffering=1<<16) as fw:
+        translator.write_python_code(instructions, fw, carte)
+    carte.ecrire_fichier(input_ts, output_py)
     print(f"[INFO] {output_py} généré avec succès, pas de boucles 'for', pas de 'if' incomplets.")
 
 
@@ -2,7 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import sys
-import re
+
+from mtdv.carte import CarteSource
+from mtdv.ir import Programme, indices_plats, programme_depuis_lignes, programme_plat
+from mtdv.lexeur import lignes_fichier
+from mtdv.persistant import source_persistant
 
 class MTdVTranslator:
     def __init__(self):
@@ -10,336 +14,221 @@ class MTdVTranslator:
 
     def parse_ts_lines(self, lines):
         """
-        analyse .ts -> retourne un arbre d'instructions
-        """
-        tokens = self._tokenize(lines)
-        instructions = self._build_ast(tokens)
-        return instructions
-
-    def _tokenize(self, lines):
-        """
-        tokénisation simple: suppression des lignes vides, séparations '{}' etc.
+        analyse .ts -> retourne le programme compact (mtdv.ir)
         """
-        res = []
-        for line in lines:
-            ln = line.strip()
-            if not ln or ln.startswith('%') or ln.startswith('#'):
-                continue
-            ln = ln.replace('}', ' } ')
-            splitted = ln.split()
-            for tk in splitted:
-                res.append(tk)
-        return res
+        programme = programme_depuis_lignes(lines, diese_obligatoire=False)
+        if programme is None:
+            return Programme()
+        return programme
 
-    def _build_ast(self, tokens):
-        """
-        construction de l'arbre d'instructions,supporte { boucles, si(0), si(1), } etc.
-        """
-        root = {"type":"root","content":[]}
-        level_map = {0: root}
-        cur_level = 0
-        i = 0
-        while i<len(tokens):
-            tk = tokens[i]
-            if tk == '}':
-                # fin de bloc
-                if cur_level>0:
-                    level_map.pop(cur_level)
-                    cur_level-=1
-                i+=1
-                continue
-            if tk=='boucle':
-                newb = {"type":"boucle","content":[]}
-                level_map[cur_level]["content"].append(newb)
-                cur_level+=1
-                level_map[cur_level] = newb
-                i+=1
-                continue
-            if tk=='si(0)':
-                newsi = {"type":"si","condition":0,"content":[]}
-                level_map[cur_level]["content"].append(newsi)
-                cur_level+=1
-                level_map[cur_level] = newsi
-                i+=1
-                continue
-            if tk=='si(1)':
-                newsi = {"type":"si","condition":1,"content":[]}
-                level_map[cur_level]["content"].append(newsi)
-                cur_level+=1
-                level_map[cur_level] = newsi
-                i+=1
-                continue
-            if tk=='fin':
-                level_map[cur_level]["content"].append({"type":"fin"})
-                i+=1
-                continue
-            if tk in ['I','P','G','D','0','1']:
-                level_map[cur_level]["content"].append({
-                    "type":"instruction",
-                    "value":tk
-                })
-                i+=1
-                continue
-            # incoonu => ignorer
-            i+=1
-        return root["content"]
-
-    def generate_pure_function_code(self, instructions):
+    def generate_pure_function_code(self, instructions, carte=None):
         """
         Générer du Python fonctionnel pur avec uniquement des fonctions à un seul paramètre, 
         sans affectation, sans boucle et sans variables locales.
+        Générateur : les lignes sont produites (et écrites, voir main) au fur et à mesure.
+        carte : CarteSource (mtdv.carte) placée sur les lignes du n-uplet du programme ;
+        l'appelant fait passer chaque ligne produite par carte.ligne.
         """
-        lines = []
 
         # 1) Définir plusieurs fonctions pures avec un seul paramètre
         #    Par exemple state = [tape, head, instructions]
         #    Accéder à state[0], state[1], state[2] pour obtenir les éléments
         #    Ne pas utiliser newTape = ... => uniquement en ligne
-        lines.append("def empty_tape(n):")
-        lines.append("    if n<=0:")
-        lines.append("        return []")
-        lines.append("    else:")
-        lines.append("        return [0] + empty_tape(n-1)")
-        lines.append("")
-
-        lines.append("def write_one(state):")
-        lines.append("    # state=[tape, head, instructions], seulement modifier tape[head]=>1")
-        lines.append("    if len(state)<2:")
-        lines.append("        return state")
-        lines.append("    else:")
-        lines.append("        tap = state[0]")
-        lines.append("        hd = state[1]")
-        lines.append("        if hd<0:")
-        lines.append("            return [ tap, hd, state[2] ]")
-        lines.append("        else:")
-        lines.append("            if hd>=len(tap):")
-        lines.append("                return [ tap, hd, state[2] ]")
-        lines.append("            else:")
-        lines.append("                return [ tap[0:hd]+[1]+tap[hd+1:], hd, state[2] ]")
-        lines.append("")
-
-        lines.append("def write_zero(state):")
-        lines.append("    if len(state)<2:")
-        lines.append("        return state")
-        lines.append("    else:")
-        lines.append("        tap = state[0]")
-        lines.append("        hd = state[1]")
-        lines.append("        if hd<0:")
-        lines.append("            return [tap,hd, state[2]]")
-        lines.append("        else:")
-        lines.append("            if hd>=len(tap):")
-        lines.append("                return [tap,hd, state[2]]")
-        lines.append("            else:")
-        lines.append("                return [tap[0:hd]+[0]+tap[hd+1:], hd, state[2]]")
-        lines.append("")
-
-        lines.append("def move_right(state):")
-        lines.append("    # state=[tape,head,instructions]")
-        lines.append("    if len(state)<2:")
-        lines.append("        return state")
-        lines.append("    else:")
-        lines.append("        tap=state[0]")
-        lines.append("        hd=state[1]")
-        lines.append("        return [tap, hd+1, state[2]]")
-        lines.append("")
-
-        lines.append("def move_left(state):")
-        lines.append("    if len(state)<2:")
-        lines.append("        return state")
-        lines.append("    else:")
-        lines.append("        tap=state[0]")
-        lines.append("        hd=state[1]")
-        lines.append("        return [tap, hd-1, state[2]]")
-        lines.append("")
-
-        lines.append("def get_instructions(state):")
-        lines.append("    if len(state)<3:")
-        lines.append("        return []")
-        lines.append("    else:")
-        lines.append("        return state[2]")
-        lines.append("")
-
-        lines.append("def set_instructions(state, newInstrs):")
-        lines.append("    if len(state)<3:")
-        lines.append("        return state")
-        lines.append("    else:")
-        lines.append("        return [ state[0], state[1], newInstrs ]")
-        lines.append("")
-
-        lines.append("def print_tape(state):")
-        lines.append("    if len(state)<2:")
-        lines.append("        print('State incomplete =>', state)")
-        lines.append("        return state")
-        lines.append("    else:")
-        lines.append("        tap=state[0]")
-        lines.append("        hd=state[1]")
-        lines.append("        if hd<0:")
-        lines.append("            print('Head<0 =>', hd)")
-        lines.append("            print('Tape=', tap)")
-        lines.append("            return state")
-        lines.append("        else:")
-        lines.append("            if hd>=len(tap):")
-        lines.append("                print('Head>len =>', hd)")
-        lines.append("                print('Tape=', tap)")
-        lines.append("                return state")
-        lines.append("            else:")
-        lines.append("                print('Tape=', tap)")
-        lines.append("                print('Head=', hd, 'Value=', tap[hd])")
-        lines.append("                return state")
-        lines.append("")
+        #    Ruban persistant (arbre immuable, écriture en O(log n) par recopie du chemin),
+        #    fonctions à un seul paramètre recopiées depuis mtdv/persistant.py
+        yield from source_persistant().splitlines()
+        yield ""
+
+        yield "def write_one(state):"
+        yield "    # state=[tape, head, instructions, pc], seulement modifier tape[head]=>1"
+        yield "    if len(state)<2:"
+        yield "        return state"
+        yield "    else:"
+        yield "        return [ tape_write((state[0], state[1], 1)), state[1], state[2], state[3] ]"
+        yield ""
+
+        yield "def write_zero(state):"
+        yield "    if len(state)<2:"
+        yield "        return state"
+        yield "    else:"
+        yield "        return [ tape_write((state[0], state[1], 0)), state[1], state[2], state[3] ]"
+        yield ""
+
+        yield "def move_right(state):"
+        yield "    # state=[tape,head,instructions,pc]"
+        yield "    if len(state)<2:"
+        yield "        return state"
+        yield "    else:"
+        yield "        return [state[0], state[1]+1, state[2], state[3]]"
+        yield ""
+
+        yield "def move_left(state):"
+        yield "    if len(state)<2:"
+        yield "        return state"
+        yield "    else:"
+        yield "        return [state[0], state[1]-1, state[2], state[3]]"
+        yield ""
+
+        yield "def get_instructions(state):"
+        yield "    if len(state)<3:"
+        yield "        return []"
+        yield "    else:"
+        yield "        return state[2]"
+        yield ""
+
+        yield "def goto(q):"
+        yield "    # q=(state, pc) => même état, compteur pc"
+        yield "    return [ q[0][0], q[0][1], q[0][2], q[1] ]"
+        yield ""
+
+        yield "def print_tape(state):"
+        yield "    if len(state)<2:"
+        yield "        print('State incomplete =>', state)"
+        yield "        return state"
+        yield "    else:"
+        yield "        # Une seule écriture ; fenêtre selon MTDV_FENETRE, MTDV_LARGEUR (tape_display)"
+        yield "        print('Tape=', tape_display((state[0], state[1])) + '\\nHead=', state[1], 'Value=', tape_read((state[0], state[1])))"
+        yield "        return state"
+        yield ""
 
         # Exécution des instructions : n'accepte qu'un paramètre state => retourne un nouvel état
-        lines.append("def step_instruction(state):")
-        lines.append("    # Prendre instructions[0] => exécuter => retourner le nouvel état + enlever instructions[0]")
-        lines.append("    instrs = get_instructions(state)")
-        lines.append("    if len(instrs)==0:")
-        lines.append("        return state")
-        lines.append("    else:")
-        lines.append("        first = instrs[0]")
-        lines.append("        rest = instrs[1:]")
-        lines.append("        if first['type']=='instruction':")
-        lines.append("            val = first['value']")
-        lines.append("            if val=='D':")
-        lines.append("                return set_instructions(move_right(state), rest)")
-        lines.append("            else:")
-        lines.append("                if val=='G':")
-        lines.append("                    return set_instructions(move_left(state), rest)")
-        lines.append("                else:")
-        lines.append("                    if val=='0':")
-        lines.append("                        return set_instructions(write_zero(state), rest)")
-        lines.append("                    else:")
-        lines.append("                        if val=='1':")
-        lines.append("                            return set_instructions(write_one(state), rest)")
-        lines.append("                        else:")
-        lines.append("                            if val=='I':")
-        lines.append("                                # afficher le ruban")
-        lines.append("                                return set_instructions(print_tape(state), rest)")
-        lines.append("                            else:")
-        lines.append("                                if val=='P':")
-        lines.append("                                    print_tape(state)")
-        lines.append("                                    input('Appuyez sur Entrée pour continuer...')")
-        lines.append("                                    return set_instructions(state, rest)")
-        lines.append("                                else:")
-        lines.append("                                    if val=='fin':")
-        lines.append("                                        # fin => ignorer le reste")
-        lines.append("                                        return [ state[0], state[1], [] ]")
-        lines.append("                                    else:")
-        lines.append("                                        # inconnue => ignorer")
-        lines.append("                                        return set_instructions(state, rest)")
-        lines.append("        else:")
-        lines.append("            if first['type']=='si':")
-        lines.append("                cond = first['condition']")
-        lines.append("                tap = state[0]")
-        lines.append("                hd  = state[1]")
-        lines.append("                if hd>=0 and hd<len(tap) and tap[hd]==cond:")
-        lines.append("                    # Exécuter sub_insts => fonction pure => récursive")
-        lines.append("                    sub = first['content']")
-        lines.append("                    newState = run_instructions([tap,hd,sub])")
-        lines.append("                    return set_instructions(newState, rest)")
-        lines.append("                else:")
-        lines.append("                    # ignorer sub")
-        lines.append("                    return set_instructions(state, rest)")
-        lines.append("            else:")
-        lines.append("                if first['type']=='boucle':")
-        lines.append("                    # Peut être exécutée une seule fois => ou récursive => ici une fois seulement")
-        lines.append("                    sub = first['content']")
-        lines.append("                    newState = run_instructions([ state[0], state[1], sub])")
-        lines.append("                    return set_instructions(newState, rest)")
-        lines.append("                else:")
-        lines.append("                    if first['type']=='fin':")
-        lines.append("                        # fin => ignorer le reste")
-        lines.append("                        return [ state[0], state[1], [] ]")
-        lines.append("                    else:")
-        lines.append("                        # ignorer")
-        lines.append("                        return set_instructions(state, rest)")
-        lines.append("")
-
-        lines.append("def run_instructions(state):")
-        lines.append("    # Exécuter les instructions de manière récursive jusqu'à ce qu'il n'y ait plus rien ou qu'on rencontre 'fin'")
-        lines.append("    instrs = get_instructions(state)")
-        lines.append("    if len(instrs)==0:")
-        lines.append("        return state")
-        lines.append("    else:")
-        lines.append("        newState = step_instruction(state)")
-        lines.append("        # Récursion terminale => run_instructions(newState)")
-        lines.append("        return run_instructions(newState)")
-        lines.append("")
-
-        # Générer les instructions en tant que liste Python => tout dans un seul paramètre
-        instructions_code = self._serialize_instructions(instructions)
-
-        lines.append("def main(oneArg):")
-        lines.append("    # oneArg => [ARGC, ARG0, ARG1, ...]?")
-        lines.append("    # Impossible d'utiliser des assignments => uniquement if else => return")
-        lines.append("    if len(oneArg)<=2:")
-        lines.append("        # Pas d'instruction fournie => ne rien faire")
-        lines.append("        return []")
-        lines.append("    else:")
-        lines.append(f"        # Construire state=[tape,head,instructions], tape=empty_tape(1000), head=30")
-        lines.append(f"        st0 = [ empty_tape(1000), 30, {instructions_code} ]")
-        lines.append(f"        stFinal = run_instructions(st0)")
-        lines.append(f"        print('Programme terminé.')")
-        lines.append(f"        print_tape(stFinal)")
-        lines.append(f"        return stFinal")
-        lines.append("")
-        lines.append("if __name__ == '__main__':")
-        lines.append("    import sys")
-        lines.append("    theArgs = [len(sys.argv)-1] + sys.argv")
-        lines.append("    main(theArgs)")
-        return lines
-
-    def _serialize_instructions(self, instructions):
+        # Le programme est un n-uplet plat d'entiers (code, cible), state[3] est l'indice (pc)
+        # de l'instruction courante : un pas ne recopie pas le programme, il ne fait que changer pc.
+        # Codes : 3=D 2=G 4=0 5=1 0=I 1=P, 8=si(0) 9=si(1) (cible : après le '}'),
+        # 6=saut (fin, '}' de boucle, '#')
+        yield "def step_instruction(state):"
+        yield "    # Exécuter instructions[pc] => retourner le nouvel état (pc suivant)"
+        yield "    if get_instructions(state)[state[3]]==3:"
+        yield "        return goto((move_right(state), state[3]+2))"
+        yield "    else:"
+        yield "        if get_instructions(state)[state[3]]==2:"
+        yield "            return goto((move_left(state), state[3]+2))"
+        yield "        else:"
+        yield "            if get_instructions(state)[state[3]]==6:"
+        yield "                return goto((state, get_instructions(state)[state[3]+1]))"
+        yield "            else:"
+        yield "                if get_instructions(state)[state[3]]>=8:"
+        yield "                    return run_si(state)"
+        yield "                else:"
+        yield "                    return run_instruction(state)"
+        yield ""
+
+        yield "def run_si(state):"
+        yield "    if tape_read((state[0], state[1]))==get_instructions(state)[state[3]]-8:"
+        yield "        return goto((state, state[3]+2))"
+        yield "    else:"
+        yield "        # condition fausse => après le '}'"
+        yield "        return goto((state, get_instructions(state)[state[3]+1]))"
+        yield ""
+
+        yield "def run_instruction(state):"
+        yield "    if get_instructions(state)[state[3]]==4:"
+        yield "        return goto((write_zero(state), state[3]+2))"
+        yield "    else:"
+        yield "        if get_instructions(state)[state[3]]==5:"
+        yield "            return goto((write_one(state), state[3]+2))"
+        yield "        else:"
+        yield "            if get_instructions(state)[state[3]]==0:"
+        yield "                # afficher le ruban"
+        yield "                return goto((print_tape(state), state[3]+2))"
+        yield "            else:"
+        yield "                if get_instructions(state)[state[3]]==1:"
+        yield "                    print_tape(state)"
+        yield "                    input('Appuyez sur Entrée pour continuer...')"
+        yield "                    return goto((state, state[3]+2))"
+        yield "                else:"
+        yield "                    # inconnue => ignorer"
+        yield "                    return goto((state, state[3]+2))"
+        yield ""
+
+        # Sans boucle, la répétition passe par la récursion : run_steps exécute n pas en deux
+        # moitiés de n/2 pas et run_slices double n à chaque tranche, donc la profondeur de
+        # pile reste en O(log nombre de pas)
+        yield "def run_instructions(state):"
+        yield "    # Exécuter jusqu'à la fin du programme (pc hors de la liste)"
+        yield "    return run_slices((state, 1))"
+        yield ""
+
+        yield "def run_slices(q):"
+        yield "    # q=(state, n) => une tranche de n pas, puis la suivante deux fois plus longue"
+        yield "    if q[0][3]>=len(get_instructions(q[0])):"
+        yield "        return q[0]"
+        yield "    else:"
+        yield "        return run_slices((run_steps(q), 2*q[1]))"
+        yield ""
+
+        yield "def run_steps(q):"
+        yield "    # q=(state, n) => état après au plus n pas"
+        yield "    if q[0][3]>=len(get_instructions(q[0])):"
+        yield "        return q[0]"
+        yield "    else:"
+        yield "        if q[1]==1:"
+        yield "            return step_instruction(q[0])"
+        yield "        else:"
+        yield "            return run_steps((run_steps((q[0], q[1]//2)), q[1]-q[1]//2))"
+        yield ""
+
+        yield "def main(oneArg):"
+        yield "    # oneArg => [ARGC, ARG0, ARG1, ...]?"
+        yield "    # Impossible d'utiliser des assignments => uniquement if else => return"
+        yield "    if len(oneArg)<=2:"
+        yield "        # Pas d'instruction fournie => ne rien faire"
+        yield "        return []"
+        yield "    else:"
+        yield f"        # Construire state=[tape,head,instructions,pc], tape=empty_tape(1000), head=30, pc=0"
+        # Les instructions en tant que n-uplet Python => tout dans un seul paramètre
+        yield "        st0 = [ empty_tape(1000), 30, ("
+        yield from self._serialize_instructions(instructions, carte)
+        yield "        ), 0 ]"
+        yield f"        stFinal = run_instructions(st0)"
+        yield f"        print('Programme terminé.')"
+        yield f"        print_tape(stFinal)"
+        yield f"        return stFinal"
+        yield ""
+        yield "if __name__ == '__main__':"
+        yield "    import sys"
+        yield "    # Sortie tamponnée par blocs, même sur un terminal (mtdv.affichage.tamponner_sortie)"
+        yield "    hasattr(sys.stdout, 'reconfigure') and sys.stdout.reconfigure(line_buffering=False)"
+        yield "    theArgs = [len(sys.argv)-1] + sys.argv"
+        yield "    main(theArgs)"
+
+    def _serialize_instructions(self, instructions, carte=None):
         """
-        Convertir l'arbre des instructions en une liste Python, par exemple :
-        [{'type':'instruction','value':'D'}, {'type':'si','condition':0,'content':[...]}]
+        Convertir le programme (mtdv.ir) en un n-uplet plat d'entiers (code, cible)
+        (voir mtdv.ir.programme_plat), par exemple (8, 4, 6, 6, 3, 0) pour 'si (0) fin } D',
+        produit par lignes de 16 paires.
+        Une seule constante dans le module compilé, rien à reconstruire à l'import.
         """
-        def conv(inst):
-            t = inst["type"]
-            if t=="instruction":
-                return f"{{'type':'instruction','value':'{inst['value']}'}}"
-            elif t=="fin":
-                return f"{{'type':'fin'}}"
-            elif t=="si":
-                c = inst["condition"]
-                subs = inst["content"]
-                subStr = "[" + ",".join(conv(x) for x in subs) + "]"
-                return f"{{'type':'si','condition':{c},'content':{subStr}}}"
-            elif t=="boucle":
-                subs = inst["content"]
-                subStr = "[" + ",".join(conv(x) for x in subs) + "]"
-                return f"{{'type':'boucle','content':{subStr}}}"
-            else:
-                return f"{{'type':'unknown'}}"
-
-        arr = "[" + ",".join(conv(x) for x in instructions) + "]"
-        return arr
+        plat = programme_plat(instructions)
+        indices = indices_plats(instructions) if carte is not None else None
+        for i in range(0, len(plat), 32):
+            if carte is not None:
+                carte.placer(indices[i // 2])
+            yield "            " + ", ".join(map(str, plat[i:i + 32])) + ","
+        if carte is not None:
+            carte.placer(None)
 
 
 def main():
-    if len(sys.argv)<3:
-        print("Usage: python traducteur_one_arg.py input.ts output.py")
+    # option --marqueurs : commentaire '# ts:ligne:colonne' sur les lignes du programme
+    marqueurs = '--marqueurs' in sys.argv[1:]
+    argv = [a for a in sys.argv[1:] if a != '--marqueurs']
+    if len(argv)<2:
+        print("Usage: python traducteur_one_arg.py input.ts output.py [--marqueurs]")
         sys.exit(1)
-    input_ts = sys.argv[1]
-    output_py = sys.argv[2]
-
-    # Lire le fichier d'entrée (essayer plusieurs encodages)
-    encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-    for enc in encodings:
-        try:
-            with open(input_ts, 'r', encoding=enc) as f:
-                lines = f.readlines()
-            break
-        except UnicodeDecodeError:
-            pass
+    input_ts = argv[0]
+    output_py = argv[1]
 
+    # Lire le fichier d'entrée ligne par ligne (essayer plusieurs encodages)
     translator = MTdVTranslator()
-    instructions = translator.parse_ts_lines(lines)
-
-    code_lines = translator.generate_pure_function_code(instructions)
-    final_code = "\n".join(code_lines)
-
-    with open(output_py,'w',encoding='utf-8') as fw:
-        fw.write(final_code)
+    instructions = translator.parse_ts_lines(lignes_fichier(input_ts))
+
+    # Écrire les lignes au fur et à mesure de la génération (tamponné)
+    # Carte de correspondance output.py.map (mtdv.carte) : chaque ligne passe par carte.ligne
+    carte = CarteSource(instructions, marqueurs)
+    with open(output_py,'w',encoding='utf-8',buffering=1 << 16) as fw:
+        fw.writelines(carte.ligne(line) + "\n" for line in translator.generate_pure_function_code(instructions, carte))
+    carte.ecrire_fichier(input_ts, output_py)
 
     print(f"[INFO] Génération de {output_py} terminée. Les fonctions ont seulement UN paramètre (state ou oneArg).")
 